@@ -0,0 +1,92 @@
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+from Ocr2.benchmarks.bench_output import add_output_argument, save_results
+from Ocr2.benchmarks.bench_preprocessing import load_samples
+from Ocr2.benchmarks.synthetic_documents import render_text_page
+from Ocr2.src.ocr.page_scaling import OCR_MIN_SCALE, prepare_page
+from Ocr2.src.ocr.reader_pool import acquire_reader, get_reader_pool
+
+
+def make_labelled_pages(count, size=(2480, 3508), font_sizes=(28, 40, 56), lines=12, seed=0):
+    """
+    Страницы A4 при 300 dpi с известным текстом разного кегля и широкими полями.
+    :return: Список пар (RGB-изображение, эталонный текст).
+    """
+    return [render_text_page(size, seed=seed + index, lines=lines, words_per_line=5,
+                             font_size=font_sizes[index % len(font_sizes)], origin=(400, 600))
+            for index in range(count)]
+
+
+def char_error_rate(recognized, reference):
+    """
+    CER: расстояние Левенштейна между текстами (без пробелов и регистра), деленное на длину эталона.
+    """
+    recognized = "".join(recognized.lower().split())
+    reference = "".join(reference.lower().split())
+    previous = list(range(len(recognized) + 1))
+    for i, ref_char in enumerate(reference, start=1):
+        current = [i]
+        for j, rec_char in enumerate(recognized, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_char != rec_char)))
+        previous = current
+    return previous[-1] / max(len(reference), 1)
+
+
+def benchmark_target(samples, target_text_height, languages=("en",)):
+    """
+    Замеряет время OCR (с учетом подготовки страниц) и CER при заданной целевой высоте текста.
+    :param target_text_height: None — исходные страницы без подготовки, 0 — только обрезка.
+    """
+    errors, prepare_seconds, elapsed, pixels = [], 0.0, 0.0, 0
+    for image, reference in samples:
+        start = time.perf_counter()
+        prepared = image
+        if target_text_height is not None:
+            prepared, _ = prepare_page(image, target_text_height=target_text_height, min_scale=OCR_MIN_SCALE)
+        prepare_seconds += time.perf_counter() - start
+        with acquire_reader(languages) as reader:
+            recognized = " ".join(reader.readtext(prepared, detail=0))
+        elapsed += time.perf_counter() - start
+        pixels += prepared.shape[0] * prepared.shape[1]
+        errors.append(char_error_rate(recognized, reference))
+
+    return {
+        "target_text_height": target_text_height,
+        "seconds": round(elapsed, 3),
+        "prepare_seconds": round(prepare_seconds, 3),
+        "images_per_sec": round(len(samples) / elapsed, 3),
+        "megapixels_per_page": round(pixels / len(samples) / 1e6, 3),
+        "cer": round(float(np.mean(errors)), 4),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ускорение OCR от адаптивного масштабирования страниц и его влияние на CER")
+    parser.add_argument("--input-dir", default=None, help="Размеченная выборка: изображения и одноименные .txt")
+    parser.add_argument("--images", type=int, default=6, help="Количество синтетических страниц без --input-dir")
+    parser.add_argument("--targets", default="0,32,24,20,16", help="Целевые высоты текста через запятую")
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    ocr_languages = ("en",)
+    if args.input_dir:
+        labelled = [(cv2.cvtColor(image, cv2.COLOR_GRAY2RGB), text) for image, text in load_samples(args.input_dir)]
+    else:
+        labelled = make_labelled_pages(args.images)
+    get_reader_pool(ocr_languages).warmup()
+
+    baseline = benchmark_target(labelled, None, ocr_languages)
+    print(f"исходные страницы: {baseline['images_per_sec']} изобр./с, CER {baseline['cer']}")
+    results = [baseline]
+    for target in args.targets.split(","):
+        result = benchmark_target(labelled, int(target), ocr_languages)
+        result["speedup"] = round(baseline["seconds"] / result["seconds"], 2)
+        result["cer_delta"] = round(result["cer"] - baseline["cer"], 4)
+        print(f"высота {int(target):>3}: x{result['speedup']}, CER {result['cer']} ({result['cer_delta']:+})")
+        results.append(result)
+
+    save_results(args.output, results)
@@ -0,0 +1,61 @@
+import time
+import argparse
+
+from Ocr2.benchmarks.bench_executors import make_synthetic_pages
+from Ocr2.benchmarks.bench_output import add_output_argument, save_results
+from Ocr2.src.ocr.batched_ocr import ocr_pages_batched
+from Ocr2.src.ocr.reader_pool import acquire_reader, get_reader_pool
+from Ocr2.src.utils.result_cache import get_result_cache
+
+
+def benchmark_loop(pages, languages):
+    """
+    Текущий путь: reader.readtext по одной странице.
+    """
+    start = time.perf_counter()
+    with acquire_reader(languages) as reader:
+        for page in pages:
+            reader.readtext(page, detail=0)
+    elapsed = time.perf_counter() - start
+    return {"mode": "loop", "pages": len(pages), "seconds": round(elapsed, 3),
+            "pages_per_sec": round(len(pages) / elapsed, 3)}
+
+
+def benchmark_batched(pages, languages, pages_per_batch, recognizer_batch_size):
+    """
+    Пакетный путь: readtext_batched с группировкой страниц по размеру.
+    """
+    batch_stats = []
+    start = time.perf_counter()
+    ocr_pages_batched(pages, languages, detail=0, pages_per_batch=pages_per_batch,
+                      recognizer_batch_size=recognizer_batch_size, batch_stats=batch_stats)
+    elapsed = time.perf_counter() - start
+    return {"mode": "batched", "pages_per_batch": pages_per_batch, "recognizer_batch_size": recognizer_batch_size,
+            "pages": len(pages), "seconds": round(elapsed, 3), "pages_per_sec": round(len(pages) / elapsed, 3),
+            "batches": batch_stats}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сравнение постраничного и пакетного OCR (readtext_batched)")
+    parser.add_argument("--images", type=int, default=16, help="Количество синтетических страниц")
+    parser.add_argument("--pages-per-batch", default="2,4,8", help="Размеры батчей страниц через запятую")
+    parser.add_argument("--recognizer-batch-size", type=int, default=16, help="Размер батча распознавателя")
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    ocr_languages = ("en",)
+    # Страницы двух размеров: проверка группировки по разрешению
+    synthetic_pages = (make_synthetic_pages(args.images // 2, seed=1) +
+                       make_synthetic_pages(args.images - args.images // 2, size=(1654, 2339), seed=2))
+    get_reader_pool(ocr_languages).warmup()
+
+    results = [benchmark_loop(synthetic_pages, ocr_languages)]
+    print(f"    loop: {results[0]['pages_per_sec']} стр./с")
+    # Кэш результатов отключается, чтобы каждый прогон действительно распознавал страницы
+    get_result_cache().enabled = False
+    for size in args.pages_per_batch.split(","):
+        result = benchmark_batched(synthetic_pages, ocr_languages, int(size), args.recognizer_batch_size)
+        print(f"batch {int(size):>3}: {result['pages_per_sec']} стр./с")
+        results.append(result)
+
+    save_results(args.output, results)
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import torch
+from PIL import Image
+from torchvision import datasets
+
+from Ocr2.benchmarks.bench_output import add_output_argument, save_results
+from Ocr2.benchmarks.synthetic_documents import render_text_page
+from Ocr2.src.classification.predict_category import (classify_tensors, decode_for_classification, load_model,
+                                                      preprocess_image_reference)
+
+
+def make_synthetic_scans(output_dir, count=20, size=(2480, 3508), seed=0):
+    """
+    Сохраняет синтетические сканы A4 при 300 dpi в JPEG: половина серые, половина цветные.
+    :return: Список путей.
+    """
+    paths = []
+    for index in range(count):
+        page, _ = render_text_page(size, seed=seed + index, mode="L" if index % 2 == 0 else "RGB", words_per_line=10)
+        path = os.path.join(output_dir, f"scan_{index}.jpg")
+        Image.fromarray(page).save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def time_decoder(decoder, paths):
+    """
+    Замеряет задержку декодирования одного изображения (p50/p95) и возвращает тензоры.
+    """
+    latencies, tensors = [], []
+    for path in paths:
+        start = time.perf_counter()
+        tensors.append(decoder(path))
+        latencies.append(time.perf_counter() - start)
+    return tensors, {
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+        "images_per_sec": round(len(paths) / sum(latencies), 2),
+    }
+
+
+def compare_decoders(paths, labels=None, model=None, class_labels=None, batch_size=32):
+    """
+    Сравнивает исходный и быстрый пути: задержку, отличие тензоров и, при наличии модели,
+    совпадение предсказаний и точность по меткам.
+    """
+    reference_tensors, reference_stats = time_decoder(preprocess_image_reference, paths)
+    fast_tensors, fast_stats = time_decoder(decode_for_classification, paths)
+    differences = [(ref - fast).abs().mean().item() for ref, fast in zip(reference_tensors, fast_tensors)]
+    report = {
+        "images": len(paths),
+        "reference": reference_stats,
+        "fast": fast_stats,
+        "speedup": round(reference_stats["latency_p50_ms"] / fast_stats["latency_p50_ms"], 2),
+        "mean_abs_tensor_diff": round(float(np.mean(differences)), 4),
+    }
+
+    if model is not None:
+        predictions = {}
+        for name, tensors in (("reference", reference_tensors), ("fast", fast_tensors)):
+            predictions[name] = []
+            for start in range(0, len(tensors), batch_size):
+                predictions[name].extend(classify_tensors(tensors[start:start + batch_size], model, "cpu",
+                                                          class_labels))
+        agreement = np.mean([a == b for a, b in zip(predictions["reference"], predictions["fast"])])
+        report["prediction_agreement"] = round(float(agreement), 4)
+        if labels is not None:
+            for name in ("reference", "fast"):
+                correct = [class_labels[label] == predicted for label, predicted in zip(labels, predictions[name])]
+                report[f"{name}_accuracy"] = round(float(np.mean(correct)), 4)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сравнение исходного и быстрого декодирования для классификации")
+    parser.add_argument("--input", default=None, help="Выборка (ImageFolder) вместо синтетических сканов")
+    parser.add_argument("--images", type=int, default=20, help="Количество синтетических сканов")
+    parser.add_argument("--model", default=None, help="Модель для проверки точности (state_dict .pth)")
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    torch.set_num_threads(max(1, os.cpu_count() or 1))
+    image_labels, classes = None, None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.input:
+            folder = datasets.ImageFolder(args.input)
+            image_paths = [path for path, _ in folder.samples]
+            image_labels, classes = [label for _, label in folder.samples], folder.classes
+        else:
+            image_paths = make_synthetic_scans(tmp_dir, args.images)
+
+        classifier = None
+        if args.model:
+            classifier = load_model(args.model, num_classes=len(classes) if classes else 15, execution_device="cpu")
+            classes = classes or [str(index) for index in range(15)]
+        result = compare_decoders(image_paths, image_labels, classifier, classes)
+
+    print(json.dumps(result, ensure_ascii=False, indent=4))
+    save_results(args.output, result)
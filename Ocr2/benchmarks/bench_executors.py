@@ -0,0 +1,52 @@
+import time
+import argparse
+
+from Ocr2.benchmarks.bench_output import add_output_argument, save_results
+from Ocr2.benchmarks.synthetic_documents import make_text_pages
+from Ocr2.src.ocr.executors import EXECUTOR_MODES, OcrExecutor, easyocr_readtext_task
+
+
+def make_synthetic_pages(count, size=(1240, 1754), seed=0):
+    """
+    Синтетические страницы (RGB-массивы) для воспроизводимого замера, по умолчанию A4 при 150 dpi.
+    """
+    return [page for page, _ in make_text_pages(count, size, seed=seed, words_per_line=8)]
+
+
+def benchmark_mode(mode, pages, num_workers=None, languages=("en",)):
+    """
+    Замеряет пропускную способность OCR (изображений в секунду) для режима исполнителя.
+    Загрузка моделей и прогрев не входят в замер.
+    """
+    with OcrExecutor(mode, num_workers=num_workers, languages=languages) as executor:
+        executor.map_arrays(easyocr_readtext_task, pages[:executor.num_workers], languages=languages)
+
+        start = time.perf_counter()
+        executor.map_arrays(easyocr_readtext_task, pages, languages=languages)
+        elapsed = time.perf_counter() - start
+
+        return {
+            "mode": mode,
+            "workers": executor.num_workers,
+            "images": len(pages),
+            "seconds": round(elapsed, 3),
+            "images_per_sec": round(len(pages) / elapsed, 3),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сравнение режимов исполнителя OCR (inline/thread/process)")
+    parser.add_argument("--images", type=int, default=16, help="Количество синтетических страниц")
+    parser.add_argument("--workers", type=int, default=None, help="Количество рабочих (по умолчанию по числу ядер)")
+    parser.add_argument("--modes", default=",".join(EXECUTOR_MODES), help="Режимы через запятую")
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    synthetic_pages = make_synthetic_pages(args.images)
+    results = []
+    for executor_mode in args.modes.split(","):
+        result = benchmark_mode(executor_mode.strip(), synthetic_pages, num_workers=args.workers)
+        print(f"{result['mode']:>8}: {result['workers']} рабочих, {result['images_per_sec']} изобр./с")
+        results.append(result)
+
+    save_results(args.output, results)
@@ -0,0 +1,25 @@
+import os
+import json
+
+
+def add_output_argument(parser):
+    """
+    Добавляет в парсер аргумент --output, общий для всех бенчмарков.
+    """
+    parser.add_argument("--output", default=None, help="Путь для сохранения результатов в JSON")
+
+
+def save_results(output_path, results, **metadata):
+    """
+    Сохраняет результаты бенчмарка в JSON {"cpu_count", ...metadata, "results"}; без пути ничего не делает.
+    :param output_path: Путь к JSON или None.
+    :param results: Результаты замеров.
+    :param metadata: Дополнительные поля отчета (конфигурация, платформа).
+    """
+    if not output_path:
+        return
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"cpu_count": os.cpu_count(), **metadata, "results": results}, f, ensure_ascii=False,
+                  indent=4)  # type: ignore
+    print(f"Результаты сохранены: {output_path}")
@@ -0,0 +1,93 @@
+import os
+import time
+import argparse
+from difflib import SequenceMatcher
+
+import cv2
+import numpy as np
+
+from Ocr2.benchmarks.bench_output import add_output_argument, save_results
+from Ocr2.benchmarks.synthetic_documents import make_text_pages
+from Ocr2.src.ocr.reader_pool import acquire_reader
+from Ocr2.src.preproccesing.enhance_image import PREPROCESS_PROFILES, enhance_image
+
+
+def make_noisy_samples(count, size=(2480, 3508), noise=25, seed=0):
+    """
+    Зашумленные серые страницы с известным текстом (A4 при 300 dpi).
+    :return: Список пар (изображение, эталонный текст).
+    """
+    return make_text_pages(count, size, seed=seed, mode="L", noise=noise)
+
+
+def load_samples(input_dir):
+    """
+    Загружает выборку: изображения с эталонным текстом в одноименных .txt рядом.
+    """
+    samples = []
+    for file_name in sorted(os.listdir(input_dir)):
+        base_name, extension = os.path.splitext(file_name)
+        text_path = os.path.join(input_dir, base_name + ".txt")
+        if extension.lower() in ('.jpg', '.jpeg', '.png') and os.path.exists(text_path):
+            with open(text_path, "r", encoding="utf-8") as f:
+                reference = f.read()
+            samples.append((cv2.imread(os.path.join(input_dir, file_name), cv2.IMREAD_GRAYSCALE), reference))
+    return samples
+
+
+def character_accuracy(recognized, reference):
+    """
+    Доля совпадающих символов распознанного и эталонного текста (без учета пробелов и регистра).
+    """
+    recognized = "".join(recognized.lower().split())
+    reference = "".join(reference.lower().split())
+    return SequenceMatcher(None, recognized, reference, autojunk=False).ratio()
+
+
+def benchmark_profile(profile, samples, languages=("en",), measure_accuracy=True):
+    """
+    Замеряет пропускную способность профиля, время его шагов и точность последующего OCR.
+    """
+    step_totals = {}
+    accuracies = []
+    elapsed = 0.0
+    for image, reference in samples:
+        start = time.perf_counter()
+        processed, timings = enhance_image(image, profile)
+        elapsed += time.perf_counter() - start
+        for step, seconds in timings.items():
+            step_totals[step] = step_totals.get(step, 0.0) + seconds
+
+        if measure_accuracy:
+            with acquire_reader(languages) as reader:
+                recognized = " ".join(reader.readtext(processed, detail=0))
+            accuracies.append(character_accuracy(recognized, reference))
+
+    return {
+        "profile": profile,
+        "images": len(samples),
+        "seconds": round(elapsed, 3),
+        "images_per_sec": round(len(samples) / elapsed, 3) if elapsed else None,
+        "step_ms": {step: round(seconds / len(samples) * 1000, 2) for step, seconds in step_totals.items()},
+        "ocr_char_accuracy": round(float(np.mean(accuracies)), 4) if accuracies else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сравнение профилей предобработки: скорость и точность OCR")
+    parser.add_argument("--images", type=int, default=8, help="Количество синтетических страниц")
+    parser.add_argument("--input", default=None, help="Папка с изображениями и эталонными .txt вместо синтетики")
+    parser.add_argument("--profiles", default=",".join(PREPROCESS_PROFILES), help="Профили через запятую")
+    parser.add_argument("--no-ocr", action="store_true", help="Не замерять точность OCR")
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    sample_set = load_samples(args.input) if args.input else make_noisy_samples(args.images)
+    results = []
+    for profile_name in args.profiles.split(","):
+        result = benchmark_profile(profile_name.strip(), sample_set, measure_accuracy=not args.no_ocr)
+        print(f"{result['profile']:>9}: {result['images_per_sec']} изобр./с, "
+              f"точность OCR {result['ocr_char_accuracy']}, шаги (мс) {result['step_ms']}")
+        results.append(result)
+
+    save_results(args.output, results)
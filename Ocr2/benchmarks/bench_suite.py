@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import argparse
+import tempfile
+import multiprocessing
+
+import numpy as np
+
+from Ocr2.benchmarks.bench_output import add_output_argument, save_results
+from Ocr2.benchmarks.synthetic_documents import (make_docx, make_page_images, make_pdf, make_table_image,
+                                                 make_text)
+
+# Размеры входа: страниц на прогон, размер страницы, слов текста, строк и столбцов таблицы
+SIZE_PRESETS = {
+    "small": {"pages": 2, "page_size": (1000, 800), "words": 300, "table": (5, 3)},
+    "medium": {"pages": 4, "page_size": (1240, 1754), "words": 3000, "table": (12, 5)},
+    "large": {"pages": 8, "page_size": (2480, 3508), "words": 20000, "table": (30, 8)},
+}
+# Метрики сравнения с базовой линией: True — больше значит хуже
+COMPARED_METRICS = {"p50_s": True, "p95_s": True, "throughput": False, "peak_rss_mb": True}
+DEFAULT_THRESHOLD = 0.1
+
+
+def prepare_ocr(workdir, preset, options):
+    from Ocr2.src.ocr.easyocr_inference import ocr_with_easyocr
+
+    input_dir = os.path.join(workdir, "pages")
+    make_page_images(input_dir, preset["pages"], preset["page_size"])
+    output_dir = os.path.join(workdir, "ocr")
+
+    def task():
+        ocr_with_easyocr(input_dir, output_dir, num_threads=options["workers"], mode=options["ocr_mode"])
+
+    return task, preset["pages"], "pages"
+
+
+def prepare_pdf(workdir, preset, options):
+    from Ocr2.src.ocr.multi_page_processing import process_pdf
+
+    page_paths = make_page_images(os.path.join(workdir, "pages"), preset["pages"], preset["page_size"])
+    pdf_path = make_pdf(os.path.join(workdir, "document.pdf"), page_paths, dpi=150)
+    output_dir = os.path.join(workdir, "pdf")
+
+    def task():
+        process_pdf(pdf_path, output_dir, dpi=150)
+
+    return task, preset["pages"], "pages"
+
+
+def prepare_classify(workdir, preset, options):
+    import torch
+    from torchvision import models
+    from Ocr2.src.classification.predict_category import load_model, predict_category
+
+    model_path = options["model_path"]
+    if not model_path:
+        # Случайные веса: скорость не зависит от обучения модели
+        model = models.resnet18(pretrained=False)
+        model.fc = torch.nn.Linear(model.fc.in_features, 15)
+        model_path = os.path.join(workdir, "classifier.pth")
+        torch.save(model.state_dict(), model_path)
+    model = load_model(model_path, num_classes=15, execution_device="cpu")
+    class_labels = [f"class_{index}" for index in range(15)]
+    page_paths = make_page_images(os.path.join(workdir, "pages"), preset["pages"], preset["page_size"])
+
+    def task():
+        for path in page_paths:
+            predict_category(path, model, "cpu", class_labels)
+
+    return task, preset["pages"], "pages"
+
+
+def prepare_tables(workdir, preset, options):
+    from Ocr2.src.document_structure.extract_tables import extract_table_data
+
+    rows, cols = preset["table"]
+    image_paths = [make_table_image(os.path.join(workdir, f"table_{index}.png"), rows, cols, preset["page_size"],
+                                    seed=index)
+                   for index in range(preset["pages"])]
+
+    def task():
+        for path in image_paths:
+            extract_table_data(path, os.path.splitext(path)[0] + ".csv")
+
+    return task, preset["pages"], "pages"
+
+
+def prepare_headings(workdir, preset, options):
+    from Ocr2.src.document_structure.heading_paragraph_analysis import (analyze_headings_and_paragraphs,
+                                                                       extract_text_blocks)
+
+    page_paths = make_page_images(os.path.join(workdir, "pages"), preset["pages"], preset["page_size"])
+
+    def task():
+        for path in page_paths:
+            analyze_headings_and_paragraphs(extract_text_blocks(path))
+
+    return task, preset["pages"], "pages"
+
+
+def prepare_ner(workdir, preset, options):
+    from Ocr2.src.extraction.extract_key_data import extract_entities, load_ner_model
+
+    nlp = load_ner_model()
+    text = make_text(preset["words"])
+
+    def task():
+        extract_entities(text, nlp)
+
+    return task, preset["words"], "words"
+
+
+def prepare_spellcheck(workdir, preset, options):
+    from Ocr2.src.extraction.spelling_punctuation_check import check_text
+
+    text = make_text(preset["words"])
+
+    def task():
+        check_text(text, "en-US")
+
+    return task, preset["words"], "words"
+
+
+def prepare_docx(workdir, preset, options):
+    from Ocr2.src.ocr.multi_page_processing import process_docx
+
+    docx_path = make_docx(os.path.join(workdir, "document.docx"), make_text(preset["words"]))
+    output_dir = os.path.join(workdir, "docx")
+
+    def task():
+        process_docx(docx_path, output_dir)
+
+    return task, preset["words"], "words"
+
+
+STAGES = {
+    "ocr": prepare_ocr,
+    "pdf": prepare_pdf,
+    "classify": prepare_classify,
+    "tables": prepare_tables,
+    "headings": prepare_headings,
+    "ner": prepare_ner,
+    "spellcheck": prepare_spellcheck,
+    "docx": prepare_docx,
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_stage(stage, size, repeats=5, warmup=1, options=None):
+    """
+    Замеряет стадию на синтетических данных заданного размера. Генерация данных и прогрев
+    (загрузка моделей) не входят в задержки, но входят в пиковую память.
+    :param stage: Имя стадии из STAGES.
+    :param size: Имя размера из SIZE_PRESETS.
+    :param repeats: Количество замеряемых прогонов.
+    :param warmup: Количество прогревочных прогонов.
+    :param options: Параметры стадий: workers, ocr_mode, model_path.
+    :return: Словарь с задержками p50/p95, пропускной способностью и пиковым RSS.
+    """
+    from Ocr2.src.utils.result_cache import get_result_cache
+
+    # Кэш результатов отключается: каждый прогон выполняет работу заново
+    get_result_cache().enabled = False
+    options = {"workers": 4, "ocr_mode": "thread", "model_path": None, **(options or {})}
+    with tempfile.TemporaryDirectory(prefix=f"bench_{stage}_") as workdir:
+        task, items, unit = STAGES[stage](workdir, SIZE_PRESETS[size], options)
+        for _ in range(warmup):
+            task()
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            task()
+            latencies.append(time.perf_counter() - start)
+
+    return {
+        "stage": stage,
+        "size": size,
+        "items": items,
+        "unit": unit,
+        "repeats": repeats,
+        "mean_s": round(float(np.mean(latencies)), 4),
+        "p50_s": round(float(np.percentile(latencies, 50)), 4),
+        "p95_s": round(float(np.percentile(latencies, 95)), 4),
+        "throughput": round(items / float(np.mean(latencies)), 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_suite(stages, sizes, repeats=5, warmup=1, options=None, isolate=True):
+    """
+    Запускает стадии на всех размерах. При isolate каждая пара (стадия, размер) выполняется
+    в отдельном процессе, чтобы пиковый RSS и загруженные модели не смешивались между стадиями.
+    :return: Список результатов; упавшие стадии записываются с полем "error".
+    """
+    results = []
+    for stage in stages:
+        for size in sizes:
+            try:
+                if isolate:
+                    with multiprocessing.get_context("spawn").Pool(1) as pool:
+                        result = pool.apply(run_stage, (stage, size, repeats, warmup, options))
+                else:
+                    result = run_stage(stage, size, repeats, warmup, options)
+                print(f"{stage:>10} {size:>6}: p50 {result['p50_s']} с, p95 {result['p95_s']} с, "
+                      f"{result['throughput']} {result['unit']}/с, RSS {result['peak_rss_mb']} МБ")
+            except Exception as e:
+                result = {"stage": stage, "size": size, "error": f"{type(e).__name__}: {e}"}
+                print(f"{stage:>10} {size:>6}: ошибка — {result['error']}")
+            results.append(result)
+    return results
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Сравнивает результаты с базовой линией по (стадия, размер).
+    :param threshold: Допустимое относительное ухудшение метрики (0.1 — 10%).
+    :return: Список регрессий {"stage", "size", "metric", "baseline", "current", "change"}.
+    """
+    baseline_by_key = {(result["stage"], result["size"]): result for result in baseline if "error" not in result}
+    regressions = []
+    for result in current:
+        reference = baseline_by_key.get((result["stage"], result["size"]))
+        if reference is None:
+            continue
+        if "error" in result:
+            # Стадия, работавшая в базовой линии, теперь падает
+            regressions.append({"stage": result["stage"], "size": result["size"], "metric": "error",
+                                "baseline": None, "current": result["error"], "change": None})
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            if not reference.get(metric):
+                continue
+            change = (result[metric] - reference[metric]) / reference[metric]
+            if (change if higher_is_worse else -change) > threshold:
+                regressions.append({"stage": result["stage"], "size": result["size"], "metric": metric,
+                                    "baseline": reference[metric], "current": result[metric],
+                                    "change": round(change, 3)})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк стадий пайплайна на синтетических документах")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Стадии через запятую")
+    parser.add_argument("--sizes", default="small,medium", help=f"Размеры через запятую из {list(SIZE_PRESETS)}")
+    parser.add_argument("--repeats", type=int, default=5, help="Замеряемых прогонов на стадию")
+    parser.add_argument("--warmup", type=int, default=1, help="Прогревочных прогонов на стадию")
+    parser.add_argument("--workers", type=int, default=4, help="Рабочих OCR")
+    parser.add_argument("--ocr-mode", default="thread", help="Режим OcrExecutor для стадии ocr")
+    parser.add_argument("--model-path", default=None, help="Модель классификатора (по умолчанию случайные веса)")
+    parser.add_argument("--no-isolate", action="store_true", help="Запускать стадии в текущем процессе")
+    add_output_argument(parser)
+    parser.add_argument("--current", default=None, help="Готовый JSON результатов вместо запуска (для сравнения)")
+    parser.add_argument("--compare", default=None, help="JSON базовой линии для поиска регрессий")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Допустимое ухудшение (доля)")
+    args = parser.parse_args()
+
+    if args.current:
+        with open(args.current, "r", encoding="utf-8") as f:
+            suite = json.load(f)
+    else:
+        stage_names = args.stages.split(",")
+        size_names = args.sizes.split(",")
+        unknown = [name for name in stage_names if name not in STAGES] + \
+                  [name for name in size_names if name not in SIZE_PRESETS]
+        if unknown:
+            parser.error(f"Неизвестные стадии или размеры: {unknown}")
+        suite_options = {"workers": args.workers, "ocr_mode": args.ocr_mode, "model_path": args.model_path}
+        suite = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {"repeats": args.repeats, "warmup": args.warmup, "sizes": size_names, **suite_options},
+            "results": run_suite(stage_names, size_names, args.repeats, args.warmup, suite_options,
+                                 isolate=not args.no_isolate),
+        }
+
+    save_results(args.output, suite["results"], **{key: value for key, value in suite.items() if key != "results"})
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline_suite = json.load(f)
+        found = compare_results(suite["results"], baseline_suite["results"], args.threshold)
+        for regression in found:
+            change = "" if regression["change"] is None else f" ({regression['change']:+.1%})"
+            print(f"РЕГРЕССИЯ {regression['stage']} {regression['size']} {regression['metric']}: "
+                  f"{regression['baseline']} -> {regression['current']}{change}")
+        if found:
+            sys.exit(1)
+        print(f"Регрессий относительно {args.compare} нет (порог {args.threshold:.0%})")
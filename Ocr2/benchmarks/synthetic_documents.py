@@ -0,0 +1,171 @@
+import os
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from docx import Document
+
+WORDS = ["invoice", "total", "amount", "date", "report", "budget", "memo", "letter", "customer", "payment",
+         "contract", "delivery", "account", "balance", "service", "order", "number", "period", "address", "tax"]
+# Предложения с сущностями для NER
+ENTITY_SENTENCES = [
+    "John Smith signed the contract with Acme Corporation in London on 12 March 2023.",
+    "The invoice from Globex Ltd was paid by Maria Garcia on 5 June 2022 in Berlin.",
+    "Initech opened an office in New York and hired Peter Gibbons in January 2021.",
+    "Umbrella Group transferred 25,000 dollars to Wayne Enterprises on 1 April 2020.",
+]
+# Типичные опечатки для проверки орфографии
+MISSPELLINGS = {"invoice": "invoise", "payment": "paymant", "address": "adress", "delivery": "delivry",
+                "balance": "ballance", "service": "servise"}
+# TrueType-шрифт страниц: растровый шрифт Pillow по умолчанию слишком мелок для OCR
+FONT_NAME = "DejaVuSans.ttf"
+
+
+def make_text(word_count, seed=0, misspell_ratio=0.02):
+    """
+    Генерирует воспроизводимый текст из предложений словаря WORDS, перемежаемых предложениями
+    с сущностями; часть слов заменяется опечатками.
+    :param word_count: Примерное количество слов.
+    :param seed: Зерно генератора.
+    :param misspell_ratio: Доля слов с опечатками.
+    :return: Текст, абзацы разделены пустой строкой.
+    """
+    rng = np.random.default_rng(seed)
+    sentences, words_total = [], 0
+    while words_total < word_count:
+        if len(sentences) % 5 == 4:
+            sentence = ENTITY_SENTENCES[len(sentences) // 5 % len(ENTITY_SENTENCES)]
+        else:
+            words = [str(word) for word in rng.choice(WORDS, size=int(rng.integers(8, 16)))]
+            words = [MISSPELLINGS.get(word, word) if rng.random() < misspell_ratio else word for word in words]
+            sentence = " ".join(words).capitalize() + "."
+        sentences.append(sentence)
+        words_total += len(sentence.split())
+    paragraphs = [" ".join(sentences[i:i + 6]) for i in range(0, len(sentences), 6)]
+    return "\n\n".join(paragraphs)
+
+
+def page_font_size(height):
+    """
+    Кегль около 12 pt при 300 dpi: высота текста пропорциональна высоте страницы.
+    """
+    return max(12, height // 70)
+
+
+def load_font(size):
+    """
+    TrueType-шрифт FONT_NAME заданного кегля; без него — растровый шрифт Pillow (в Pillow 9.5
+    кегль не задается, текст получится мелким для OCR).
+    """
+    try:
+        return ImageFont.truetype(FONT_NAME, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def render_text_page(size=(2480, 3508), seed=0, lines=None, words_per_line=6, font_size=None, origin=None,
+                     mode="RGB", noise=0.0, words=WORDS):
+    """
+    Рисует страницу со строками случайных слов — общий генератор страниц бенчмарков.
+    :param size: Размер страницы в пикселях (по умолчанию A4 при 300 dpi).
+    :param seed: Зерно генератора слов и шума.
+    :param lines: Количество строк; по умолчанию столько, сколько помещается на странице.
+    :param words_per_line: Слов в строке.
+    :param font_size: Кегль в пикселях; по умолчанию page_font_size().
+    :param origin: Левый верхний угол текста (x, y); по умолчанию отступ в два кегля.
+    :param mode: "RGB" или "L" (серая страница).
+    :param noise: Стандартное отклонение гауссова шума (0 — без шума).
+    :param words: Словарь слов.
+    :return: Пара (массив uint8 страницы, эталонный текст строк через пробел).
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    font_size = font_size or page_font_size(height)
+    line_step = font_size * 2
+    x, y = origin or (font_size * 2, font_size * 2)
+    if lines is None:
+        lines = max(1, (height - y - font_size * 2) // line_step)
+    font = load_font(font_size)
+    image = Image.new(mode, size, color=255 if mode == "L" else (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    text_lines = []
+    for line in range(lines):
+        text = " ".join(str(word) for word in rng.choice(words, size=words_per_line))
+        draw.text((x, y + line * line_step), text, fill=0 if mode == "L" else (0, 0, 0), font=font)
+        text_lines.append(text)
+    page = np.asarray(image)
+    if noise:
+        page = np.clip(page.astype(np.int16) + rng.normal(0, noise, size=page.shape).astype(np.int16), 0, 255)
+        page = page.astype(np.uint8)
+    return page, " ".join(text_lines)
+
+
+def make_text_pages(count, size=(2480, 3508), seed=0, **options):
+    """
+    Несколько страниц render_text_page с зернами seed, seed + 1, ...
+    :return: Список пар (массив страницы, эталонный текст).
+    """
+    return [render_text_page(size, seed=seed + index, **options) for index in range(count)]
+
+
+def make_page_images(output_dir, count, image_size=(1240, 1754), seed=0):
+    """
+    Сохраняет страницы render_text_page в PNG.
+    :return: Список путей к PNG.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for index, (page, _) in enumerate(make_text_pages(count, image_size, seed=seed)):
+        page_path = os.path.join(output_dir, f"page_{index + 1:03d}.png")
+        Image.fromarray(page).save(page_path)
+        paths.append(page_path)
+    return paths
+
+
+def make_pdf(pdf_path, page_paths, dpi=150):
+    """
+    Собирает PDF из изображений страниц (без текстового слоя — все страницы идут на OCR).
+    :param dpi: Разрешение страниц в PDF; при рендеринге с тем же dpi размер страниц сохраняется.
+    """
+    pages = [Image.open(path).convert("RGB") for path in page_paths]
+    pages[0].save(pdf_path, save_all=True, append_images=pages[1:], resolution=dpi)
+    return pdf_path
+
+
+def make_docx(docx_path, text):
+    """
+    Сохраняет текст в DOCX, по абзацу на каждый блок, разделенный пустой строкой.
+    """
+    document = Document()
+    for paragraph in text.split("\n\n"):
+        document.add_paragraph(paragraph)
+    document.save(docx_path)
+    return docx_path
+
+
+def make_table_image(image_path, rows, cols, image_size=(1240, 1754), seed=0):
+    """
+    Рисует таблицу с линиями сетки и текстом в ячейках.
+    :return: Путь к изображению.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = image_size
+    image = Image.new("RGB", image_size, color=(255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    font_size = page_font_size(height)
+    font = load_font(font_size)
+    left, top = 60, 60
+    cell_width = (width - 2 * left) // cols
+    cell_height = min(max(60, font_size * 2), (height - 2 * top) // rows)
+    for row in range(rows + 1):
+        y = top + row * cell_height
+        draw.line([(left, y), (left + cols * cell_width, y)], fill=(0, 0, 0), width=2)
+    for col in range(cols + 1):
+        x = left + col * cell_width
+        draw.line([(x, top), (x, top + rows * cell_height)], fill=(0, 0, 0), width=2)
+    for row in range(rows):
+        for col in range(cols):
+            text = str(rng.choice(WORDS)) if row == 0 or col == 0 else f"{rng.integers(1, 100000)}"
+            draw.text((left + col * cell_width + 10, top + row * cell_height + (cell_height - font_size) // 2), text,
+                      fill=(0, 0, 0), font=font)
+    image.save(image_path)
+    return image_path
@@ -1,35 +1,329 @@
-from flask import Flask, request, jsonify
+import time
+
+_APP_IMPORT_START = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify
+from werkzeug.utils import secure_filename
+import io
 import os
-import torch
-from Ocr2.src.document_structure.extract_tables import extract_table_data
-from Ocr2.src.document_structure.heading_paragraph_analysis import process_document
+import json
+import uuid
+import logging
+from Ocr2.src.api.jobs import JobManager, JobStore, QueueFullError, PRIORITY_HIGH, PRIORITY_LOW
+from Ocr2.src.api.lazy_loading import LazyRegistry
+from Ocr2.src.ocr.reader_pool import get_reader_pool, reader_pool_stats
+from Ocr2.src.utils.logging_config import configure_logging, request_id_var
+from Ocr2.src.utils.metrics import REGISTRY, STAGE_LATENCY_BUCKETS, count_pages, stage_timer
+from Ocr2.src.utils.result_cache import get_result_cache
 
-from Ocr2.src.ocr.easyocr_inference import ocr_with_easyocr
-from Ocr2.src.ocr.multi_page_processing import process_pdf, process_docx
-from Ocr2.src.classification.predict_category import load_model, predict_category
-from Ocr2.src.extraction.extract_key_data import process_ocr_results
-from Ocr2.src.extraction.spelling_punctuation_check import check_spelling_and_punctuation
+configure_logging()
 
 UPLOAD_FOLDER = "uploads"
 OUTPUT_FOLDER = "output"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-# Глобальная загрузка модели
-MODEL_PATH = "models/classifier_model.pth"
+MODEL_PATH = os.environ.get("CLASSIFIER_MODEL_PATH", "models/classifier_model.pth")
 LABEL_CLASSES = ['advertisement', 'budget', 'email', 'file folder', 'form',
                  'handwritten', 'invoice', 'letter', 'memo', 'news article',
                  'questionnaire', 'resume', 'scientific publication', 'scientific report', 'specification']
-EXECUTION_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-CLASSIFICATION_MODEL = load_model(MODEL_PATH, num_classes=len(LABEL_CLASSES), execution_device=EXECUTION_DEVICE)
+
+# Общий пул EasyOCR: ридеры загружаются при первом OCR-запросе и переиспользуются
+OCR_LANGUAGES = ('en', 'ru')
+OCR_READER_POOL_SIZE = int(os.environ.get("OCR_READER_POOL_SIZE", 2))
+# Сколько отрендеренных страниц PDF может ждать OCR (ограничивает пиковую память)
+OCR_PDF_PAGE_WINDOW = int(os.environ.get("OCR_PDF_PAGE_WINDOW", 2))
+
+# Микробатчинг /classify: максимальный размер батча и время добора
+CLASSIFY_MAX_BATCH_SIZE = int(os.environ.get("CLASSIFY_MAX_BATCH_SIZE", 16))
+CLASSIFY_MAX_WAIT_MS = float(os.environ.get("CLASSIFY_MAX_WAIT_MS", 10))
+# Наибольший batch_size, принимаемый /classify_batch
+CLASSIFY_BATCH_SIZE_LIMIT = int(os.environ.get("CLASSIFY_BATCH_SIZE_LIMIT", 256))
+
+# Максимальный размер документа, загружаемого в теле запроса
+MAX_UPLOAD_MB = int(os.environ.get("OCR_MAX_UPLOAD_MB", 100))
+
+# Извлечение сущностей: размер батча и число процессов nlp.pipe
+NER_BATCH_SIZE = int(os.environ.get("NER_BATCH_SIZE", 64))
+NER_PROCESSES = int(os.environ.get("NER_PROCESSES", 1))
+
+# Язык проверки орфографии; сервер LanguageTool живет все время работы API
+SPELLCHECK_LANG = os.environ.get("SPELLCHECK_LANG", "en-US")
+
+# Асинхронные задачи: хранилище состояния, число рабочих потоков и глубина очереди
+JOBS_DB_PATH = os.path.join(OUTPUT_FOLDER, "jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("OCR_JOB_WORKERS", 2))
+JOB_MAX_QUEUE_DEPTH = int(os.environ.get("OCR_JOB_MAX_QUEUE_DEPTH", 32))
+# Документы меньше этого размера получают повышенный приоритет
+SMALL_DOCUMENT_BYTES = 2 * 1024 * 1024
+
+# Режим запуска: "lazy" — тяжелые зависимости грузятся при первом обращении к эндпоинту,
+# "eager" — все загружается до старта сервера.
+STARTUP_MODE = os.environ.get("OCR_STARTUP_MODE", "lazy")
+# Ресурсы для фонового прогрева, через запятую (например, "classifier,easyocr_reader")
+WARMUP_RESOURCES = [name.strip() for name in os.environ.get("OCR_WARMUP", "").split(",") if name.strip()]
+
+# Метрики HTTP: запросы и задержки по эндпоинтам, запросы в обработке
+HTTP_REQUESTS = REGISTRY.counter("ocr_http_requests_total", "HTTP-запросы по эндпоинтам",
+                                 ("endpoint", "method", "status"))
+HTTP_LATENCY = REGISTRY.histogram("ocr_http_request_duration_seconds", "Время обработки HTTP-запросов, с",
+                                  ("endpoint",), buckets=STAGE_LATENCY_BUCKETS)
+HTTP_IN_FLIGHT = REGISTRY.gauge("ocr_http_requests_in_flight", "HTTP-запросы в обработке").labels()
+
+
+def _load_classifier():
+    import torch
+
+    predict_module = resources.get("predict_category")
+    execution_device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = predict_module.load_model(MODEL_PATH, num_classes=len(LABEL_CLASSES), execution_device=execution_device)
+    return model, execution_device
+
+
+def _load_classify_batcher():
+    batching_module = resources.get("micro_batching")
+    classification_model, execution_device = resources.get("classifier")
+    return batching_module.MicroBatcher(classification_model, execution_device, LABEL_CLASSES,
+                                        max_batch_size=CLASSIFY_MAX_BATCH_SIZE, max_wait_ms=CLASSIFY_MAX_WAIT_MS)
+
+
+def _load_easyocr_reader():
+    pool = get_reader_pool(OCR_LANGUAGES, max_size=OCR_READER_POOL_SIZE)
+    pool.warmup()
+    return pool
+
+
+# Ленивые ресурсы: модули со стадиями обработки и модели
+resources = LazyRegistry()
+resources.module("predict_category", "Ocr2.src.classification.predict_category")
+resources.module("micro_batching", "Ocr2.src.classification.micro_batching")
+resources.module("easyocr_inference", "Ocr2.src.ocr.easyocr_inference")
+resources.module("multi_page_processing", "Ocr2.src.ocr.multi_page_processing")
+resources.module("extract_tables", "Ocr2.src.document_structure.extract_tables")
+resources.module("heading_paragraph_analysis", "Ocr2.src.document_structure.heading_paragraph_analysis")
+resources.module("structure_analysis", "Ocr2.src.document_structure.structure_analysis")
+resources.module("extract_key_data", "Ocr2.src.extraction.extract_key_data")
+resources.module("spelling_punctuation_check", "Ocr2.src.extraction.spelling_punctuation_check")
+resources.module("document_pipeline", "Ocr2.src.pipeline.document_pipeline")
+resources.register("classifier", _load_classifier)
+resources.register("classify_batcher", _load_classify_batcher)
+resources.register("easyocr_reader", _load_easyocr_reader)
+resources.register("ner_model", lambda: resources.get("extract_key_data").load_ner_model())
+resources.register("language_tool", lambda: resources.get("spelling_punctuation_check").get_language_tool(SPELLCHECK_LANG))
+
+
+def _ocr_job(params, report_progress):
+    """
+    OCR документа: PDF постранично с отчетом о прогрессе, DOCX и изображения целиком.
+    """
+    file_path = params["file_path"]
+    output_path = os.path.join(OUTPUT_FOLDER, "ocr_results")
+    os.makedirs(output_path, exist_ok=True)
+
+    if file_path.endswith(".pdf"):
+        resources.get("easyocr_reader", endpoint="ocr")
+        pages_module = resources.get("multi_page_processing", endpoint="ocr")
+        pages_total = pages_module.count_pdf_pages(file_path)
+        pages_done = []
+
+        def on_page(page_result):
+            pages_done.append(page_result["page"])
+            report_progress({"pages_total": pages_total, "pages_done": len(pages_done),
+                             "last_page": page_result["page"]})
+
+        pages = pages_module.process_pdf(file_path, output_path, languages=OCR_LANGUAGES,
+                                         page_window=OCR_PDF_PAGE_WINDOW, on_page=on_page)
+        return {"output_path": output_path, "pages": pages}
+    elif file_path.endswith(".docx"):
+        pages_module = resources.get("multi_page_processing", endpoint="ocr")
+        pages_module.process_docx(file_path, output_path)
+    else:
+        # Обрабатывается только переданный файл, а не вся папка загрузки
+        resources.get("easyocr_reader", endpoint="ocr")
+        ocr_module = resources.get("easyocr_inference", endpoint="ocr")
+        ocr_module.process_image(None, file_path, output_path, languages=OCR_LANGUAGES)
+    return {"output_path": output_path}
+
+
+def _extract_job(params, report_progress):
+    output_path = os.path.join(OUTPUT_FOLDER, "extracted_data")
+    extraction_module = resources.get("extract_key_data", endpoint="extract")
+    nlp = resources.get("ner_model", endpoint="extract")
+    stats = extraction_module.process_ocr_results(params["ocr_results_dir"], output_path,
+                                                  batch_size=NER_BATCH_SIZE, n_process=NER_PROCESSES, nlp=nlp)
+    return {"output_path": output_path, "stats": stats}
+
+
+def _collect_runtime_metrics():
+    """
+    Метрики, которые уже считаются кэшем, пулами ридеров, реестром ресурсов и очередью задач;
+    снимаются только в момент выгрузки /metrics.
+    """
+    cache = get_result_cache().stats()
+    resource_status = resources.status()["resources"]
+    pools = reader_pool_stats()
+    return [
+        ("ocr_cache_lookups_total", "counter", "Обращения к кэшу результатов",
+         [({"result": "memory_hit"}, cache["memory_hits"]), ({"result": "disk_hit"}, cache["disk_hits"]),
+          ({"result": "miss"}, cache["misses"])]),
+        ("ocr_cache_hit_ratio", "gauge", "Доля попаданий в кэш результатов", [({}, cache["hit_ratio"])]),
+        ("ocr_cache_disk_bytes", "gauge", "Размер кэша результатов на диске, байт", [({}, cache["disk_bytes"])]),
+        ("ocr_resource_loaded", "gauge", "Загружен ли модуль или модель",
+         [({"resource": name, "kind": status["kind"]}, int(status["loaded"]))
+          for name, status in resource_status.items()]),
+        ("ocr_resource_load_seconds", "gauge", "Время загрузки модулей и моделей, с",
+         [({"resource": name, "kind": status["kind"]}, status["load_time_s"])
+          for name, status in resource_status.items()]),
+        ("ocr_reader_pool_readers", "gauge", "Ридеры EasyOCR в пуле",
+         [({"languages": ",".join(pool["languages"]), "state": state}, pool[state])
+          for pool in pools for state in ("idle", "in_use")]),
+        ("ocr_reader_load_seconds_total", "counter", "Суммарное время загрузки easyocr.Reader, с",
+         [({"languages": ",".join(pool["languages"])}, pool["load_time_s"]) for pool in pools]),
+        ("ocr_reader_wait_seconds_total", "counter", "Суммарное ожидание свободного easyocr.Reader, с",
+         [({"languages": ",".join(pool["languages"])}, pool["wait_time_s"]) for pool in pools]),
+        ("ocr_job_queue_depth", "gauge", "Задачи в очереди", [({}, jobs.queue_depth())]),
+    ]
+
+
+REGISTRY.add_collector(_collect_runtime_metrics)
+
+
+def _document_priority(path):
+    if os.path.isfile(path) and os.path.getsize(path) <= SMALL_DOCUMENT_BYTES:
+        return PRIORITY_HIGH
+    return PRIORITY_LOW
+
+
+JOB_HANDLERS = {"ocr": _ocr_job, "extract": _extract_job}
+JOB_INPUTS = {"ocr": "file_path", "extract": "ocr_results_dir"}
+jobs = JobManager(JobStore(JOBS_DB_PATH), JOB_HANDLERS, num_workers=JOB_WORKERS, max_queue_depth=JOB_MAX_QUEUE_DEPTH)
+
+
+def _int_param(value, name, minimum, maximum):
+    """
+    Разбирает целочисленный параметр запроса.
+    :return: Кортеж (значение, None) или (None, ответ 400 с описанием ошибки).
+    """
+    try:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError
+        value = int(value)
+    except (TypeError, ValueError):
+        return None, (jsonify({"error": f"{name} must be an integer"}), 400)
+    if not minimum <= value <= maximum:
+        return None, (jsonify({"error": f"{name} must be between {minimum} and {maximum}"}), 400)
+    return value, None
+
+
+def _submit_job(kind, params, priority=None):
+    if priority is None:
+        priority = _document_priority(params[JOB_INPUTS[kind]])
+    try:
+        job_id = jobs.submit(kind, params, priority=priority)
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 429
+    return jsonify({"message": "Задача поставлена в очередь", "job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+
+def _ocr_upload():
+    """
+    OCR документа из тела запроса (multipart-поле "file" или сырые байты) полностью в памяти.
+    Текст и координаты возвращаются в ответе; на диск результат пишется только при save=1.
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        data = upload.read()
+        file_name = upload.filename or ""
+    else:
+        data = request.get_data()
+        file_name = request.args.get("filename", "")
+    if not data:
+        return jsonify({"error": "Empty upload"}), 400
+
+    save = (request.values.get("save") or "").lower() in ("1", "true", "yes")
+
+    if data[:5] == b"%PDF-":
+        resources.get("easyocr_reader", endpoint="ocr")
+        pages_module = resources.get("multi_page_processing", endpoint="ocr")
+        pages = pages_module.ocr_pdf_bytes(data, languages=OCR_LANGUAGES, page_window=OCR_PDF_PAGE_WINDOW)
+    elif data[:2] == b"PK" and file_name.lower().endswith(".docx"):
+        pages_module = resources.get("multi_page_processing", endpoint="ocr")
+        paragraphs = pages_module.read_docx_paragraphs(io.BytesIO(data))
+        pages = [{"page": 1, "text": [text for _, text in paragraphs], "boxes": []}]
+        count_pages(source="docx")
+    else:
+        resources.get("easyocr_reader", endpoint="ocr")
+        ocr_module = resources.get("easyocr_inference", endpoint="ocr")
+        try:
+            image = ocr_module.decode_image_bytes(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        boxes = ocr_module.ocr_image_array(image, OCR_LANGUAGES)
+        pages = [{"page": 1, "text": [box["text"] for box in boxes], "boxes": boxes}]
+        count_pages()
+
+    response = {"message": "OCR завершен", "file": file_name, "pages": pages}
+    if save:
+        output_path = os.path.join(OUTPUT_FOLDER, "ocr_results")
+        os.makedirs(output_path, exist_ok=True)
+        base_name = os.path.splitext(secure_filename(file_name))[0] or "upload"
+        result_path = os.path.join(output_path, f"{base_name}.json")
+        with stage_timer("write"), open(result_path, "w", encoding="utf-8") as f:
+            # Верхнеуровневый "text" — формат результатов OCR, который читают /extract и /spellcheck
+            json.dump({"file": file_name, "text": [line for page in pages for line in page["text"]], "pages": pages},
+                      f, ensure_ascii=False, indent=4)  # type: ignore
+        response["output_path"] = result_path
+    return jsonify(response), 200
 
 
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_MB * 1024 * 1024
+
+
+@app.before_request
+def _start_request():
+    # Идентификатор запроса берется из заголовка X-Request-ID или создается; он попадает во все логи запроса
+    g.request_start = time.perf_counter()
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    g.request_id_token = request_id_var.set(g.request_id)
+    HTTP_IN_FLIGHT.inc()
+
+
+@app.after_request
+def _finish_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    elapsed = time.perf_counter() - g.request_start
+    HTTP_REQUESTS.labels(endpoint=endpoint, method=request.method, status=response.status_code).inc()
+    HTTP_LATENCY.labels(endpoint=endpoint).observe(elapsed)
+    response.headers["X-Request-ID"] = g.request_id
+    if endpoint != "/metrics":
+        logging.info("Запрос обработан", extra={"endpoint": endpoint, "method": request.method,
+                                                "status": response.status_code,
+                                                "duration_ms": round(elapsed * 1000, 2)})
+    return response
+
+
+@app.teardown_request
+def _end_request(error=None):
+    if "request_start" in g:
+        HTTP_IN_FLIGHT.dec()
+        request_id_var.reset(g.request_id_token)
+
 
 @app.route("/")
 def index():
     return jsonify({"message": "OCR, Classification, and Extraction API is running!"})
 
+@app.route("/ready", methods=["GET"])
+def ready():
+    """
+    Готовность сервиса: какие модули и модели загружены, сколько стоила их загрузка по эндпоинтам.
+    """
+    status = resources.status()
+    status["startup_mode"] = STARTUP_MODE
+    status["app_import_s"] = APP_IMPORT_TIME
+    return jsonify(status), 200 if status["ready"] else 503
+
 @app.route("/classify", methods=["POST"])
 def classify():
 
@@ -39,33 +333,126 @@ def classify():
         return jsonify({"error": "Invalid or missing file_path"}), 400
 
     try:
-        category = predict_category(file_path, CLASSIFICATION_MODEL, EXECUTION_DEVICE, LABEL_CLASSES)
+        batcher = resources.get("classify_batcher", endpoint="classify")
+        category = batcher.classify(file_path)
         return jsonify({"message": "Классификация завершена", "category": category})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/classify_batch", methods=["POST"])
+def classify_batch():
+    """
+    Классификация списка изображений батчами.
+    """
+    file_paths = request.json.get("file_paths")
+    batch_size, error = _int_param(request.json.get("batch_size", CLASSIFY_MAX_BATCH_SIZE), "batch_size",
+                                   1, CLASSIFY_BATCH_SIZE_LIMIT)
+    if error:
+        return error
+
+    if not file_paths or not isinstance(file_paths, list):
+        return jsonify({"error": "Invalid or missing file_paths"}), 400
+
+    missing = [path for path in file_paths if not os.path.exists(path)]
+    if missing:
+        return jsonify({"error": "Files not found", "missing": missing}), 400
+
+    try:
+        predict_module = resources.get("predict_category", endpoint="classify_batch")
+        classification_model, execution_device = resources.get("classifier", endpoint="classify_batch")
+        categories = predict_module.predict_categories(file_paths, classification_model, execution_device,
+                                                       LABEL_CLASSES, batch_size=batch_size)
+        results = [{"file_path": path, "category": category} for path, category in zip(file_paths, categories)]
+        return jsonify({"message": "Классификация завершена", "results": results})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/classify/stats", methods=["GET"])
+def classify_stats():
+    """
+    Гистограммы размеров батчей и задержек микробатчинга /classify.
+    """
+    if not resources.is_loaded("classify_batcher"):
+        return jsonify({"message": "Классификатор еще не загружен"}), 200
+    return jsonify(resources.get("classify_batcher").stats()), 200
+
 @app.route("/ocr", methods=["POST"])
 def ocr():
 
+    # Загрузка файла в теле запроса: обработка в памяти без чтения с диска сервера
+    if not request.is_json:
+        try:
+            return _ocr_upload()
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     file_path = request.json.get("file_path")
-    output_path = os.path.join(OUTPUT_FOLDER, "ocr_results")
-    os.makedirs(output_path, exist_ok=True)
 
     if not file_path or not os.path.exists(file_path):
         return jsonify({"error": "Invalid or missing file_path"}), 400
 
+    # Долгие документы можно обработать асинхронно и опрашивать /jobs/<id>
+    if request.json.get("async"):
+        return _submit_job("ocr", {"file_path": file_path})
+
     try:
-        if file_path.endswith(".pdf"):
-            process_pdf(file_path, output_path)
-        elif file_path.endswith(".docx"):
-            process_docx(file_path, output_path)
-        else:
-            ocr_with_easyocr(os.path.dirname(file_path), output_path)
-
-        return jsonify({"message": "OCR завершен", "output_path": output_path}), 200
+        result = _ocr_job({"file_path": file_path}, lambda progress: None)
+        return jsonify({"message": "OCR завершен", "output_path": result["output_path"]}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """
+    Ставит долгую задачу (ocr, extract) в очередь и сразу возвращает ее идентификатор.
+    """
+    kind = request.json.get("type")
+    if kind not in JOB_HANDLERS:
+        return jsonify({"error": f"Unknown job type, expected one of {sorted(JOB_HANDLERS)}"}), 400
+
+    input_name = JOB_INPUTS[kind]
+    input_path = request.json.get(input_name)
+    if not input_path or not os.path.exists(input_path):
+        return jsonify({"error": f"Invalid or missing {input_name}"}), 400
+
+    priority = request.json.get("priority")
+    if priority is not None:
+        priority, error = _int_param(priority, "priority", PRIORITY_HIGH, PRIORITY_LOW)
+        if error:
+            return error
+    return _submit_job(kind, {input_name: input_path}, priority=priority)
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """
+    Состояние задачи: статус, прогресс по страницам и результат после завершения.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Метрики в текстовом формате Prometheus: запросы, задержки, стадии, страницы, кэш, модели.
+    """
+    return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route("/ocr/readers", methods=["GET"])
+def ocr_readers():
+    """
+    Статистика пула EasyOCR: попадания, ожидания, время загрузки моделей.
+    """
+    return jsonify({"pools": reader_pool_stats()}), 200
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """
+    Счетчики попаданий и промахов кэша результатов OCR.
+    """
+    return jsonify(get_result_cache().stats()), 200
+
 @app.route("/spellcheck", methods=["POST"])
 def spellcheck():
 
@@ -77,7 +464,9 @@ def spellcheck():
         return jsonify({"error": "OCR results directory not found"}), 400
 
     try:
-        check_spelling_and_punctuation(ocr_results_dir, output_dir)
+        spelling_module = resources.get("spelling_punctuation_check", endpoint="spellcheck")
+        resources.get("language_tool", endpoint="spellcheck")
+        spelling_module.check_spelling_and_punctuation(ocr_results_dir, output_dir, lang=SPELLCHECK_LANG)
         return jsonify({"message": "Проверка орфографии завершена", "output_path": output_dir}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -93,7 +482,8 @@ def extract_tables():
         return jsonify({"error": "File not found"}), 400
 
     try:
-        extract_table_data(file_path, os.path.join(output_dir, "extracted_table.csv"))
+        tables_module = resources.get("extract_tables", endpoint="extract_tables")
+        tables_module.extract_table_data(file_path, os.path.join(output_dir, "extracted_table.csv"))
         return jsonify({"message": "Таблица извлечена", "output_path": output_dir}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -110,27 +500,98 @@ def analyze_headings():
         return jsonify({"error": "File not found"}), 400
 
     try:
-        process_document(file_path, output_dir)
+        headings_module = resources.get("heading_paragraph_analysis", endpoint="analyze_headings")
+        headings_module.process_document(file_path, output_dir)
         return jsonify({"message": "Анализ заголовков завершен", "output_path": output_dir}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/analyze_structure", methods=["POST"])
+def analyze_structure():
+    """
+    Макет, заголовки/абзацы и таблицы страницы за один общий проход распознавания.
+    """
+    file_path = request.json.get("file_path")
+
+    if not file_path or not os.path.exists(file_path):
+        return jsonify({"error": "File not found"}), 400
+
+    try:
+        structure_module = resources.get("structure_analysis", endpoint="analyze_structure")
+        structure = structure_module.analyze_structure(file_path)
+        return jsonify({"message": "Анализ структуры завершен", **structure}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/extract", methods=["POST"])
 def extract():
     """
     Извлекает ключевые данные из OCR результатов.
     """
     ocr_dir = request.json.get("ocr_results_dir")
-    output_path = os.path.join(OUTPUT_FOLDER, "extracted_data")
 
     if not ocr_dir or not os.path.exists(ocr_dir):
         return jsonify({"error": "OCR results directory not found"}), 400
 
     try:
-        process_ocr_results(ocr_dir, output_path)
-        return jsonify({"message": "Извлечение данных завершено", "output_path": output_path}), 200
+        result = _extract_job({"ocr_results_dir": ocr_dir}, lambda progress: None)
+        return jsonify({"message": "Извлечение данных завершено", **result}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+@app.route("/process", methods=["POST"])
+def process():
+    """
+    Полная обработка одного документа за один запрос: классификация, OCR, орфография, NER,
+    таблицы и заголовки в памяти. Документ передается как multipart-поле "file" или сырыми байтами;
+    стадии выбираются параметром stages (через запятую).
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        data = upload.read()
+        file_name = upload.filename or ""
+    else:
+        data = request.get_data()
+        file_name = request.args.get("filename", "")
+    if not data:
+        return jsonify({"error": "Empty upload"}), 400
+
+    stages_param = request.values.get("stages")
+    stages = [stage.strip() for stage in stages_param.split(",") if stage.strip()] if stages_param else None
+    try:
+        pipeline = resources.get("document_pipeline", endpoint="process")
+        try:
+            stages = pipeline.normalize_stages(stages)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Модели загружаются до начала обработки, чтобы время загрузки не попало во время стадий
+        classifier = resources.get("classify_batcher", endpoint="process") if "classify" in stages else None
+        if "ocr" in stages:
+            resources.get("easyocr_reader", endpoint="process")
+        nlp = resources.get("ner_model", endpoint="process") if "ner" in stages else None
+        if "spellcheck" in stages:
+            resources.get("language_tool", endpoint="process")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    try:
+        result = pipeline.process_document(data, file_name, stages=stages, classifier=classifier,
+                                           languages=OCR_LANGUAGES, spellcheck_lang=SPELLCHECK_LANG, nlp=nlp)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"message": "Обработка завершена", **result}), 200
+
+
+if STARTUP_MODE == "eager":
+    resources.load_all()
+elif WARMUP_RESOURCES:
+    resources.warmup(WARMUP_RESOURCES, background=True)
+
+APP_IMPORT_TIME = round(time.perf_counter() - _APP_IMPORT_START, 4)
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
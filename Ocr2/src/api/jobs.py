@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import sqlite3
+import threading
+
+from Ocr2.src.utils.logging_config import request_id_var
+
+
+PRIORITY_HIGH = 0
+PRIORITY_LOW = 1
+
+
+class QueueFullError(Exception):
+    """
+    Очередь задач заполнена: клиенту следует повторить запрос позже.
+    """
+
+
+class JobStore:
+    """
+    Локальное хранилище состояния задач в SQLite; переживает перезапуск процесса.
+    """
+
+    def __init__(self, db_path):
+        """
+        :param db_path: Путь к файлу базы SQLite.
+        """
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+
+    def insert(self, job_id, kind, params, priority):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO jobs (id, kind, params, priority, status, progress, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), priority, "queued", json.dumps({}), time.time()),
+            )
+
+    def update(self, job_id, **fields):
+        for name in ("progress", "result"):
+            if name in fields:
+                fields[name] = json.dumps(fields[name], ensure_ascii=False)
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connection:
+            self._connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for name in ("params", "progress", "result"):
+            job[name] = json.loads(job[name]) if job[name] else None
+        return job
+
+    def requeue_unfinished(self):
+        """
+        После перезапуска возвращает в очередь задачи, которые стояли в очереди или выполнялись.
+        :return: Список (id, priority, created_at) в порядке постановки.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+            rows = self._connection.execute(
+                "SELECT id, priority, created_at FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [(row["id"], row["priority"], row["created_at"]) for row in rows]
+
+
+class JobManager:
+    """
+    Асинхронное выполнение долгих задач пулом потоков: приоритетная очередь
+    с ограниченной глубиной и хранением состояния в JobStore.
+    """
+
+    def __init__(self, store, handlers, num_workers=2, max_queue_depth=32):
+        """
+        :param store: JobStore.
+        :param handlers: Словарь {тип задачи: функция(params, report_progress) -> результат}.
+        :param num_workers: Количество рабочих потоков.
+        :param max_queue_depth: Максимальное количество задач, ожидающих выполнения.
+        """
+        self.store = store
+        self.handlers = handlers
+        self.max_queue_depth = max_queue_depth
+
+        self._queue = queue.PriorityQueue()
+        self._queued = 0
+        self._queued_lock = threading.Lock()
+        self._sequence = 0
+        # request_id запросов, поставивших задачи: записи лога задачи связываются с запросом
+        self._request_ids = {}
+
+        for job_id, priority, created_at in store.requeue_unfinished():
+            self._enqueue(job_id, priority)
+        if self._queued:
+            logging.info(f"Восстановлено задач из хранилища: {self._queued}")
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"job-worker-{index}", daemon=True)
+            for index in range(max(1, num_workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _enqueue(self, job_id, priority):
+        with self._queued_lock:
+            self._sequence += 1
+            self._queued += 1
+            self._queue.put((priority, self._sequence, job_id))
+
+    def submit(self, kind, params, priority=PRIORITY_LOW):
+        """
+        Ставит задачу в очередь.
+        :param kind: Тип задачи (ключ handlers).
+        :param params: Параметры задачи (JSON-сериализуемые).
+        :param priority: Приоритет: меньшее значение выполняется раньше.
+        :return: Идентификатор задачи.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Неизвестный тип задачи: {kind}")
+
+        job_id = uuid.uuid4().hex
+        with self._queued_lock:
+            if self._queued >= self.max_queue_depth:
+                raise QueueFullError(f"Очередь задач заполнена ({self.max_queue_depth})")
+            self.store.insert(job_id, kind, params, priority)
+            self._request_ids[job_id] = request_id_var.get()
+            self._sequence += 1
+            self._queued += 1
+            self._queue.put((priority, self._sequence, job_id))
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def queue_depth(self):
+        with self._queued_lock:
+            return self._queued
+
+    def _worker(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            with self._queued_lock:
+                self._queued -= 1
+                request_id = self._request_ids.pop(job_id, None)
+            # Задачи, восстановленные после перезапуска, помечаются своим идентификатором
+            request_id_var.set(request_id or job_id)
+
+            job = self.store.get(job_id)
+            if job is None or job["status"] != "queued":
+                continue
+
+            self.store.update(job_id, status="running", started_at=time.time())
+
+            def report_progress(progress, job_id=job_id):
+                self.store.update(job_id, progress=progress)
+
+            try:
+                result = self.handlers[job["kind"]](job["params"], report_progress)
+            except Exception as e:
+                logging.error(f"Задача {job_id} завершилась с ошибкой: {e}")
+                self.store.update(job_id, status="failed", error=str(e), finished_at=time.time())
+                continue
+
+            self.store.update(job_id, status="done", result=result, finished_at=time.time())
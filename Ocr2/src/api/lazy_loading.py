@@ -0,0 +1,159 @@
+import time
+import logging
+import importlib
+import threading
+
+
+class LazyResource:
+    """
+    Ресурс (модуль или модель), который загружается при первом обращении.
+    """
+
+    def __init__(self, name, loader, kind="model"):
+        """
+        :param name: Имя ресурса.
+        :param loader: Функция без аргументов, возвращающая загруженный ресурс.
+        :param kind: Тип ресурса: "import" (импорт модуля) или "model" (загрузка модели).
+        """
+        self.name = name
+        self.kind = kind
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded = False
+        self._loading = False
+        self._load_time = None
+        self._error = None
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        """
+        Возвращает ресурс, загружая его при первом вызове.
+        :return: Кортеж (ресурс, время загрузки в этом вызове; 0.0 если ресурс уже был загружен).
+        """
+        if self._loaded:
+            return self._value, 0.0
+
+        with self._lock:
+            if self._loaded:
+                return self._value, 0.0
+
+            self._loading = True
+            start = time.perf_counter()
+            try:
+                self._value = self._loader()
+            except Exception as e:
+                self._error = str(e)
+                raise
+            finally:
+                self._loading = False
+            elapsed = time.perf_counter() - start
+
+            self._load_time = elapsed
+            self._error = None
+            self._loaded = True
+            logging.info(f"Ресурс '{self.name}' загружен за {elapsed:.2f} с")
+            return self._value, elapsed
+
+    def status(self):
+        return {
+            "kind": self.kind,
+            "loaded": self._loaded,
+            "loading": self._loading,
+            "load_time_s": None if self._load_time is None else round(self._load_time, 4),
+            "error": self._error,
+        }
+
+
+class LazyRegistry:
+    """
+    Реестр ленивых ресурсов API: учитывает время импорта и загрузки для каждого эндпоинта.
+    """
+
+    def __init__(self):
+        self._resources = {}
+        self._endpoint_costs = {}
+        self._costs_lock = threading.Lock()
+        self._warmup_names = []
+
+    def register(self, name, loader, kind="model"):
+        self._resources[name] = LazyResource(name, loader, kind)
+
+    def module(self, name, module_path):
+        """
+        Регистрирует ленивый импорт модуля.
+        :param name: Имя ресурса.
+        :param module_path: Полное имя модуля для importlib.
+        """
+        self.register(name, lambda: importlib.import_module(module_path), kind="import")
+
+    def get(self, name, endpoint=None):
+        """
+        Возвращает ресурс; если он загружался в этом вызове, время относится к эндпоинту.
+        :param name: Имя ресурса.
+        :param endpoint: Имя эндпоинта, которому засчитывается время загрузки.
+        """
+        resource = self._resources[name]
+        value, elapsed = resource.get()
+        if endpoint is not None:
+            with self._costs_lock:
+                costs = self._endpoint_costs.setdefault(endpoint, {"import_s": 0.0, "load_s": 0.0, "resources": []})
+                if name not in costs["resources"]:
+                    costs["resources"].append(name)
+                if elapsed:
+                    key = "import_s" if resource.kind == "import" else "load_s"
+                    costs[key] = round(costs[key] + elapsed, 4)
+        return value
+
+    def is_loaded(self, name):
+        return self._resources[name].loaded
+
+    def load_all(self):
+        for name in self._resources:
+            self.get(name)
+
+    def _warmup_worker(self, names):
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                logging.error(f"Ошибка прогрева ресурса '{name}': {e}")
+
+    def warmup(self, names, background=True):
+        """
+        Загружает указанные ресурсы заранее, по умолчанию в фоновом потоке.
+        :param names: Имена ресурсов для прогрева.
+        :param background: Выполнять ли прогрев в отдельном потоке.
+        """
+        names = [name for name in names if name]
+        unknown = [name for name in names if name not in self._resources]
+        if unknown:
+            raise KeyError(f"Неизвестные ресурсы для прогрева: {unknown}")
+
+        self._warmup_names = names
+        if background:
+            thread = threading.Thread(target=self._warmup_worker, args=(names,), name="warmup", daemon=True)
+            thread.start()
+            return thread
+        self._warmup_worker(names)
+        return None
+
+    def is_ready(self):
+        """
+        Готовность: все ресурсы, заявленные для прогрева, загружены.
+        """
+        return all(self._resources[name].loaded for name in self._warmup_names)
+
+    def status(self):
+        with self._costs_lock:
+            endpoints = {name: dict(costs, resources=list(costs["resources"]))
+                         for name, costs in self._endpoint_costs.items()}
+        return {
+            "ready": self.is_ready(),
+            "warmup": list(self._warmup_names),
+            "resources": {name: resource.status() for name, resource in self._resources.items()},
+            "endpoints": endpoints,
+        }
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import torch
+from torchvision import datasets
+
+from Ocr2.src.classification.predict_category import TRANSFORM, load_model
+
+EXPORT_VARIANTS = ("torchscript", "onnx", "int8_dynamic", "int8_static")
+VARIANT_FILES = {
+    "torchscript": "classifier_model.ts",
+    "onnx": "classifier_model.onnx",
+    "int8_dynamic": "classifier_model_int8_dynamic.ts",
+    "int8_static": "classifier_model_int8_static.ts",
+}
+INPUT_SHAPE = (3, 224, 224)
+
+
+def _example_input(batch_size=1):
+    return torch.randn(batch_size, *INPUT_SHAPE).contiguous(memory_format=torch.channels_last)
+
+
+def _save_frozen(model, output_path):
+    with torch.inference_mode():
+        traced = torch.jit.trace(model, _example_input())
+    frozen = torch.jit.freeze(traced.eval())
+    torch.jit.save(frozen, output_path)
+    return output_path
+
+
+def export_torchscript(model, output_path):
+    """
+    Трассирует модель fp32 в формате channels-last и сохраняет замороженный TorchScript.
+    """
+    return _save_frozen(model.to(memory_format=torch.channels_last), output_path)
+
+
+def export_onnx(model, output_path, opset_version=17):
+    """
+    Экспортирует модель в ONNX с динамическим размером батча (для onnxruntime).
+    """
+    with torch.inference_mode():
+        torch.onnx.export(model, torch.randn(1, *INPUT_SHAPE), output_path, opset_version=opset_version,
+                          input_names=["input"], output_names=["logits"],
+                          dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}})
+    return output_path
+
+
+def export_int8_dynamic(model, output_path):
+    """
+    Динамическая int8-квантизация (веса линейных слоев) и сохранение в TorchScript.
+    """
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return _save_frozen(quantized, output_path)
+
+
+def export_int8_static(model, output_path, calibration_batches):
+    """
+    Статическая int8-квантизация сверток и линейных слоев (FX graph mode) с калибровкой
+    диапазонов активаций на выборке и сохранение в TorchScript.
+    :param calibration_batches: Батчи входных тензоров N x 3 x 224 x 224.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    qconfig_mapping = get_default_qconfig_mapping("x86")
+    prepared = prepare_fx(model, qconfig_mapping, example_inputs=(_example_input(),))
+    with torch.inference_mode():
+        for batch in calibration_batches:
+            prepared(batch)
+    return _save_frozen(convert_fx(prepared), output_path)
+
+
+def load_image_batches(image_dir, limit=256, batch_size=32):
+    """
+    Загружает изображения (структура ImageFolder) батчами для калибровки и проверок.
+    :return: Список пар (батч тензоров, метки).
+    """
+    folder = datasets.ImageFolder(image_dir, transform=TRANSFORM)
+    rng = np.random.default_rng(0)
+    indices = rng.permutation(len(folder))[:limit].tolist()
+    batches = []
+    for start in range(0, len(indices), batch_size):
+        items = [folder[index] for index in indices[start:start + batch_size]]
+        batches.append((torch.stack([image for image, _ in items]), torch.tensor([label for _, label in items])))
+    return batches
+
+
+def check_parity(reference_model, candidate_model, batches):
+    """
+    Сравнивает вариант с исходной моделью fp32: совпадение top-1, максимальное отличие логитов
+    и точность обеих моделей по меткам выборки.
+    """
+    agree, correct_reference, correct_candidate, total = 0, 0, 0, 0
+    max_logit_diff = 0.0
+    with torch.inference_mode():
+        for inputs, labels in batches:
+            reference = reference_model(inputs.contiguous(memory_format=torch.channels_last)).float()
+            candidate = candidate_model(inputs.contiguous(memory_format=torch.channels_last)).float()
+            agree += (reference.argmax(dim=1) == candidate.argmax(dim=1)).sum().item()
+            correct_reference += (reference.argmax(dim=1) == labels).sum().item()
+            correct_candidate += (candidate.argmax(dim=1) == labels).sum().item()
+            max_logit_diff = max(max_logit_diff, (reference - candidate).abs().max().item())
+            total += len(labels)
+    return {
+        "top1_agreement": round(agree / total, 4) if total else None,
+        "max_logit_diff": round(max_logit_diff, 4),
+        "reference_accuracy": round(correct_reference / total, 4) if total else None,
+        "accuracy": round(correct_candidate / total, 4) if total else None,
+    }
+
+
+def benchmark_latency(model, batch_size=32, iterations=30, warmup=5):
+    """
+    Замеряет задержку одного изображения (p50/p95) и пропускную способность батчами.
+    """
+    single, batch = _example_input(1), _example_input(batch_size)
+    latencies = []
+    with torch.inference_mode():
+        for _ in range(warmup):
+            model(single)
+            model(batch)
+        for _ in range(iterations):
+            start = time.perf_counter()
+            model(single)
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            model(batch)
+        batch_elapsed = time.perf_counter() - start
+
+    return {
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+        "throughput_images_per_sec": round(batch_size * iterations / batch_elapsed, 1),
+    }
+
+
+def export_variants(model_file_path, output_dir, variants=EXPORT_VARIANTS, num_classes=15, calibration_dir=None,
+                    eval_dir=None, benchmark=True):
+    """
+    Экспортирует модель в выбранные варианты и для каждого проверяет совпадение с fp32
+    и замеряет задержку. Статическая квантизация требует calibration_dir.
+    Точность проверяется на eval_dir; без нее совпадение с fp32 считается на калибровочной
+    выборке и записывается как "calibration_parity" (не оценка точности).
+    :return: Отчет по вариантам: путь, размер файла, паритет и замеры.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    reference = load_model(model_file_path, num_classes=num_classes, execution_device="cpu", variant="eager")
+    calibration = load_image_batches(calibration_dir) if calibration_dir else []
+    evaluation = load_image_batches(eval_dir) if eval_dir else []
+    if calibration and not evaluation:
+        print("Не задана eval_dir: совпадение с fp32 проверяется на калибровочной выборке (calibration_parity)")
+
+    report = {"reference": {"path": model_file_path}}
+    if benchmark:
+        report["reference"].update(benchmark_latency(reference))
+
+    for variant in variants:
+        if variant not in EXPORT_VARIANTS:
+            raise ValueError(f"Неизвестный вариант экспорта: {variant}, ожидается один из {EXPORT_VARIANTS}")
+        output_path = os.path.join(output_dir, VARIANT_FILES[variant])
+        print(f"Экспорт варианта {variant}: {output_path}")
+        # Квантизация и трассировка не должны менять исходную модель
+        source = load_model(model_file_path, num_classes=num_classes, execution_device="cpu", variant="eager")
+        if variant == "torchscript":
+            export_torchscript(source, output_path)
+        elif variant == "onnx":
+            export_onnx(source, output_path)
+        elif variant == "int8_dynamic":
+            export_int8_dynamic(source, output_path)
+        elif variant == "int8_static":
+            if not calibration:
+                print("Пропуск int8_static: не задана выборка для калибровки (calibration_dir)")
+                continue
+            export_int8_static(source, output_path, [inputs for inputs, _ in calibration])
+
+        exported = load_model(output_path, num_classes=num_classes, execution_device="cpu", variant="auto")
+        entry = {"path": output_path, "size_mb": round(os.path.getsize(output_path) / 1024 / 1024, 2)}
+        if evaluation:
+            entry["parity"] = check_parity(reference, exported, evaluation)
+        elif calibration:
+            entry["calibration_parity"] = check_parity(reference, exported, calibration)
+        if benchmark:
+            entry.update(benchmark_latency(exported))
+        report[variant] = entry
+        print(f"{variant}: {entry}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Экспорт классификатора для быстрого инференса на CPU")
+    parser.add_argument("--model", default="models/classifier_model.pth", help="Исходный state_dict модели")
+    parser.add_argument("--output-dir", default="models/export", help="Папка для экспортированных моделей")
+    parser.add_argument("--variants", default=",".join(EXPORT_VARIANTS), help="Варианты через запятую")
+    parser.add_argument("--calibration-dir", default=None, help="Выборка (ImageFolder) для статической квантизации")
+    parser.add_argument("--eval-dir", default=None, help="Отдельная от калибровочной выборка (ImageFolder) для проверки точности")
+    parser.add_argument("--no-benchmark", action="store_true", help="Не замерять задержку")
+    parser.add_argument("--report", default=None, help="Путь для сохранения отчета в JSON")
+    args = parser.parse_args()
+
+    export_report = export_variants(args.model, args.output_dir, [v.strip() for v in args.variants.split(",")],
+                                    calibration_dir=args.calibration_dir, eval_dir=args.eval_dir,
+                                    benchmark=not args.no_benchmark)
+    if args.report:
+        os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(export_report, f, ensure_ascii=False, indent=4)  # type: ignore
+        print(f"Отчет сохранен: {args.report}")
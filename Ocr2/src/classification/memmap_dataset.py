@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import Dataset
+from torchvision import datasets
+
+IMAGES_FILE = "images.npy"
+LABELS_FILE = "labels.npy"
+META_FILE = "meta.json"
+# Нормализация та же, что в TRANSFORM predict_category: (x - 0.5) / 0.5
+NORMALIZE_MEAN = 0.5
+NORMALIZE_STD = 0.5
+
+
+def _decode_resized(image_path, image_size, channels):
+    with Image.open(image_path) as image:
+        image = image.convert("RGB" if channels == 3 else "L")
+        image = image.resize((image_size, image_size), Image.BILINEAR)
+        array = np.asarray(image, dtype=np.uint8)
+    return array if channels == 3 else array[:, :, None]
+
+
+def _samples_digest(samples):
+    """
+    Отпечаток выборки ImageFolder: путь, размер, время изменения и метка каждого файла.
+    Замена или правка изображения без изменения их количества делает кэш недействительным.
+    """
+    digest = hashlib.sha256()
+    for path, label in samples:
+        stat = os.stat(path)
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0{label}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _cache_is_valid(cache_dir, meta):
+    meta_path = os.path.join(cache_dir, META_FILE)
+    if not os.path.exists(meta_path) or not os.path.exists(os.path.join(cache_dir, IMAGES_FILE)):
+        return False
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f) == meta
+
+
+def build_memmap_dataset(image_dir, cache_dir, image_size=224, channels=3, num_workers=8):
+    """
+    Декодирует и масштабирует изображения папки (структура ImageFolder) один раз и сохраняет
+    их в компактный uint8-массив N x H x W x C, отображаемый в память, и массив меток.
+    Готовый кэш для той же папки и параметров используется повторно.
+    :param image_dir: Папка с подпапками классов.
+    :param cache_dir: Папка кэша (images.npy, labels.npy, meta.json).
+    :param image_size: Сторона квадратного изображения после масштабирования.
+    :param channels: 3 (RGB) или 1 (оттенки серого, в 3 раза компактнее).
+    :param num_workers: Потоков декодирования.
+    :return: Метаданные кэша (классы, количество изображений, размер).
+    """
+    folder = datasets.ImageFolder(image_dir)
+    meta = {
+        "source": os.path.abspath(image_dir),
+        "classes": folder.classes,
+        "count": len(folder.samples),
+        "samples_digest": _samples_digest(folder.samples),
+        "image_size": image_size,
+        "channels": channels,
+    }
+    if _cache_is_valid(cache_dir, meta):
+        print(f"Используется готовый кэш изображений: {cache_dir}")
+        return meta
+
+    os.makedirs(cache_dir, exist_ok=True)
+    start = time.perf_counter()
+    images = np.lib.format.open_memmap(os.path.join(cache_dir, IMAGES_FILE), mode="w+", dtype=np.uint8,
+                                       shape=(len(folder.samples), image_size, image_size, channels))
+    labels = np.array([label for _, label in folder.samples], dtype=np.int64)
+
+    paths = [path for path, _ in folder.samples]
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+        decoded = executor.map(lambda path: _decode_resized(path, image_size, channels), paths)
+        for index, array in enumerate(decoded):
+            images[index] = array
+    images.flush()
+    del images
+
+    np.save(os.path.join(cache_dir, LABELS_FILE), labels)
+    # Метаданные пишутся последними: незавершенный кэш не будет принят за готовый
+    with open(os.path.join(cache_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=4)  # type: ignore
+    print(f"Кэш изображений создан: {cache_dir}, {len(paths)} изображений за {time.perf_counter() - start:.1f} с")
+    return meta
+
+
+class MemmapImageDataset(Dataset):
+    """
+    Датасет поверх кэша build_memmap_dataset: изображения читаются из отображенного в память
+    массива uint8 и нормализуются на лету, без повторного декодирования JPEG.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        :param cache_dir: Папка кэша, созданного build_memmap_dataset().
+        """
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.classes = self.meta["classes"]
+        self.labels = torch.from_numpy(np.load(os.path.join(cache_dir, LABELS_FILE)))
+        # Массив открывается лениво в каждом процессе DataLoader, а не сериализуется в него
+        self._images = None
+
+    @property
+    def images(self):
+        if self._images is None:
+            self._images = np.load(os.path.join(self.cache_dir, IMAGES_FILE), mmap_mode="r")
+        return self._images
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, index):
+        image = torch.from_numpy(np.array(self.images[index])).permute(2, 0, 1)
+        if image.shape[0] == 1:
+            image = image.expand(3, -1, -1)
+        image = image.float().div_(255).sub_(NORMALIZE_MEAN).div_(NORMALIZE_STD)
+        return image, self.labels[index]
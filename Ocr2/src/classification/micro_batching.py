@@ -0,0 +1,102 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+from Ocr2.src.classification.predict_category import preprocess_image, classify_tensors
+from Ocr2.src.utils.metrics import Histogram
+
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class MicroBatcher:
+    """
+    Собирает одновременные запросы на классификацию в один батч: ждет до max_wait_ms
+    или до max_batch_size элементов и выполняет один прямой проход модели.
+    Предобработка выполняется в потоке вызывающего, параллельно с инференсом текущего батча.
+    """
+
+    def __init__(self, loaded_model, execution_device, class_labels, max_batch_size=16, max_wait_ms=10):
+        """
+        :param loaded_model: Загруженная модель.
+        :param execution_device: Устройство для выполнения ("cpu" или "cuda").
+        :param class_labels: Список категорий (классов).
+        :param max_batch_size: Максимальный размер батча.
+        :param max_wait_ms: Максимальное ожидание добора батча после первого запроса, мс.
+        """
+        self.model = loaded_model
+        self.execution_device = execution_device
+        self.class_labels = class_labels
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.latency = Histogram()
+        self.inference_time = Histogram()
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="classify-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image_file_path):
+        """
+        Ставит изображение в очередь на классификацию.
+        :param image_file_path: Путь к изображению или массив, уже декодированный стадией OCR.
+        :return: Future с предсказанной категорией.
+        """
+        start = time.perf_counter()
+        input_tensor = preprocess_image(image_file_path)
+        future = Future()
+        self._queue.put((input_tensor, future, start))
+        return future
+
+    def classify(self, image_file_path, timeout=None):
+        """
+        Синхронно классифицирует изображение через общий батч.
+        """
+        return self.submit(image_file_path).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            tensors = [item[0] for item in batch]
+            start = time.perf_counter()
+            try:
+                categories = classify_tensors(tensors, self.model, self.execution_device, self.class_labels)
+            except Exception as e:
+                logging.error(f"Ошибка классификации батча из {len(batch)} изображений: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            self.inference_time.observe(finished - start)
+            self.batch_sizes.observe(len(batch))
+            for (_, future, submitted), category in zip(batch, categories):
+                self.latency.observe(finished - submitted)
+                future.set_result(category)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "latency_s": self.latency.snapshot(),
+            "inference_s": self.inference_time.snapshot(),
+        }
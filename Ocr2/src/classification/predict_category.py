@@ -1,24 +1,176 @@
 import torch
+import cv2
+import numpy as np
 from torchvision import transforms, models
 from PIL import Image
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-def load_model(model_file_path, num_classes=15, execution_device="cuda"):
+from Ocr2.src.utils.metrics import timed_stage
+
+# Пайплайн предобработки создается один раз, а не на каждый вызов
+TRANSFORM = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
+])
+
+INPUT_SIZE = 224
+# Быстрое декодирование: JPEG сразу в уменьшенном масштабе (draft), серые сканы без расширения до RGB.
+# Меняет входные пиксели модели относительно TRANSFORM, поэтому включается явно после проверки точности
+FAST_DECODE = os.environ.get("CLASSIFY_FAST_DECODE", "0") == "1"
+
+# Вариант модели: "eager" (state_dict .pth), "torchscript" (.ts), "onnx" (.onnx) или "auto" — по расширению файла
+MODEL_VARIANT = os.environ.get("CLASSIFIER_VARIANT", "auto")
+MODEL_VARIANTS = ("eager", "torchscript", "onnx")
+TORCHSCRIPT_EXTENSIONS = (".ts", ".torchscript")
+
+class OnnxClassifier:
+    """
+    Обертка над сессией onnxruntime с интерфейсом модели torch: принимает батч тензоров
+    и возвращает логиты тензором.
+    """
+
+    def __init__(self, model_file_path, num_threads=None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(model_file_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        logits = self.session.run(None, {self.input_name: batch.detach().cpu().contiguous().numpy()})[0]
+        return torch.from_numpy(logits)
+
+    def eval(self):
+        return self
+
+def resolve_model_variant(model_file_path, variant=MODEL_VARIANT):
+    """
+    Определяет вариант модели; при "auto" — по расширению файла.
     """
-    Загружает обученную модель ResNet18 для классификации.
+    if variant == "auto":
+        extension = os.path.splitext(model_file_path)[1].lower()
+        if extension == ".onnx":
+            return "onnx"
+        if extension in TORCHSCRIPT_EXTENSIONS:
+            return "torchscript"
+        return "eager"
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Неизвестный вариант модели: {variant}, ожидается один из {MODEL_VARIANTS}")
+    return variant
+
+def load_model(model_file_path, num_classes=15, execution_device="cuda", variant=MODEL_VARIANT):
+    """
+    Загружает обученную модель ResNet18 для классификации: исходный state_dict или
+    оптимизированный артефакт export_model (TorchScript, в том числе int8, или ONNX).
     :param model_file_path: Путь к сохраненной модели.
     :param num_classes: Количество классов.
     :param execution_device: Устройство для выполнения ("cpu" или "cuda").
+    :param variant: "eager", "torchscript", "onnx" или "auto" (по расширению файла).
     :return: Загруженная модель.
     """
+    variant = resolve_model_variant(model_file_path, variant)
+    if variant == "onnx":
+        return OnnxClassifier(model_file_path)
+
     device = torch.device(execution_device)  # Преобразуем строку в torch.device
+    if variant == "torchscript":
+        model_instance = torch.jit.load(model_file_path, map_location=device)
+        model_instance.eval()
+        return model_instance
+
     model_instance = models.resnet18(pretrained=False)
     model_instance.fc = torch.nn.Linear(model_instance.fc.in_features, num_classes)
     model_instance.load_state_dict(torch.load(model_file_path, map_location=execution_device))
     model_instance.eval()
     model_instance.to(device)
+    if device.type == "cpu":
+        # Формат channels-last быстрее для сверток на CPU (oneDNN)
+        model_instance.to(memory_format=torch.channels_last)
     return model_instance
 
+def _array_to_tensor(array):
+    """
+    uint8-массив H x W (серый) или H x W x 3 (RGB) -> нормализованный тензор 3 x H x W.
+    Серое изображение расширяется до трех каналов без копирования (expand).
+    """
+    tensor = torch.from_numpy(np.ascontiguousarray(array))
+    tensor = tensor.unsqueeze(0) if tensor.ndim == 2 else tensor.permute(2, 0, 1)
+    tensor = tensor.float().div_(255).sub_(0.5).div_(0.5)
+    return tensor.expand(3, -1, -1) if tensor.shape[0] == 1 else tensor
+
+def _pil_to_tensor(image, size):
+    if image.format == "JPEG":
+        # DCT-масштабирование 1/2..1/8 при декодировании: размер не меньше запрошенного
+        image.draft("L" if image.mode == "L" else "RGB", (size, size))
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+    image = image.resize((size, size), Image.BILINEAR, reducing_gap=2.0)
+    return _array_to_tensor(np.asarray(image))
+
+def decode_for_classification(image_source, size=INPUT_SIZE):
+    """
+    Быстро готовит входной тензор модели. JPEG декодируется сразу в уменьшенном масштабе
+    (Image.draft), остальные форматы уменьшаются с промежуточным reduce; серые изображения
+    остаются одноканальными до нормализации. Принимает также массив, уже декодированный
+    стадией OCR, чтобы страница не декодировалась повторно.
+    :param image_source: Путь к изображению, PIL.Image или uint8-массив (серый или RGB).
+    :param size: Сторона входного изображения модели.
+    :return: Тензор 3 x size x size.
+    """
+    if isinstance(image_source, np.ndarray):
+        if image_source.ndim == 3 and image_source.shape[2] == 4:
+            image_source = image_source[:, :, :3]
+        resized = cv2.resize(image_source, (size, size), interpolation=cv2.INTER_AREA)
+        return _array_to_tensor(resized)
+
+    if isinstance(image_source, Image.Image):
+        return _pil_to_tensor(image_source, size)
+    with Image.open(image_source) as image:
+        return _pil_to_tensor(image, size)
+
+def preprocess_image_reference(image_file_path):
+    """
+    Исходный путь предобработки: полное декодирование в RGB и масштабирование torchvision.
+    Используется для сравнения с быстрым путем.
+    """
+    image = Image.open(image_file_path).convert("RGB")
+    return TRANSFORM(image)
+
+@timed_stage("decode")
+def preprocess_image(image_file_path):
+    """
+    Загружает изображение и преобразует его во входной тензор модели (без размерности батча).
+    :param image_file_path: Путь к изображению или массив, уже декодированный стадией OCR.
+    :return: Тензор 3x224x224.
+    """
+    if FAST_DECODE or isinstance(image_file_path, np.ndarray):
+        return decode_for_classification(image_file_path)
+    return preprocess_image_reference(image_file_path)
+
+def classify_tensors(input_tensors, loaded_model, execution_device, class_labels):
+    """
+    Классифицирует подготовленные тензоры одним батчем.
+    :param input_tensors: Список тензоров 3x224x224.
+    :param loaded_model: Загруженная модель.
+    :param execution_device: Устройство для выполнения ("cpu" или "cuda").
+    :param class_labels: Список категорий (классов).
+    :return: Список предсказанных категорий в порядке входа.
+    """
+    device = torch.device(execution_device)
+    batch = torch.stack(input_tensors).to(device)
+    if device.type == "cpu":
+        batch = batch.contiguous(memory_format=torch.channels_last)
+
+    with torch.inference_mode():
+        outputs = loaded_model(batch)
+        predicted = outputs.argmax(dim=1).tolist()
+    return [class_labels[index] for index in predicted]
+
 def predict_category(image_file_path, loaded_model, execution_device, class_labels):
     """
     Предсказывает категорию изображения.
@@ -28,22 +180,34 @@ def predict_category(image_file_path, loaded_model, execution_device, class_labe
     :param class_labels: Список категорий (классов).
     :return: Предсказанная категория.
     """
-    device = torch.device(execution_device)
-    transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-    ])
+    input_tensor = preprocess_image(image_file_path)
+    return classify_tensors([input_tensor], loaded_model, execution_device, class_labels)[0]
 
+def predict_categories(image_file_paths, loaded_model, execution_device, class_labels, batch_size=32, num_workers=4):
+    """
+    Классифицирует список изображений батчами. Предобработка следующего батча
+    выполняется в пуле потоков, пока модель считает текущий.
+    :param image_file_paths: Пути к изображениям.
+    :param loaded_model: Загруженная модель.
+    :param execution_device: Устройство для выполнения ("cpu" или "cuda").
+    :param class_labels: Список категорий (классов).
+    :param batch_size: Размер батча для прямого прохода.
+    :param num_workers: Количество потоков предобработки.
+    :return: Список предсказанных категорий в порядке входа.
+    """
+    chunks = [image_file_paths[i:i + batch_size] for i in range(0, len(image_file_paths), batch_size)]
+    categories = []
 
-    image = Image.open(image_file_path).convert("RGB")
-    input_tensor = transform(image).unsqueeze(0).to(device)
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        pending = [executor.submit(preprocess_image, path) for path in chunks[0]] if chunks else []
+        for index in range(len(chunks)):
+            current = pending
+            if index + 1 < len(chunks):
+                pending = [executor.submit(preprocess_image, path) for path in chunks[index + 1]]
+            tensors = [future.result() for future in current]
+            categories.extend(classify_tensors(tensors, loaded_model, execution_device, class_labels))
 
-    # Предсказание
-    with torch.no_grad():
-        outputs = loaded_model(input_tensor)
-        _, predicted = torch.max(outputs, 1)
-    return class_labels[predicted.item()]
+    return categories
 
 if __name__ == "__main__":
     model_file = "models/classifier_model.pth"
@@ -1,66 +1,233 @@
+import os
+import time
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torchvision import datasets, transforms, models
+from torchvision import models
 from torch.utils.data import DataLoader
 from torchvision.models import ResNet18_Weights
 
-torch.cuda.is_available()
+from Ocr2.src.classification.memmap_dataset import MemmapImageDataset, build_memmap_dataset
 
-def train_classifier(train_dir, val_dir, output_model_path, num_classes=15, num_epochs=10, batch_size=32):
-    transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
-    ])
+DEFAULT_CACHE_DIR = os.path.join("data", "tensor_cache")
 
 
-    train_dataset = datasets.ImageFolder(train_dir, transform=transform)
-    val_dataset = datasets.ImageFolder(val_dir, transform=transform)
-    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=batch_size)
+def make_loader(dataset, batch_size, shuffle, num_workers, pin_memory, persistent_workers):
+    """
+    DataLoader с настраиваемым параллелизмом; persistent_workers и prefetch имеют смысл только при num_workers > 0.
+    """
+    extra = {"persistent_workers": persistent_workers, "prefetch_factor": 4} if num_workers > 0 else {}
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers,
+                      pin_memory=pin_memory, **extra)
+
+
+def timed_batches(loader, timings):
+    """
+    Итерирует загрузчик, накапливая в timings["data_wait"] время ожидания очередного батча.
+    """
+    iterator = iter(loader)
+    while True:
+        start = time.perf_counter()
+        try:
+            batch = next(iterator)
+        except StopIteration:
+            return
+        timings["data_wait"] += time.perf_counter() - start
+        yield batch
+
+
+def resolve_precision(precision, device):
+    """
+    Выбирает тип autocast для точности "fp32", "fp16", "bf16" или "auto".
+    "auto": на GPU — bf16, если поддерживается, иначе fp16; на CPU — fp32.
+    :return: Кортеж (dtype autocast или None для fp32, нужен ли GradScaler).
+    """
+    if precision == "auto":
+        if device.type != "cuda":
+            return None, False
+        precision = "bf16" if torch.cuda.is_bf16_supported() else "fp16"
+    if precision == "fp32":
+        return None, False
+    if precision == "bf16":
+        return torch.bfloat16, False
+    if precision == "fp16":
+        if device.type != "cuda":
+            raise ValueError("fp16 поддерживается только на GPU, для CPU используйте bf16")
+        return torch.float16, True
+    raise ValueError(f"Неизвестная точность: {precision}, ожидается fp32, fp16, bf16 или auto")
+
+
+def save_checkpoint(path, state):
+    """
+    Атомарно сохраняет чекпоинт: прерванная запись не портит предыдущий файл.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train_classifier(train_dir, val_dir, output_model_path, num_classes=15, num_epochs=10, batch_size=32,
+                     cache_dir=DEFAULT_CACHE_DIR, num_workers=4, pin_memory=None, persistent_workers=True,
+                     precision="auto", accumulation_steps=1, learning_rate=0.001, checkpoint_dir="models/checkpoints",
+                     checkpoint_every=1, resume=False, patience=3):
+    """
+    Обучает классификатор ResNet18. Изображения один раз декодируются в кэш uint8 (memmap),
+    эпохи читают уже подготовленные массивы.
+    :param cache_dir: Папка кэша декодированных изображений (подпапки train и val).
+    :param num_workers: Процессов DataLoader.
+    :param pin_memory: Закрепленная память для копирования на GPU; по умолчанию включена при наличии CUDA.
+    :param persistent_workers: Сохранять процессы DataLoader между эпохами.
+    :param precision: Точность вычислений: "fp32", "fp16" (GPU), "bf16" (GPU и CPU) или "auto".
+    :param accumulation_steps: Количество батчей на один шаг оптимизатора.
+    :param learning_rate: Начальная скорость обучения (далее косинусное расписание по эпохам).
+    :param checkpoint_dir: Папка чекпоинтов (модель, оптимизатор, расписание, эпоха).
+    :param checkpoint_every: Сохранять чекпоинт каждые N эпох.
+    :param resume: Продолжить обучение с последнего чекпоинта, если он есть; чекпоинт другой конфигурации
+        или других данных не загружается (ValueError).
+    :param patience: Остановить обучение после N эпох без улучшения точности на валидации (0 — не останавливать).
+    :return: Список статистики по эпохам.
+    """
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    if pin_memory is None:
+        pin_memory = device.type == "cuda"
+    autocast_dtype, use_scaler = resolve_precision(precision, device)
+
+    train_cache, val_cache = os.path.join(cache_dir, "train"), os.path.join(cache_dir, "val")
+    build_memmap_dataset(train_dir, train_cache)
+    build_memmap_dataset(val_dir, val_cache)
+    train_dataset = MemmapImageDataset(train_cache)
+    val_dataset = MemmapImageDataset(val_cache)
+    train_loader = make_loader(train_dataset, batch_size, True, num_workers, pin_memory, persistent_workers)
+    val_loader = make_loader(val_dataset, batch_size, False, num_workers, pin_memory, persistent_workers)
 
     print(f"Обучающих изображений: {len(train_dataset)}, Валидационных изображений: {len(val_dataset)}")
     print(f"Классы: {train_dataset.classes}")
 
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model = models.resnet18(weights=ResNet18_Weights.IMAGENET1K_V1)
     model.fc = nn.Linear(model.fc.in_features, num_classes)
     model = model.to(device)
 
     criterion = nn.CrossEntropyLoss()
-    optimizer = optim.Adam(model.parameters(), lr=0.001)
+    optimizer = optim.Adam(model.parameters(), lr=learning_rate)
+    scheduler = optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=num_epochs)
+    scaler = torch.cuda.amp.GradScaler(enabled=use_scaler)
 
-    for epoch in range(num_epochs):
+    # Параметры, при которых продолжение обучения с чекпоинта корректно
+    run_config = {
+        "num_classes": num_classes,
+        "num_epochs": num_epochs,
+        "batch_size": batch_size,
+        "accumulation_steps": accumulation_steps,
+        "learning_rate": learning_rate,
+        "precision": str(autocast_dtype),
+        "train": train_dataset.meta,
+        "val": val_dataset.meta,
+    }
+    checkpoint_path = os.path.join(checkpoint_dir, "last.pt")
+    # -1: первая эпоха всегда сохраняет модель, даже при нулевой точности на валидации
+    start_epoch, best_accuracy, epochs_without_improvement = 0, -1.0, 0
+    history = []
+    if resume and os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location=device)
+        mismatched = sorted(key for key in run_config if checkpoint.get("config", {}).get(key) != run_config[key])
+        if mismatched:
+            raise ValueError(f"Чекпоинт {checkpoint_path} создан с другими параметрами или данными: {mismatched}; "
+                             f"укажите другой checkpoint_dir или resume=False")
+        model.load_state_dict(checkpoint["model"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        scheduler.load_state_dict(checkpoint["scheduler"])
+        # Состояние выключенного GradScaler пустое, загружать его во включенный нельзя
+        if use_scaler and checkpoint["scaler"]:
+            scaler.load_state_dict(checkpoint["scaler"])
+        start_epoch = checkpoint["epoch"] + 1
+        best_accuracy = checkpoint["best_accuracy"]
+        epochs_without_improvement = checkpoint["epochs_without_improvement"]
+        history = checkpoint["history"]
+        if start_epoch >= num_epochs:
+            print(f"Обучение по чекпоинту {checkpoint_path} уже завершено (лучшая точность {best_accuracy:.2f}%)")
+        else:
+            print(f"Обучение продолжено с эпохи {start_epoch + 1} (лучшая точность {best_accuracy:.2f}%)")
+
+    for epoch in range(start_epoch, num_epochs):
         model.train()
-        running_loss = 0.0
-        for inputs, labels in train_loader:
-            inputs, labels = inputs.to(device), labels.to(device)
-            optimizer.zero_grad()
-            outputs = model(inputs)
-            loss = criterion(outputs, labels)
-            loss.backward()
-            optimizer.step()
-            running_loss += loss.item()
+        # Потери накапливаются на устройстве: без синхронизации на каждом шаге
+        running_loss = torch.zeros((), device=device)
+        timings = {"data_wait": 0.0}
+        epoch_start = time.perf_counter()
+        optimizer.zero_grad(set_to_none=True)
+        for step, (inputs, labels) in enumerate(timed_batches(train_loader, timings), start=1):
+            inputs, labels = inputs.to(device, non_blocking=pin_memory), labels.to(device, non_blocking=pin_memory)
+            with torch.autocast(device.type, dtype=autocast_dtype, enabled=autocast_dtype is not None):
+                outputs = model(inputs)
+                loss = criterion(outputs, labels)
+            scaler.scale(loss / accumulation_steps).backward()
+            running_loss += loss.detach()
 
-        print(f"Эпоха [{epoch+1}/{num_epochs}], Потери: {running_loss / len(train_loader):.4f}")
+            if step % accumulation_steps == 0 or step == len(train_loader):
+                scaler.step(optimizer)
+                scaler.update()
+                optimizer.zero_grad(set_to_none=True)
+        scheduler.step()
+
+        epoch_loss = running_loss.item() / len(train_loader)
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        epoch_time = time.perf_counter() - epoch_start
+        images_per_sec = len(train_dataset) / epoch_time
+        print(f"Эпоха [{epoch+1}/{num_epochs}], Потери: {epoch_loss:.4f}, {epoch_time:.1f} с, "
+              f"{images_per_sec:.1f} изобр./с, ожидание данных {timings['data_wait']:.1f} с, "
+              f"вычисления {epoch_time - timings['data_wait']:.1f} с")
 
 
         model.eval()
-        correct, total = 0, 0
-        with torch.no_grad():
+        correct = torch.zeros((), dtype=torch.long, device=device)
+        with torch.inference_mode(), torch.autocast(device.type, dtype=autocast_dtype,
+                                                    enabled=autocast_dtype is not None):
             for inputs, labels in val_loader:
-                inputs, labels = inputs.to(device), labels.to(device)
+                inputs, labels = inputs.to(device, non_blocking=pin_memory), labels.to(device, non_blocking=pin_memory)
                 outputs = model(inputs)
-                _, predicted = torch.max(outputs, 1)
-                total += labels.size(0)
-                correct += (predicted == labels).sum().item()
+                correct += (outputs.argmax(dim=1) == labels).sum()
 
-        accuracy = 100 * correct / total
+        accuracy = 100 * correct.item() / len(val_dataset)
         print(f"Точность на валидации: {accuracy:.2f}%")
 
-    torch.save(model.state_dict(), output_model_path)
-    print(f"Модель сохранена в: {output_model_path}")
+        history.append({
+            "epoch": epoch + 1,
+            "loss": round(epoch_loss, 4),
+            "val_accuracy": round(accuracy, 2),
+            "seconds": round(epoch_time, 2),
+            "images_per_sec": round(images_per_sec, 1),
+            "data_wait_seconds": round(timings["data_wait"], 2),
+        })
+
+        if accuracy > best_accuracy:
+            best_accuracy, epochs_without_improvement = accuracy, 0
+            # Лучшая модель сохраняется как state_dict, совместимый с load_model
+            os.makedirs(os.path.dirname(output_model_path) or ".", exist_ok=True)
+            torch.save(model.state_dict(), output_model_path)
+            print(f"Модель сохранена в: {output_model_path}")
+        else:
+            epochs_without_improvement += 1
+
+        stop = patience and epochs_without_improvement >= patience
+        if (epoch + 1) % checkpoint_every == 0 or stop or epoch + 1 == num_epochs:
+            save_checkpoint(checkpoint_path, {
+                "epoch": epoch,
+                "config": run_config,
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "scheduler": scheduler.state_dict(),
+                "scaler": scaler.state_dict(),
+                "best_accuracy": best_accuracy,
+                "epochs_without_improvement": epochs_without_improvement,
+                "history": history,
+            })
+        if stop:
+            print(f"Ранняя остановка: {patience} эпох без улучшения, лучшая точность {best_accuracy:.2f}%")
+            break
+
+    return history
 
 if __name__ == "__main__":
     train_directory = r"C:\Users\quvon\Desktop\OCR\Ocr2\data\processed_train\train"
@@ -1,13 +1,22 @@
 import cv2
-import pytesseract
 import os
+import argparse
 import numpy as np
 import pandas as pd
 
-def preprocess_image(image_path):
+from Ocr2.src.document_structure.page_context import as_page_context
+from Ocr2.src.ocr.executors import OcrExecutor
+from Ocr2.src.utils.logging_config import configure_logging
+from Ocr2.src.utils.manifest import add_manifest_arguments, manifest_from_args, pending_inputs, plan_inputs, print_plan
 
-    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-    _, binary = cv2.threshold(image, 128, 255, cv2.THRESH_BINARY_INV)
+# Линии сетки ближе этого расстояния (в пикселях) считаются одной линией
+LINE_MERGE_DISTANCE = 5
+STAGE_NAME = "tables"
+STAGE_VERSION = "1"
+
+def binarize_table_image(gray):
+
+    _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY_INV)
 
 
     kernel = np.ones((2, 2), np.uint8)
@@ -16,13 +25,27 @@ def preprocess_image(image_path):
 
     return binary
 
-def detect_table(image):
+def preprocess_image(image_path):
 
+    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    return binarize_table_image(image)
+
+def detect_table_lines(image):
+    """
+    Выделяет горизонтальные и вертикальные линии таблицы морфологическим открытием.
+    :param image: Бинаризованное изображение (текст и линии — белые).
+    :return: Кортеж масок (горизонтальные, вертикальные).
+    """
     kernel_h = cv2.getStructuringElement(cv2.MORPH_RECT, (50, 1))
     kernel_v = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 50))
 
     horizontal = cv2.morphologyEx(image, cv2.MORPH_OPEN, kernel_h)
     vertical = cv2.morphologyEx(image, cv2.MORPH_OPEN, kernel_v)
+    return horizontal, vertical
+
+def detect_table(image):
+
+    horizontal, vertical = detect_table_lines(image)
 
 
     table_structure = cv2.add(horizontal, vertical)
@@ -30,52 +53,190 @@ def detect_table(image):
 
     return contours
 
-def extract_table_data(image_path, output_csv_path):
-
-    binary_image = preprocess_image(image_path)
-    contours = detect_table(binary_image)
-
-    image = cv2.imread(image_path)
-    rows = []
-
+def _line_positions(profile, start, end):
+    """
+    Координаты линий сетки по проекции маски линий, включая границы области таблицы.
+    :param profile: Сумма пикселей маски линий вдоль одной оси.
+    :param start: Начало области таблицы по этой оси.
+    :param end: Конец области таблицы по этой оси.
+    :return: Отсортированный массив координат границ строк/столбцов.
+    """
+    indices = np.flatnonzero(profile)
+    positions = [start, end]
+    if indices.size:
+        # Соседние индексы образуют одну линию: берем центр каждой группы
+        breaks = np.flatnonzero(np.diff(indices) > 1)
+        groups_start = np.concatenate(([indices[0]], indices[breaks + 1]))
+        groups_end = np.concatenate((indices[breaks], [indices[-1]]))
+        positions.extend(((groups_start + groups_end) // 2 + start).tolist())
+
+    positions = np.unique(positions)
+    merged = positions[np.concatenate(([True], np.diff(positions) > LINE_MERGE_DISTANCE))]
+    return merged
+
+def detect_table_grids(binary):
+    """
+    Находит таблицы и их сетки: границы строк и столбцов каждой таблицы.
+    :param binary: Бинаризованное изображение страницы.
+    :return: Список словарей {"x", "y", "w", "h", "rows", "cols"}.
+    """
+    horizontal, vertical = detect_table_lines(binary)
+    contours, _ = cv2.findContours(cv2.add(horizontal, vertical), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    grids = []
     for contour in contours:
-        x_coord, y_coord, w, h = cv2.boundingRect(contour)
+        x, y, w, h = cv2.boundingRect(contour)
         if w > 50 and h > 20:
-            table_cell = image[y_coord:y_coord + h, x_coord:x_coord + w]
-            try:
-                # OCR для ячейки таблицы
-                text = pytesseract.image_to_string(table_cell, config='--psm 6').strip()
-                if text:  # Добавляем только если текст не пустой
-                    rows.append((x_coord, y_coord, text))
-            except Exception as e:
-                print(f"Ошибка OCR на контуре {x_coord}, {y_coord}, {w}, {h}: {e}")
-
-
-    if rows:
-        rows = sorted(rows, key=lambda x: (x[1], x[0]))
-        data = [row[2] for row in rows]
-
-
-        df = pd.DataFrame(data, columns=["Content"])
-        df.to_csv(output_csv_path, index=False)
-        print(f"Таблица сохранена в: {output_csv_path}")
+            rows = _line_positions(horizontal[y:y + h, x:x + w].sum(axis=1), y, y + h)
+            cols = _line_positions(vertical[y:y + h, x:x + w].sum(axis=0), x, x + w)
+            grids.append({"x": x, "y": y, "w": w, "h": h, "rows": rows, "cols": cols})
+    return sorted(grids, key=lambda grid: (grid["y"], grid["x"]))
+
+def assign_words_to_cells(words, grids):
+    """
+    Векторно сопоставляет слова ячейкам сеток по центрам их рамок.
+    :param words: DataFrame слов (PageContext.words_for("tables", ...)).
+    :param grids: Сетки из detect_table_grids().
+    :return: Массивы (номер таблицы, строка, столбец); -1 для слов вне таблиц.
+    """
+    count = len(words)
+    table_index = np.full(count, -1, dtype=np.int32)
+    row_index = np.full(count, -1, dtype=np.int32)
+    col_index = np.full(count, -1, dtype=np.int32)
+    if not count or not grids:
+        return table_index, row_index, col_index
+
+    center_x = (words["left"] + words["width"] // 2).to_numpy()
+    center_y = (words["top"] + words["height"] // 2).to_numpy()
+
+    # Матрица попаданий центров слов (W) в прямоугольники таблиц (T)
+    boxes = np.array([[grid["x"], grid["y"], grid["x"] + grid["w"], grid["y"] + grid["h"]] for grid in grids])
+    inside = ((center_x[:, None] >= boxes[None, :, 0]) & (center_x[:, None] < boxes[None, :, 2]) &
+              (center_y[:, None] >= boxes[None, :, 1]) & (center_y[:, None] < boxes[None, :, 3]))
+    has_table = inside.any(axis=1)
+    table_index[has_table] = inside[has_table].argmax(axis=1)
+
+    for index, grid in enumerate(grids):
+        selected = table_index == index
+        row_index[selected] = np.searchsorted(grid["rows"], center_y[selected], side="right") - 1
+        col_index[selected] = np.searchsorted(grid["cols"], center_x[selected], side="right") - 1
+        row_index[selected] = np.clip(row_index[selected], 0, max(len(grid["rows"]) - 2, 0))
+        col_index[selected] = np.clip(col_index[selected], 0, max(len(grid["cols"]) - 2, 0))
+    return table_index, row_index, col_index
+
+def build_tables(words, grids):
+    """
+    Собирает таблицы строки×столбцы из слов, распределенных по ячейкам.
+    Если сетка не содержит внутренних линий, строками таблицы служат строки текста Tesseract.
+    :return: Список таблиц, каждая — список строк со значениями ячеек.
+    """
+    table_index, row_index, col_index = assign_words_to_cells(words, grids)
+    words = words.assign(table=table_index, row=row_index, col=col_index)
+    words = words[words["table"] >= 0]
+
+    tables = []
+    for index, grid in enumerate(grids):
+        table_words = words[words["table"] == index]
+        n_rows, n_cols = len(grid["rows"]) - 1, len(grid["cols"]) - 1
+        if n_rows < 2 and n_cols < 2:
+            lines = table_words.groupby("line", sort=False)["text"].agg(" ".join)
+            if len(lines):
+                tables.append([[text] for text in lines.tolist()])
+            continue
+
+        cells = table_words.groupby(["row", "col"], sort=False)["text"].agg(" ".join)
+        grid_text = [["" for _ in range(n_cols)] for _ in range(n_rows)]
+        for (row, col), text in cells.items():
+            grid_text[row][col] = text
+        if any(any(row) for row in grid_text):
+            tables.append(grid_text)
+    return tables
+
+def recognize_tables(source):
+    """
+    Распознает таблицы страницы по сеткам линий и словам прохода Tesseract по области таблиц.
+    :param source: Путь к изображению или PageContext.
+    :return: Список таблиц, каждая — список строк со значениями ячеек.
+    """
+    page = as_page_context(source)
+    grids = page.table_grids
+    if not grids:
+        return []
+
+    # Одна область OCR, охватывающая все найденные таблицы
+    left = min(grid["x"] for grid in grids)
+    top = min(grid["y"] for grid in grids)
+    right = max(grid["x"] + grid["w"] for grid in grids)
+    bottom = max(grid["y"] + grid["h"] for grid in grids)
+    return build_tables(page.words_for("tables", (left, top, right - left, bottom - top)), grids)
+
+def extract_table_data(source, output_csv_path):
+    """
+    Извлекает таблицы изображения в CSV (строки×столбцы). Первая таблица сохраняется
+    в output_csv_path, следующие — с суффиксом _2, _3, ...
+    :param source: Путь к изображению или PageContext.
+    :param output_csv_path: Путь к CSV первой таблицы.
+    :return: Список DataFrame найденных таблиц.
+    """
+    frames = [pd.DataFrame(table) for table in recognize_tables(source)]
+    if frames:
+        base_path, extension = os.path.splitext(output_csv_path)
+        for index, df in enumerate(frames):
+            table_path = output_csv_path if index == 0 else f"{base_path}_{index + 1}{extension}"
+            df.to_csv(table_path, index=False, header=False)
+            print(f"Таблица сохранена в: {table_path}")
     else:
-        print(f"Нет данных для сохранения из изображения {image_path}")
-
-
-def process_table_images(input_dir, output_dir):
+        print(f"Нет данных для сохранения из изображения {as_page_context(source).image_path}")
+    return frames
+
+
+def process_table_images(input_dir, output_dir, mode="thread", num_workers=None, manifest=None, dry_run=False):
+    """
+    Извлекает таблицы из всех изображений папки параллельно.
+    :param mode: Режим исполнителя: "inline", "thread" или "process" (см. OcrExecutor).
+    :param num_workers: Количество рабочих; по умолчанию по числу ядер.
+    :param manifest: Manifest для инкрементальной обработки (только новые и измененные файлы).
+    :param dry_run: Только оценить объем ожидающей работы, ничего не обрабатывая.
+    """
+    image_paths = [os.path.join(input_dir, file_name) for file_name in os.listdir(input_dir)
+                   if file_name.endswith(('.jpg', '.png', '.jpeg'))]
+    if dry_run:
+        return plan_inputs(manifest, STAGE_NAME, STAGE_VERSION, image_paths)
 
     os.makedirs(output_dir, exist_ok=True)
 
-    for file_name in os.listdir(input_dir):
-        if file_name.endswith(('.jpg', '.png', '.jpeg')):
-            image_path = os.path.join(input_dir, file_name)
+    with OcrExecutor(mode, num_workers=num_workers, preload_reader=False) as executor:
+        futures = []
+        for image_path in pending_inputs(manifest, STAGE_NAME, STAGE_VERSION, image_paths):
+            file_name = os.path.basename(image_path)
             output_csv_path = os.path.join(output_dir, file_name.replace(".jpg", ".csv").replace(".png", ".csv"))
             print(f"Обработка таблицы: {image_path}")
-            extract_table_data(image_path, output_csv_path)
+            if manifest is not None:
+                manifest.mark_started(STAGE_NAME, image_path, STAGE_VERSION)
+            futures.append((image_path, output_csv_path, executor.submit(extract_table_data, image_path, output_csv_path)))
+
+        # Манифест обновляется в основном процессе по мере готовности результатов
+        for image_path, output_csv_path, future in futures:
+            try:
+                frames = future.result()
+            except Exception as e:
+                if manifest is not None:
+                    manifest.mark_failed(STAGE_NAME, image_path, STAGE_VERSION, e)
+                raise
+            if manifest is not None:
+                # Страница без таблиц не создает CSV, но тоже считается обработанной
+                manifest.mark_done(STAGE_NAME, image_path, STAGE_VERSION, output_csv_path if frames else None)
 
 if __name__ == "__main__":
+    configure_logging()
     input_folder = "data/test"
     output_folder = "output/tables"
 
-    process_table_images(input_folder, output_folder)
+    parser = argparse.ArgumentParser(description="Извлечение таблиц из изображений")
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
+
+    result = process_table_images(input_folder, output_folder, manifest=manifest_from_args(args),
+                                  dry_run=args.dry_run)
+    if args.dry_run:
+        print_plan(result)
@@ -1,32 +1,24 @@
-import cv2
-import pytesseract
 import os
 
+from Ocr2.src.document_structure.page_context import as_page_context
+from Ocr2.src.utils.logging_config import configure_logging
+from Ocr2.src.ocr.executors import OcrExecutor
 
-def extract_text_blocks(image_path):
+MIN_WORD_CONFIDENCE = 50
+
+
+def extract_text_blocks(source):
     """
-    Извлекает текстовые блоки из изображения с использованием Tesseract.
-    :param image_path: Путь к изображению.
+    Извлекает текстовые блоки из изображения (бинаризация Оцу, проход Tesseract text_blocks).
+    :param source: Путь к изображению или PageContext.
     :return: Список блоков текста с их координатами.
     """
-    image = cv2.imread(image_path)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-
-    _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-
-
-    data = pytesseract.image_to_data(binary, output_type=pytesseract.Output.DICT)
-    text_blocks = []
-
-    for i in range(len(data['text'])):
-        if int(data['conf'][i]) > 50:
-            x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
-            text = data['text'][i].strip()
-            if text:
-                text_blocks.append({'text': text, 'x': x, 'y': y, 'w': w, 'h': h})
-
-    return text_blocks
+    words = as_page_context(source).words_for("text_blocks")
+    words = words[words["conf"] > MIN_WORD_CONFIDENCE]
+    return [
+        {'text': text, 'x': int(x), 'y': int(y), 'w': int(w), 'h': int(h)}
+        for text, x, y, w, h in zip(words["text"], words["left"], words["top"], words["width"], words["height"])
+    ]
 
 
 def analyze_headings_and_paragraphs(text_blocks):
@@ -49,9 +41,9 @@ def process_document(image_path, output_dir):
 
     os.makedirs(output_dir, exist_ok=True)
 
-
-    print(f"Обработка изображения: {image_path}")
-    text_blocks = extract_text_blocks(image_path)
+    page = as_page_context(image_path)
+    print(f"Обработка изображения: {page.image_path}")
+    text_blocks = extract_text_blocks(page)
 
 
     headings, paragraphs = analyze_headings_and_paragraphs(text_blocks)
@@ -70,7 +62,27 @@ def process_document(image_path, output_dir):
     print(f"Результаты анализа сохранены в: {output_path}")
 
 
+def process_documents(input_dir, output_dir, mode="thread", num_workers=None):
+    """
+    Анализирует заголовки и абзацы всех изображений папки параллельно;
+    результат каждого документа сохраняется в отдельную подпапку.
+    :param mode: Режим исполнителя: "inline", "thread" или "process" (см. OcrExecutor).
+    :param num_workers: Количество рабочих; по умолчанию по числу ядер.
+    """
+    with OcrExecutor(mode, num_workers=num_workers, preload_reader=False) as executor:
+        futures = []
+        for file_name in os.listdir(input_dir):
+            if file_name.endswith(('.jpg', '.jpeg', '.png')):
+                image_path = os.path.join(input_dir, file_name)
+                document_output_dir = os.path.join(output_dir, os.path.splitext(file_name)[0])
+                futures.append(executor.submit(process_document, image_path, document_output_dir))
+
+        for future in futures:
+            future.result()
+
+
 if __name__ == "__main__":
+    configure_logging()
     input_image = "data/test/sample.jpg"
     output_folder = "output/headings_paragraphs"
 
@@ -1,42 +1,48 @@
 import cv2
-import pytesseract
 import os
+import argparse
 import json
 
-def analyze_layout(image_path, output_dir):
+from Ocr2.src.document_structure.page_context import as_page_context
+from Ocr2.src.utils.manifest import (add_manifest_arguments, manifest_from_args, pending_inputs, plan_inputs,
+                                     print_plan, track_input)
+
+STAGE_NAME = "layout"
+STAGE_VERSION = "1"
+
+def analyze_layout(source, output_dir=None):
     """
     Анализирует структуру документа, определяя текстовые блоки и сохраняет их координаты.
-    :param image_path: Путь к изображению документа.
-    :param output_dir: Папка для сохранения результатов анализа.
+    :param source: Путь к изображению документа или PageContext.
+    :param output_dir: Папка для сохранения результатов анализа (None — ничего не сохранять).
+    :return: Список блоков с координатами.
     """
-    os.makedirs(output_dir, exist_ok=True)
-
-    image = cv2.imread(image_path)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    page = as_page_context(source)
+    blocks = []
 
 
-    _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY_INV)
+    for idx, contour in enumerate(page.contours):
+        x, y, w, h = cv2.boundingRect(contour)
+        if w > 50 and h > 20:  # Фильтрация мелких блоков
+            blocks.append({"block": idx + 1, "x": x, "y": y, "width": w, "height": h})
 
+    if output_dir is None:
+        return blocks
 
-    hocr_output = pytesseract.image_to_pdf_or_hocr(binary, extension='hocr', config='--psm 6')
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(page.image_path or "page"))[0]
 
-    # Сохранение hOCR в файл
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    # Сохранение hOCR прохода Tesseract макета в файл
     hocr_path = os.path.join(output_dir, f"{base_name}_layout.hocr")
-    with open(hocr_path, 'wb') as f:
-        f.write(hocr_output)
+    with open(hocr_path, 'w', encoding='utf-8') as f:
+        f.write(page.hocr_for("layout"))
     print(f"hOCR файл сохранен: {hocr_path}")
 
 
-    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    blocks = []
-
-
-    for idx, contour in enumerate(contours):
-        x, y, w, h = cv2.boundingRect(contour)
-        if w > 50 and h > 20:  # Фильтрация мелких блоков
-            blocks.append({"block": idx + 1, "x": x, "y": y, "width": w, "height": h})
-            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+    image = page.image.copy()
+    for block in blocks:
+        x, y, w, h = block["x"], block["y"], block["width"], block["height"]
+        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
 
     output_image_path = os.path.join(output_dir, f"{base_name}_blocks.jpg")
@@ -48,14 +54,25 @@ def analyze_layout(image_path, output_dir):
     with open(blocks_json_path, 'w', encoding='utf-8') as f:
         json.dump(blocks, f, ensure_ascii=False, indent=4)  # type: ignore
     print(f"Координаты блоков сохранены: {blocks_json_path}")
+    return blocks
 
-def process_layouts(input_dir, output_dir):
+def process_layouts(input_dir, output_dir, manifest=None, dry_run=False):
+    """
+    Анализирует макеты всех изображений папки.
+    :param manifest: Manifest для инкрементальной обработки (только новые и измененные файлы).
+    :param dry_run: Только оценить объем ожидающей работы, ничего не обрабатывая.
+    """
+    image_paths = [os.path.join(input_dir, file_name) for file_name in os.listdir(input_dir)
+                   if file_name.endswith(('.jpg', '.jpeg', '.png'))]
+    if dry_run:
+        return plan_inputs(manifest, STAGE_NAME, STAGE_VERSION, image_paths)
 
     os.makedirs(output_dir, exist_ok=True)
 
-    for file_name in os.listdir(input_dir):
-        if file_name.endswith(('.jpg', '.jpeg', '.png')):
-            image_path = os.path.join(input_dir, file_name)
+    for image_path in pending_inputs(manifest, STAGE_NAME, STAGE_VERSION, image_paths):
+        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        blocks_json_path = os.path.join(output_dir, f"{base_name}_blocks.json")
+        with track_input(manifest, STAGE_NAME, STAGE_VERSION, image_path, blocks_json_path):
             print(f"Обработка макета: {image_path}")
             analyze_layout(image_path, output_dir)
 
@@ -64,4 +81,10 @@ if __name__ == "__main__":
     input_folder = "data/test.pdf"
     output_folder = "output/layout_analysis"
 
-    process_layouts(input_folder, output_folder)
+    parser = argparse.ArgumentParser(description="Анализ макета страниц")
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
+
+    result = process_layouts(input_folder, output_folder, manifest=manifest_from_args(args), dry_run=args.dry_run)
+    if args.dry_run:
+        print_plan(result)
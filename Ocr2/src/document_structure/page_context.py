@@ -0,0 +1,170 @@
+import cv2
+import numpy as np
+import pandas as pd
+import pytesseract
+from functools import cached_property
+from html.parser import HTMLParser
+
+from Ocr2.src.utils.result_cache import get_result_cache, hash_array, hash_file
+
+# Проходы Tesseract анализаторов страницы: представление изображения и параметры.
+# Таблицы — серое изображение, единый блок текста; заголовки и абзацы — бинаризация Оцу,
+# автоматическая сегментация; hOCR макета — инвертированное бинарное изображение.
+OCR_PASSES = {
+    "tables": ("gray", '--psm 6'),
+    "text_blocks": ("otsu_binary", ''),
+    "layout": ("binary_inv", '--psm 6'),
+}
+
+
+class _HocrWordParser(HTMLParser):
+    """
+    Извлекает слова из hOCR: текст, рамку, уверенность и идентификатор строки.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.words = []
+        self._line_id = None
+        self._word = None
+
+    @staticmethod
+    def _title_fields(title):
+        fields = {}
+        for part in (title or "").split(";"):
+            values = part.strip().split()
+            if values:
+                fields[values[0]] = values[1:]
+        return fields
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        css_class = attrs.get("class", "")
+        if css_class in ("ocr_line", "ocr_caption", "ocr_header", "ocr_textfloat"):
+            self._line_id = attrs.get("id")
+        elif css_class == "ocrx_word":
+            fields = self._title_fields(attrs.get("title"))
+            x1, y1, x2, y2 = (int(value) for value in fields.get("bbox", [0, 0, 0, 0]))
+            confidence = float(fields.get("x_wconf", [-1])[0])
+            self._word = {"text": "", "left": x1, "top": y1, "width": x2 - x1, "height": y2 - y1,
+                          "conf": confidence, "line": self._line_id}
+
+    def handle_data(self, data):
+        if self._word is not None:
+            self._word["text"] += data
+
+    def handle_endtag(self, tag):
+        if tag == "span" and self._word is not None:
+            self._word["text"] = self._word["text"].strip()
+            if self._word["text"]:
+                self.words.append(self._word)
+            self._word = None
+
+
+class PageContext:
+    """
+    Общий контекст анализа одной страницы: изображение декодируется один раз, а серое
+    и бинарные представления, контуры и проходы Tesseract (OCR_PASSES) вычисляются лениво
+    и переиспользуются анализаторами макета, заголовков и таблиц.
+    """
+
+    def __init__(self, image_path=None, image=None):
+        """
+        :param image_path: Путь к изображению страницы.
+        :param image: Уже декодированное изображение (BGR) вместо пути.
+        """
+        if image_path is None and image is None:
+            raise ValueError("Нужно передать image_path или image")
+        self.image_path = image_path
+        self._hocr = {}
+        if image is not None:
+            self.__dict__["image"] = image
+
+    @cached_property
+    def image(self):
+        image = cv2.imread(self.image_path)
+        if image is None:
+            raise ValueError(f"Не удалось загрузить изображение: {self.image_path}")
+        return image
+
+    @cached_property
+    def content_hash(self):
+        if self.image_path is not None:
+            return hash_file(self.image_path)
+        return hash_array(self.image)
+
+    @cached_property
+    def gray(self):
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def binary_inv(self):
+        _, binary = cv2.threshold(self.gray, 128, 255, cv2.THRESH_BINARY_INV)
+        return binary
+
+    @cached_property
+    def otsu_binary(self):
+        _, binary = cv2.threshold(self.gray, 128, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        return binary
+
+    @cached_property
+    def table_binary(self):
+        from Ocr2.src.document_structure.extract_tables import binarize_table_image
+        return binarize_table_image(self.gray)
+
+    @cached_property
+    def contours(self):
+        contours, _ = cv2.findContours(self.binary_inv, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return contours
+
+    @cached_property
+    def table_grids(self):
+        from Ocr2.src.document_structure.extract_tables import detect_table_grids
+        return detect_table_grids(self.table_binary)
+
+    def hocr_for(self, pass_name, region=None):
+        """
+        Проход Tesseract анализатора по странице или ее области (hOCR); выполняется один раз
+        на страницу, результат кэшируется по содержимому.
+        :param pass_name: Имя прохода из OCR_PASSES.
+        :param region: Область (x, y, w, h) или None — вся страница.
+        """
+        region = tuple(int(value) for value in region) if region is not None else None
+        if (pass_name, region) not in self._hocr:
+            image_name, config = OCR_PASSES[pass_name]
+            cache = get_result_cache()
+            key = cache.make_key("tesseract.hocr", self.content_hash, image=image_name, config=config,
+                                 region=list(region) if region else None)
+            hocr = cache.get(key)
+            if hocr is None:
+                image = getattr(self, image_name)
+                if region is not None:
+                    x, y, w, h = region
+                    image = image[y:y + h, x:x + w]
+                hocr = pytesseract.image_to_pdf_or_hocr(image, extension='hocr', config=config).decode("utf-8")
+                cache.put(key, hocr)
+            self._hocr[(pass_name, region)] = hocr
+        return self._hocr[(pass_name, region)]
+
+    def words_for(self, pass_name, region=None):
+        """
+        Слова прохода Tesseract в координатах страницы: DataFrame с колонками
+        text, left, top, width, height, conf, line.
+        """
+        parser = _HocrWordParser()
+        parser.feed(self.hocr_for(pass_name, region))
+        columns = ["text", "left", "top", "width", "height", "conf", "line"]
+        words = pd.DataFrame(parser.words, columns=columns)
+        words = words.astype({"left": np.int32, "top": np.int32, "width": np.int32, "height": np.int32})
+        if region is not None:
+            words["left"] += int(region[0])
+            words["top"] += int(region[1])
+        return words
+
+def as_page_context(source):
+    """
+    Возвращает PageContext для пути к изображению или сам контекст, если он уже передан.
+    """
+    if isinstance(source, PageContext):
+        return source
+    return PageContext(image_path=source)
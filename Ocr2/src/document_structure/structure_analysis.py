@@ -0,0 +1,27 @@
+from Ocr2.src.document_structure.extract_tables import recognize_tables
+from Ocr2.src.document_structure.heading_paragraph_analysis import analyze_headings_and_paragraphs, extract_text_blocks
+from Ocr2.src.document_structure.layout_analysis import analyze_layout
+from Ocr2.src.document_structure.page_context import as_page_context
+
+
+def analyze_structure(source, output_dir=None):
+    """
+    Полный анализ структуры страницы: блоки макета, заголовки/абзацы и таблицы.
+    Изображение декодируется один раз (общий PageContext), проходы Tesseract кэшируются.
+    :param source: Путь к изображению или PageContext.
+    :param output_dir: Папка для файлов анализа макета (None — ничего не сохранять).
+    :return: Словарь с ключами layout_blocks, headings, paragraphs, tables.
+    """
+    page = as_page_context(source)
+
+    layout_blocks = analyze_layout(page, output_dir)
+    text_blocks = extract_text_blocks(page)
+    headings, paragraphs = analyze_headings_and_paragraphs(text_blocks) if text_blocks else ([], [])
+    tables = recognize_tables(page)
+
+    return {
+        "layout_blocks": layout_blocks,
+        "headings": headings,
+        "paragraphs": paragraphs,
+        "tables": tables,
+    }
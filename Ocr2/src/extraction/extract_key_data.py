@@ -1,17 +1,47 @@
 import spacy
 import json
 import os
+import argparse
+import time
+from functools import lru_cache
 from typing import TextIO
 
-def load_ner_model():
+from Ocr2.src.utils.logging_config import configure_logging
+from Ocr2.src.utils.manifest import add_manifest_arguments, manifest_from_args, pending_inputs, plan_inputs, print_plan
+from Ocr2.src.utils.metrics import stage_timer, timed_iter, timed_stage
 
+NER_MODEL_NAME = "en_core_web_sm"
+STAGE_NAME = "ner"
+STAGE_VERSION = "1"
+# Метки spaCy -> ключи результата
+ENTITY_KEYS = {"DATE": "DATES", "MONEY": "MONEY", "ORG": "ORG", "PERSON": "PERSON"}
+
+@lru_cache(maxsize=None)
+def load_ner_model(model_name=NER_MODEL_NAME):
+    """
+    Загружает модель spaCy один раз на процесс, включая только компонент NER.
+    :param model_name: Имя установленной модели spaCy.
+    :return: Загруженный конвейер spaCy.
+    """
     try:
-        nlp = spacy.load("en_core_web_sm")
-    except OSError:
-        os.system("python -m spacy download en_core_web_sm")
-        nlp = spacy.load("en_core_web_sm")
-    return nlp
+        return spacy.load(model_name, enable=["ner"])
+    except OSError as e:
+        raise RuntimeError(f"Модель spaCy '{model_name}' не установлена: "
+                           f"выполните 'python -m spacy download {model_name}'") from e
+
+def entities_from_doc(doc):
+    """
+    Собирает ключевые сущности из обработанного документа spaCy.
+    :param doc: Документ spaCy.
+    :return: Словарь с извлеченными сущностями.
+    """
+    entities = {key: [] for key in ENTITY_KEYS.values()}
+    for ent in doc.ents:
+        if ent.label_ in ENTITY_KEYS:
+            entities[ENTITY_KEYS[ent.label_]].append(ent.text)
+    return entities
 
+@timed_stage("ner")
 def extract_entities(text, nlp):
     """
     Извлекает ключевые данные из текста с использованием NER.
@@ -19,39 +49,86 @@ def extract_entities(text, nlp):
     :param nlp: Загруженная NER модель.
     :return: Словарь с извлеченными сущностями.
     """
-    doc = nlp(text)
-    entities = {"DATES": [], "MONEY": [], "ORG": [], "PERSON": []}
-    for ent in doc.ents:
-        if ent.label_ in entities:
-            entities[ent.label_].append(ent.text)
-    return entities
+    return entities_from_doc(nlp(text))
 
-def process_ocr_results(ocr_dir, output_dir):
+def extract_entities_batch(texts, nlp, batch_size=64, n_process=1):
+    """
+    Потоково извлекает сущности из множества текстов через nlp.pipe.
+    :param texts: Итерируемый набор текстов.
+    :param nlp: Загруженная NER модель.
+    :param batch_size: Размер батча nlp.pipe.
+    :param n_process: Количество процессов nlp.pipe.
+    :return: Генератор словарей сущностей в порядке входа.
+    """
+    for doc in timed_iter(nlp.pipe(texts, batch_size=batch_size, n_process=n_process), "ner"):
+        yield entities_from_doc(doc)
+
+def _iter_ocr_texts(file_paths):
+    for file_path in file_paths:
+        with open(file_path, "r", encoding="utf-8") as f:
+            ocr_data = json.load(f)
+        yield " ".join(ocr_data.get("text", [])), file_path
+
+def process_ocr_results(ocr_dir, output_dir, batch_size=64, n_process=1, nlp=None, manifest=None, dry_run=False):
     """
     Обрабатывает JSON-файлы с результатами OCR и извлекает ключевые данные.
+    Тексты читаются потоково и обрабатываются батчами через nlp.pipe.
     :param ocr_dir: Путь к папке с JSON-файлами OCR.
     :param output_dir: Путь для сохранения извлеченных данных.
+    :param batch_size: Размер батча nlp.pipe.
+    :param n_process: Количество процессов nlp.pipe.
+    :param nlp: Загруженная модель; по умолчанию общая модель процесса.
+    :param manifest: Manifest для инкрементальной обработки (только новые и измененные файлы).
+    :param dry_run: Только оценить объем ожидающей работы, ничего не обрабатывая.
+    :return: Статистика: документы, токены и пропускная способность (или план при dry_run).
     """
-    os.makedirs(output_dir, exist_ok=True)
-    nlp = load_ner_model()
+    file_paths = [os.path.join(ocr_dir, file_name) for file_name in os.listdir(ocr_dir) if file_name.endswith(".json")]
+    if dry_run:
+        return plan_inputs(manifest, STAGE_NAME, STAGE_VERSION, file_paths)
+    file_paths = pending_inputs(manifest, STAGE_NAME, STAGE_VERSION, file_paths)
 
-    for file_name in os.listdir(ocr_dir):
-        if file_name.endswith(".json"):
-            with open(os.path.join(ocr_dir, file_name), "r", encoding="utf-8") as f:
-                ocr_data = json.load(f)
-                text = " ".join(ocr_data.get("text", []))
+    os.makedirs(output_dir, exist_ok=True)
+    if nlp is None:
+        nlp = load_ner_model()
 
+    start = time.perf_counter()
+    documents, tokens = 0, 0
+    docs = nlp.pipe(_iter_ocr_texts(file_paths), as_tuples=True, batch_size=batch_size, n_process=n_process)
+    for doc, file_path in timed_iter(docs, "ner"):
+        file_name = os.path.basename(file_path)
+        entities = entities_from_doc(doc)
+        documents += 1
+        tokens += len(doc)
 
-            entities = extract_entities(text, nlp)
 
+        output_path = os.path.join(output_dir, file_name.replace(".json", "_ner.json"))
+        with stage_timer("write"), open(output_path, "w", encoding="utf-8") as out_file:  # type: TextIO
+            json.dump(entities, out_file, ensure_ascii=False, indent=4)  # type: ignore
+        print(f"Ключевые данные сохранены: {output_path}")
+        if manifest is not None:
+            manifest.mark_done(STAGE_NAME, file_path, STAGE_VERSION, output_path)
 
-            output_path = os.path.join(output_dir, file_name.replace(".json", "_ner.json"))
-            with open(output_path, "w", encoding="utf-8") as out_file:  # type: TextIO
-                json.dump(entities, out_file, ensure_ascii=False, indent=4)  # type: ignore
-            print(f"Ключевые данные сохранены: {output_path}")
+    elapsed = time.perf_counter() - start
+    stats = {
+        "documents": documents,
+        "tokens": tokens,
+        "seconds": round(elapsed, 3),
+        "docs_per_sec": round(documents / elapsed, 2) if elapsed else None,
+        "tokens_per_sec": round(tokens / elapsed, 2) if elapsed else None,
+    }
+    print(f"Обработано документов: {documents}, {stats['docs_per_sec']} док./с, {stats['tokens_per_sec']} токенов/с")
+    return stats
 
 if __name__ == "__main__":
+    configure_logging()
     ocr_results_dir = "output/ocr_results"
     extracted_data_dir = "output/extracted_data"
 
-    process_ocr_results(ocr_results_dir, extracted_data_dir)
+    parser = argparse.ArgumentParser(description="Извлечение ключевых данных из результатов OCR")
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
+
+    result = process_ocr_results(ocr_results_dir, extracted_data_dir, manifest=manifest_from_args(args),
+                                 dry_run=args.dry_run)
+    if args.dry_run:
+        print_plan(result)
@@ -1,39 +1,198 @@
 import os
+import argparse
+import re
 import json
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import language_tool_python
 
-def check_spelling_and_punctuation(input_dir, output_dir, lang="en-US"):
+from Ocr2.src.utils.logging_config import configure_logging, submit_with_context
+from Ocr2.src.utils.manifest import (add_manifest_arguments, manifest_from_args, pending_inputs, plan_inputs,
+                                     print_plan, track_input)
+from Ocr2.src.utils.metrics import stage_timer, timed_stage
+from Ocr2.src.utils.result_cache import get_result_cache, hash_text
+
+LANGUAGE_TOOL_POOL_SIZE = int(os.environ.get("LANGUAGE_TOOL_POOL_SIZE", 1))
+SPELLCHECK_MAX_CONCURRENCY = int(os.environ.get("SPELLCHECK_MAX_CONCURRENCY", 4))
+MAX_CHUNK_CHARS = 1500
+STAGE_NAME = "spellcheck"
+STAGE_VERSION = "1"
+
+# Граница фрагмента: конец предложения или пустая строка между абзацами
+_CHUNK_BOUNDARY = re.compile(r'[.!?]+\s+|\n\s*\n')
+
+_tools = {}
+# Экземпляры, которые сейчас запускаются (место в пуле уже занято)
+_starting_tools = {}
+_tools_condition = threading.Condition()
+_next_tool = {}
+
+
+def get_language_tool(lang="en-US", pool_size=LANGUAGE_TOOL_POOL_SIZE):
+    """
+    Возвращает долгоживущий экземпляр LanguageTool для языка. Экземпляры (Java-серверы)
+    создаются лениво, не более pool_size на язык, и выдаются по кругу. Запуск JVM идет
+    вне блокировки: остальные потоки тем временем получают уже запущенные экземпляры.
+    :param lang: Язык проверки.
+    :param pool_size: Максимальное количество экземпляров на язык.
+    """
+    with _tools_condition:
+        while True:
+            tools = _tools.setdefault(lang, [])
+            starting = _starting_tools.get(lang, 0)
+            if len(tools) + starting < pool_size:
+                _starting_tools[lang] = starting + 1
+                break
+            if tools:
+                index = _next_tool.get(lang, 0) % len(tools)
+                _next_tool[lang] = index + 1
+                return tools[index]
+            # Все экземпляры языка еще запускаются другими потоками
+            _tools_condition.wait()
+
+    try:
+        tool = language_tool_python.LanguageTool(lang)
+    except Exception:
+        with _tools_condition:
+            _starting_tools[lang] -= 1
+            _tools_condition.notify_all()
+        raise
+
+    with _tools_condition:
+        _starting_tools[lang] -= 1
+        _tools[lang].append(tool)
+        _tools_condition.notify_all()
+    return tool
+
+
+@atexit.register
+def close_language_tools():
+    """
+    Останавливает все запущенные серверы LanguageTool.
+    """
+    with _tools_condition:
+        for tools in _tools.values():
+            for tool in tools:
+                tool.close()
+        _tools.clear()
+
+
+def split_text_chunks(text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Делит текст на фрагменты по границам предложений и абзацев, не длиннее max_chars
+    (если отдельное предложение не длиннее). Конкатенация фрагментов равна исходному тексту.
+    :param text: Исходный текст.
+    :param max_chars: Желаемая максимальная длина фрагмента.
+    :return: Список фрагментов.
+    """
+    pieces = []
+    position = 0
+    for match in _CHUNK_BOUNDARY.finditer(text):
+        pieces.append(text[position:match.end()])
+        position = match.end()
+    if position < len(text):
+        pieces.append(text[position:])
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@timed_stage("spellcheck")
+def check_chunk(chunk, lang="en-US"):
+    """
+    Проверяет фрагмент текста; результат кэшируется по хэшу текста, поэтому
+    повторяющиеся фрагменты (шапки, колонтитулы) проверяются один раз.
+    :return: Словарь {"corrected": исправленный фрагмент, "matches": число ошибок}.
+    """
+    if not chunk.strip():
+        return {"corrected": chunk, "matches": 0}
+
+    cache = get_result_cache()
+    key = cache.make_key("languagetool.chunk", hash_text(chunk), lang=lang)
+
+    def check():
+        matches = get_language_tool(lang).check(chunk)
+        return {"corrected": language_tool_python.utils.correct(chunk, matches), "matches": len(matches)}
+
+    return cache.get_or_compute(key, check)
+
+
+def check_text(text, lang="en-US", executor=None, max_chunk_chars=MAX_CHUNK_CHARS):
+    """
+    Проверяет текст по фрагментам, при наличии исполнителя — параллельно.
+    :param text: Исходный текст.
+    :param lang: Язык проверки.
+    :param executor: ThreadPoolExecutor для параллельной проверки фрагментов.
+    :param max_chunk_chars: Желаемая максимальная длина фрагмента.
+    :return: Кортеж (исправленный текст, количество найденных ошибок).
+    """
+    chunks = split_text_chunks(text, max_chunk_chars)
+    if executor is None:
+        results = [check_chunk(chunk, lang) for chunk in chunks]
+    else:
+        futures = [submit_with_context(executor, check_chunk, chunk, lang) for chunk in chunks]
+        results = [future.result() for future in futures]
+    return "".join(result["corrected"] for result in results), sum(result["matches"] for result in results)
+
+
+def check_spelling_and_punctuation(input_dir, output_dir, lang="en-US", max_concurrency=SPELLCHECK_MAX_CONCURRENCY,
+                                   max_chunk_chars=MAX_CHUNK_CHARS, manifest=None, dry_run=False):
     """
     Проверяет текст на орфографические и пунктуационные ошибки с использованием LanguageTool.
     :param input_dir: Путь к папке с JSON-файлами OCR.
     :param output_dir: Путь для сохранения исправленного текста.
     :param lang: Язык для проверки (по умолчанию 'en-US').
+    :param max_concurrency: Максимальное число одновременно проверяемых фрагментов.
+    :param max_chunk_chars: Желаемая максимальная длина фрагмента.
+    :param manifest: Manifest для инкрементальной обработки (только новые и измененные файлы).
+    :param dry_run: Только оценить объем ожидающей работы, ничего не обрабатывая.
     """
+    file_paths = [os.path.join(input_dir, file_name) for file_name in os.listdir(input_dir) if file_name.endswith(".json")]
+    stage = f"{STAGE_NAME}:{lang}"
+    if dry_run:
+        return plan_inputs(manifest, stage, STAGE_VERSION, file_paths)
+
     os.makedirs(output_dir, exist_ok=True)
-    tool = language_tool_python.LanguageTool(lang)
 
-    for file_name in os.listdir(input_dir):
-        if file_name.endswith(".json"):
-            file_path = os.path.join(input_dir, file_name)
-            with open(file_path, "r", encoding="utf-8") as f:
-                ocr_data = json.load(f)
-                text = " ".join(ocr_data.get("text", []))
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        for file_path in pending_inputs(manifest, stage, STAGE_VERSION, file_paths):
+            file_name = os.path.basename(file_path)
+            output_file_path = os.path.join(output_dir, file_name.replace(".json", "_corrected.txt"))
+            with track_input(manifest, stage, STAGE_VERSION, file_path, output_file_path):
+                with open(file_path, "r", encoding="utf-8") as f:
+                    ocr_data = json.load(f)
+                    text = " ".join(ocr_data.get("text", []))
 
 
-            matches = tool.check(text)
-            corrected_text = language_tool_python.utils.correct(text, matches)
+                corrected_text, match_count = check_text(text, lang, executor, max_chunk_chars)
 
 
-            output_file_path = os.path.join(output_dir, file_name.replace(".json", "_corrected.txt"))
-            with open(output_file_path, "w", encoding="utf-8") as out_file:
-                out_file.write(corrected_text)
+                with stage_timer("write"), open(output_file_path, "w", encoding="utf-8") as out_file:
+                    out_file.write(corrected_text)
 
-            print(f"Исправленный текст сохранен: {output_file_path}")
-            print(f"Найдено ошибок: {len(matches)}")
+                print(f"Исправленный текст сохранен: {output_file_path}")
+                print(f"Найдено ошибок: {match_count}")
 
 
 if __name__ == "__main__":
+    configure_logging()
     input_folder = "output/ocr_results"
     output_folder = "output/corrected_text"
 
-    check_spelling_and_punctuation(input_folder, output_folder, lang="en-US")
+    parser = argparse.ArgumentParser(description="Проверка орфографии и пунктуации")
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
+
+    result = check_spelling_and_punctuation(input_folder, output_folder, lang="en-US",
+                                            manifest=manifest_from_args(args), dry_run=args.dry_run)
+    if args.dry_run:
+        print_plan(result)
@@ -0,0 +1,146 @@
+import os
+import time
+import logging
+
+import numpy as np
+
+from Ocr2.src.ocr.page_scaling import ADAPTIVE_SCALING, map_boxes_back, prepare_page, scaling_cache_params
+from Ocr2.src.ocr.reader_pool import DEFAULT_LANGUAGES, acquire_reader
+from Ocr2.src.utils.result_cache import get_result_cache, hash_array
+
+# Страниц PDF в одном вызове readtext_batched (детектор обрабатывает их одним батчем).
+# По умолчанию 1 — постраничный OCR: результат каждой страницы готов сразу, батч не занимает окно страниц
+OCR_PAGES_PER_BATCH = int(os.environ.get("OCR_PAGES_PER_BATCH", "1"))
+# Размер батча явно выбранного режима "batched" для папки изображений, если OCR_PAGES_PER_BATCH не задан
+BATCHED_MODE_PAGES_PER_BATCH = 4
+# Размер батча распознавателя (фрагментов текста за один проход)
+OCR_RECOGNIZER_BATCH_SIZE = int(os.environ.get("OCR_RECOGNIZER_BATCH_SIZE", "16"))
+# Шаг округления размеров страниц: страницы одной группы дополняются до общего размера
+OCR_SIZE_STEP = int(os.environ.get("OCR_SIZE_STEP", "256"))
+
+
+def _as_rgb(image):
+    if image.ndim == 2:
+        return np.stack([image] * 3, axis=-1)
+    if image.shape[2] == 4:
+        return image[:, :, :3]
+    return image
+
+
+def size_group(image, size_step=OCR_SIZE_STEP):
+    """
+    Ключ группы страницы: высота и ширина, округленные вверх до size_step.
+    """
+    height, width = image.shape[:2]
+    return -(-height // size_step) * size_step, -(-width // size_step) * size_step
+
+
+def pad_to(image, height, width):
+    """
+    Дополняет изображение белым полем справа и снизу до заданного размера; координаты
+    распознанного текста при этом не меняются.
+    """
+    padded = np.full((height, width, 3), 255, dtype=np.uint8)
+    padded[:image.shape[0], :image.shape[1]] = image
+    return padded
+
+
+def _cache_key(cache, image, languages, detail, contrast_ths, adjust_contrast, adaptive_scaling):
+    # Ключи совпадают с ocr_page_image (detail=0) и ocr_image_array (detail=1)
+    params = {"languages": list(languages), "detail": detail, **scaling_cache_params(adaptive_scaling)}
+    if contrast_ths is not None:
+        params.update(contrast_ths=contrast_ths, adjust_contrast=adjust_contrast)
+    return cache.make_key("easyocr.readtext", hash_array(image), **params)
+
+
+def ocr_pages_batched(images, languages=DEFAULT_LANGUAGES, detail=0, pages_per_batch=OCR_PAGES_PER_BATCH,
+                      recognizer_batch_size=OCR_RECOGNIZER_BATCH_SIZE, size_step=OCR_SIZE_STEP,
+                      contrast_ths=None, adjust_contrast=None, batch_stats=None, adaptive_scaling=ADAPTIVE_SCALING):
+    """
+    Пакетный OCR страниц одного или нескольких документов через readtext_batched. Страницы
+    группируются по размеру (с округлением до size_step), внутри группы дополняются до общего
+    размера и распознаются батчами; результаты возвращаются в порядке входа.
+    :param images: Список RGB- или серых массивов страниц.
+    :param languages: Языки распознавания.
+    :param detail: 0 — список строк, 1 — словари {"text", "confidence", "box"}.
+    :param pages_per_batch: Страниц в одном вызове readtext_batched.
+    :param recognizer_batch_size: Размер батча распознавателя.
+    :param size_step: Шаг округления размеров при группировке.
+    :param contrast_ths: Порог контраста EasyOCR (None — значение ридера по умолчанию).
+    :param adjust_contrast: Коррекция контраста EasyOCR.
+    :param batch_stats: Список, в который добавляется время каждого батча.
+    :param adaptive_scaling: Обрезать страницы до текста и уменьшать до целевой высоты текста
+        перед группировкой; рамки возвращаются в координатах исходных страниц.
+    :return: Список результатов по страницам.
+    """
+    from Ocr2.src.ocr.easyocr_inference import format_ocr_details
+
+    cache = get_result_cache()
+    results = [None] * len(images)
+    keys = [None] * len(images)
+    transforms = [None] * len(images)
+    groups = {}
+    for index, image in enumerate(images):
+        image = _as_rgb(image)
+        keys[index] = _cache_key(cache, image, languages, detail, contrast_ths, adjust_contrast, adaptive_scaling)
+        cached = cache.get(keys[index])
+        if cached is not None:
+            results[index] = cached
+            continue
+        if adaptive_scaling:
+            image, transforms[index] = prepare_page(image)
+        groups.setdefault(size_group(image, size_step), []).append((index, image))
+
+    options = {"batch_size": recognizer_batch_size, "detail": detail}
+    if contrast_ths is not None:
+        options.update(contrast_ths=contrast_ths, adjust_contrast=adjust_contrast)
+
+    if not groups:
+        return results
+
+    with acquire_reader(languages) as reader:
+        for (height, width), members in groups.items():
+            for start in range(0, len(members), pages_per_batch):
+                batch = members[start:start + pages_per_batch]
+                batch_start = time.perf_counter()
+                raw = reader.readtext_batched([pad_to(image, height, width) for _, image in batch], **options)
+                elapsed = time.perf_counter() - batch_start
+                if batch_stats is not None:
+                    batch_stats.append({"pages": len(batch), "height": height, "width": width,
+                                        "seconds": round(elapsed, 4)})
+                logging.info(f"Батч OCR: {len(batch)} стр. {width}x{height} за {elapsed:.2f} с")
+
+                for (index, _), page_result in zip(batch, raw):
+                    if detail:
+                        page_result = format_ocr_details(page_result)
+                        if transforms[index]:
+                            page_result = map_boxes_back(page_result, transforms[index])
+                    results[index] = page_result
+                    cache.put(keys[index], page_result)
+    return results
+
+
+def split_page_window(page_window, pages_per_batch):
+    """
+    Делит окно страниц PDF между собираемым батчем OCR и очередью рендеринга так, чтобы батч
+    не расширял окно: батч + очередь = page_window + 1, как у постраничного OCR (страница в работе
+    и page_window в очереди). Батч не больше page_window.
+    :return: Кортеж (страниц в батче, окно очереди рендеринга).
+    """
+    batch = max(1, min(pages_per_batch, page_window))
+    return batch, max(1, page_window - batch + 1)
+
+
+def iter_batched(items, pages_per_batch=OCR_PAGES_PER_BATCH):
+    """
+    Собирает поток (ключ, изображение) в группы по pages_per_batch для пакетного OCR.
+    :return: Генератор списков пар.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= pages_per_batch:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
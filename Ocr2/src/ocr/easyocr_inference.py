@@ -1,37 +1,172 @@
-import easyocr
 import os
 import json
 import logging
-from concurrent.futures import ThreadPoolExecutor
 
+import cv2
+import numpy as np
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("ocr_processing.log", mode='w', encoding='utf-8')
+from Ocr2.src.ocr.executors import OcrExecutor
+from Ocr2.src.ocr.page_scaling import ADAPTIVE_SCALING, map_boxes_back, prepare_page, scaling_cache_params
+from Ocr2.src.ocr.reader_pool import DEFAULT_LANGUAGES, acquire_reader
+from Ocr2.src.utils.logging_config import configure_logging
+from Ocr2.src.utils.metrics import count_pages, stage_timer, timed_stage
+from Ocr2.src.utils.result_cache import get_result_cache, hash_array, hash_file
+
+
+def read_image_text(image_path, languages=DEFAULT_LANGUAGES, contrast_ths=0.7, adjust_contrast=0.5, reader=None,
+                    adaptive_scaling=ADAPTIVE_SCALING):
+    """
+    Распознает текст на изображении с учетом кэша результатов.
+    :param image_path: Путь к изображению.
+    :param languages: Языки распознавания.
+    :param contrast_ths: Порог контраста EasyOCR.
+    :param adjust_contrast: Коррекция контраста EasyOCR.
+    :param reader: Готовый ридер; если не задан, берется из общего пула.
+    :param adaptive_scaling: Обрезать изображение до текста и уменьшать до целевой высоты текста
+        перед распознаванием (как для страниц PDF и загрузок).
+    :return: Список распознанных строк.
+    """
+    if reader is not None:
+        languages = reader.lang_list
+
+    cache = get_result_cache()
+    key = cache.make_key("easyocr.readtext", hash_file(image_path), languages=list(languages),
+                         contrast_ths=contrast_ths, adjust_contrast=adjust_contrast, detail=0,
+                         **scaling_cache_params(adaptive_scaling))
+    results = cache.get(key)
+    if results is not None:
+        return results
+
+    source = image_path
+    if adaptive_scaling:
+        with stage_timer("decode"):
+            image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"Не удалось загрузить изображение: {image_path}")
+        # Только текст (detail=0): рамки переводить в исходные координаты не нужно
+        source, _ = prepare_page(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+    if reader is None:
+        with acquire_reader(languages) as pooled_reader:
+            results = pooled_reader.readtext(source, detail=0, contrast_ths=contrast_ths,
+                                             adjust_contrast=adjust_contrast)
+    else:
+        results = reader.readtext(source, detail=0, contrast_ths=contrast_ths, adjust_contrast=adjust_contrast)
+
+    cache.put(key, results)
+    return results
+
+@timed_stage("decode")
+def decode_image_bytes(data):
+    """
+    Декодирует изображение из байтов (тело запроса) без записи на диск.
+    :param data: Байты файла изображения.
+    :return: RGB-массив numpy.
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Не удалось декодировать изображение")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def format_ocr_details(raw_results):
+    """
+    Приводит результат readtext(detail=1) к JSON-сериализуемому виду.
+    :param raw_results: Список (bbox, текст, уверенность) от EasyOCR.
+    :return: Список словарей {"text", "confidence", "box"}.
+    """
+    return [
+        {"text": text, "confidence": round(float(confidence), 4), "box": [[int(x), int(y)] for x, y in box]}
+        for box, text, confidence in raw_results
     ]
-)
 
-def process_image(reader, image_path, output_dir, contrast_ths=0.7, adjust_contrast=0.5):
+def ocr_image_array(image, languages=DEFAULT_LANGUAGES, contrast_ths=0.7, adjust_contrast=0.5,
+                    adaptive_scaling=ADAPTIVE_SCALING):
+    """
+    Распознает текст с координатами на изображении, уже находящемся в памяти.
+    :param image: RGB-массив numpy.
+    :param languages: Языки распознавания.
+    :param contrast_ths: Порог контраста EasyOCR.
+    :param adjust_contrast: Коррекция контраста EasyOCR.
+    :param adaptive_scaling: Обрезать страницу до текста и уменьшать до целевой высоты текста
+        перед распознаванием (рамки возвращаются в координатах исходного изображения).
+    :return: Список словарей {"text", "confidence", "box"}.
+    """
+    cache = get_result_cache()
+    key = cache.make_key("easyocr.readtext", hash_array(image), languages=list(languages),
+                         contrast_ths=contrast_ths, adjust_contrast=adjust_contrast, detail=1,
+                         **scaling_cache_params(adaptive_scaling))
+
+    def recognize():
+        prepared, transform = prepare_page(image) if adaptive_scaling else (image, None)
+        with acquire_reader(languages) as reader:
+            raw_results = reader.readtext(prepared, detail=1, contrast_ths=contrast_ths,
+                                          adjust_contrast=adjust_contrast)
+        details = format_ocr_details(raw_results)
+        return map_boxes_back(details, transform) if transform else details
+
+    return cache.get_or_compute(key, recognize)
+
+def process_image(reader, image_path, output_dir, contrast_ths=0.7, adjust_contrast=0.5, languages=DEFAULT_LANGUAGES):
     file_name = os.path.basename(image_path)
     try:
         logging.info(f"Начало обработки файла: {file_name}")
-        results = reader.readtext(image_path, detail=0, contrast_ths=contrast_ths, adjust_contrast=adjust_contrast)
+        results = read_image_text(image_path, languages, contrast_ths, adjust_contrast, reader=reader)
 
         output_path = os.path.join(output_dir, f"{os.path.splitext(file_name)[0]}.json")
 
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with stage_timer("write"), open(output_path, 'w', encoding='utf-8') as f:
             json.dump({"file": file_name, "text": results}, f, ensure_ascii=False, indent=4)  # type: ignore
+        count_pages()
 
         logging.info(f"Успешная обработка файла: {file_name}, результат сохранен в {output_path}")
     except Exception as e:
         logging.error(f"Ошибка обработки файла {file_name}: {e}")
 
-def ocr_with_easyocr(input_dir, output_dir, num_threads=4, contrast_ths=0.7, adjust_contrast=0.5):
-    reader = easyocr.Reader(['en', 'ru'])
+def ocr_images_batched(image_files, output_dir, contrast_ths=0.7, adjust_contrast=0.5, languages=DEFAULT_LANGUAGES,
+                       pages_per_batch=None):
+    """
+    OCR списка изображений батчами readtext_batched; результаты сохраняются в том же формате,
+    что и process_image.
+    :param pages_per_batch: Изображений в одном батче (по умолчанию OCR_PAGES_PER_BATCH, если он больше 1,
+        иначе BATCHED_MODE_PAGES_PER_BATCH).
+    """
+    from Ocr2.src.ocr.batched_ocr import (BATCHED_MODE_PAGES_PER_BATCH, OCR_PAGES_PER_BATCH, iter_batched,
+                                          ocr_pages_batched)
+
+    if not pages_per_batch:
+        pages_per_batch = OCR_PAGES_PER_BATCH if OCR_PAGES_PER_BATCH > 1 else BATCHED_MODE_PAGES_PER_BATCH
+    for batch in iter_batched(image_files, pages_per_batch):
+        images, paths = [], []
+        for image_path in batch:
+            with stage_timer("decode"):
+                image = cv2.imread(image_path)
+            if image is None:
+                logging.error(f"Ошибка обработки файла {os.path.basename(image_path)}: не удалось загрузить изображение")
+                continue
+            images.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            paths.append(image_path)
+
+        texts = ocr_pages_batched(images, languages, detail=0, pages_per_batch=pages_per_batch,
+                                  contrast_ths=contrast_ths, adjust_contrast=adjust_contrast)
+        count_pages(len(paths))
+        for image_path, results in zip(paths, texts):
+            file_name = os.path.basename(image_path)
+            output_path = os.path.join(output_dir, f"{os.path.splitext(file_name)[0]}.json")
+            with stage_timer("write"), open(output_path, 'w', encoding='utf-8') as f:
+                json.dump({"file": file_name, "text": results}, f, ensure_ascii=False, indent=4)  # type: ignore
+            logging.info(f"Успешная обработка файла: {file_name}, результат сохранен в {output_path}")
+
+def ocr_with_easyocr(input_dir, output_dir, num_threads=4, contrast_ths=0.7, adjust_contrast=0.5,
+                     languages=DEFAULT_LANGUAGES, mode="thread", executor=None):
+    """
+    OCR всех изображений папки.
+    :param input_dir: Папка с изображениями.
+    :param output_dir: Папка для JSON-результатов.
+    :param num_threads: Количество рабочих, если исполнитель создается здесь.
+    :param mode: Режим исполнителя: "inline", "thread", "process" (см. OcrExecutor)
+                 или "batched" (readtext_batched в текущем процессе).
+    :param executor: Готовый OcrExecutor; если задан, mode и num_threads не используются.
+    """
     os.makedirs(output_dir, exist_ok=True)
 
     image_files = [
@@ -40,18 +175,30 @@ def ocr_with_easyocr(input_dir, output_dir, num_threads=4, contrast_ths=0.7, adj
         if isinstance(file_name, str) and file_name.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.tiff'))
     ]
 
-    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+    if mode == "batched" and executor is None:
+        ocr_images_batched(image_files, output_dir, contrast_ths, adjust_contrast, languages)
+        return
+
+    owns_executor = executor is None
+    if owns_executor:
+        executor = OcrExecutor(mode, num_workers=num_threads, languages=languages)
+
+    try:
         futures = [
-            executor.submit(process_image, reader, image_path, output_dir, contrast_ths, adjust_contrast)
+            executor.submit(process_image, None, image_path, output_dir, contrast_ths, adjust_contrast, languages)
             for image_path in image_files
         ]
         for future in futures:
             try:
                 future.result()
             except Exception as e:
-                logging.error(f"Ошибка при выполнении потока: {e}")
+                logging.error(f"Ошибка при выполнении задачи: {e}")
+    finally:
+        if owns_executor:
+            executor.shutdown()
 
 if __name__ == "__main__":
+    configure_logging()
     input_folder = "data/processed_train\train"
     output_folder = "output/ocr_results"
 
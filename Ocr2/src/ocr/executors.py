@@ -0,0 +1,176 @@
+import os
+import logging
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from Ocr2.src.ocr.reader_pool import DEFAULT_LANGUAGES, acquire_reader, get_reader_pool
+from Ocr2.src.utils.logging_config import submit_with_context
+
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+def default_worker_count(mode):
+    """
+    Количество рабочих по умолчанию: все ядра для потоков, для процессов — на одно меньше,
+    чтобы оставить ядро основному процессу.
+    :param mode: Режим исполнителя ("inline", "thread" или "process").
+    """
+    cpu_count = os.cpu_count() or 1
+    if mode == "inline":
+        return 1
+    if mode == "process":
+        return max(1, cpu_count - 1)
+    return max(1, cpu_count)
+
+
+def _init_process_worker(languages, torch_threads, preload_reader):
+    """
+    Инициализация процесса-рабочего: ограничение потоков torch/OpenCV и загрузка одного ридера.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    try:
+        import cv2
+        cv2.setNumThreads(1)
+    except ImportError:
+        pass
+
+    if preload_reader:
+        get_reader_pool(languages, max_size=1).warmup()
+
+
+def _attach_shared_array(handle):
+    name, shape, dtype = handle
+    shm = shared_memory.SharedMemory(name=name)
+    # Сегментом владеет родительский процесс; без этого resource_tracker рабочего удалит его при выходе
+    resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _run_on_shared_array(task, handle, kwargs):
+    shm, array = _attach_shared_array(handle)
+    try:
+        return task(array, **kwargs)
+    finally:
+        del array
+        shm.close()
+
+
+def easyocr_readtext_task(image, languages=DEFAULT_LANGUAGES, detail=0, contrast_ths=0.7, adjust_contrast=0.5):
+    """
+    Задача для исполнителя: распознавание изображения ридером текущего процесса.
+    :param image: RGB-массив numpy или путь к изображению.
+    :return: Результат reader.readtext (при detail=1 — в JSON-сериализуемом виде).
+    """
+    with acquire_reader(languages) as reader:
+        results = reader.readtext(image, detail=detail, contrast_ths=contrast_ths, adjust_contrast=adjust_contrast)
+    if detail:
+        from Ocr2.src.ocr.easyocr_inference import format_ocr_details
+        return format_ocr_details(results)
+    return results
+
+
+class OcrExecutor:
+    """
+    Подключаемый исполнитель для OCR-задач: "inline" (в текущем потоке), "thread" (пул потоков
+    с общим пулом ридеров) и "process" (пул процессов, в каждом свой ридер, изображения
+    передаются через разделяемую память).
+    """
+
+    def __init__(self, mode="thread", num_workers=None, languages=DEFAULT_LANGUAGES, torch_threads=None,
+                 preload_reader=True):
+        """
+        :param mode: Режим исполнителя: "inline", "thread" или "process".
+        :param num_workers: Количество рабочих; по умолчанию выбирается по os.cpu_count().
+        :param languages: Языки ридера, загружаемого в процессах-рабочих.
+        :param torch_threads: Потоков torch на процесс; по умолчанию ядра делятся между процессами поровну.
+        :param preload_reader: Загружать ли ридер при старте процесса-рабочего.
+        """
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Неизвестный режим исполнителя: {mode}, ожидается один из {EXECUTOR_MODES}")
+
+        self.mode = mode
+        self.num_workers = num_workers or default_worker_count(mode)
+        self.languages = languages
+
+        if mode == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=self.num_workers)
+        elif mode == "process":
+            cpu_count = os.cpu_count() or 1
+            self.torch_threads = torch_threads or max(1, cpu_count // self.num_workers)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                initializer=_init_process_worker,
+                initargs=(tuple(languages), self.torch_threads, preload_reader),
+            )
+        else:
+            self._executor = None
+        logging.info(f"Исполнитель OCR: режим {mode}, рабочих {self.num_workers}")
+
+    def submit(self, task, *args, **kwargs):
+        """
+        Выполняет задачу в исполнителе. Для режима "process" задача должна быть функцией
+        верхнего уровня модуля, а аргументы — сериализуемыми.
+        :return: Future с результатом.
+        """
+        if self._executor is None:
+            future = Future()
+            try:
+                future.set_result(task(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        if self.mode == "thread":
+            return submit_with_context(self._executor, task, *args, **kwargs)
+        return self._executor.submit(task, *args, **kwargs)
+
+    def map(self, task, items, **kwargs):
+        """
+        Применяет задачу к каждому элементу; порядок результатов совпадает с порядком входа.
+        """
+        futures = [self.submit(task, item, **kwargs) for item in items]
+        return [future.result() for future in futures]
+
+    def map_arrays(self, task, arrays, **kwargs):
+        """
+        Применяет задачу к массивам numpy. В режиме "process" массивы передаются через
+        разделяемую память, а не сериализуются целиком.
+        :param task: Функция task(array, **kwargs) верхнего уровня модуля.
+        :param arrays: Итерируемый набор массивов.
+        :return: Список результатов в порядке входа.
+        """
+        if self.mode != "process":
+            return self.map(task, arrays, **kwargs)
+
+        segments = []
+        try:
+            futures = []
+            for array in arrays:
+                array = np.ascontiguousarray(array)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+                segments.append(shm)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+                handle = (shm.name, array.shape, array.dtype.str)
+                futures.append(self._executor.submit(_run_on_shared_array, task, handle, kwargs))
+            return [future.result() for future in futures]
+        finally:
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
@@ -1,38 +1,274 @@
 import os
-from pdf2image import convert_from_path
+import argparse
+import queue
+import threading
+import numpy as np
+from PIL import Image
+from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_bytes, pdfinfo_from_path
 from docx import Document
-import easyocr
 import json
+import contextvars
 
+from Ocr2.src.ocr.batched_ocr import OCR_PAGES_PER_BATCH, iter_batched, ocr_pages_batched, split_page_window
+from Ocr2.src.ocr.easyocr_inference import ocr_image_array
+from Ocr2.src.ocr.page_scaling import ADAPTIVE_SCALING, prepare_page, scaling_cache_params
+from Ocr2.src.ocr.pdf_text_layer import USE_TEXT_LAYER, route_pdf_pages
+from Ocr2.src.ocr.reader_pool import DEFAULT_LANGUAGES, acquire_reader
+from Ocr2.src.utils.logging_config import configure_logging
+from Ocr2.src.utils.manifest import (add_manifest_arguments, manifest_from_args, pending_inputs, plan_inputs,
+                                     print_plan, track_input)
+from Ocr2.src.utils.metrics import count_pages, stage_timer
+from Ocr2.src.utils.result_cache import get_result_cache, hash_array, hash_file
 
-reader = easyocr.Reader(['en', 'ru'])
 
+STAGE_NAME = "multi_page_ocr"
+STAGE_VERSION = "1"
 
-def process_pdf(pdf_path, output_dir, dpi=300):
+_END_OF_PAGES = object()
+
+
+def count_pdf_pages(pdf_path):
+    """
+    Возвращает количество страниц PDF без рендеринга.
+    :param pdf_path: Путь к PDF-файлу или его содержимое в байтах.
+    """
+    if isinstance(pdf_path, bytes):
+        return pdfinfo_from_bytes(pdf_path)["Pages"]
+    return pdfinfo_from_path(pdf_path)["Pages"]
+
+
+def _page_runs(page_numbers, render_chunk):
+    """
+    Группирует номера страниц в непрерывные диапазоны длиной не более render_chunk.
     """
-    Обрабатывает многостраничный PDF: конвертирует страницы в изображения и выполняет OCR.
+    runs = []
+    for page_number in page_numbers:
+        if runs and page_number == runs[-1][1] + 1 and runs[-1][1] - runs[-1][0] + 1 < render_chunk:
+            runs[-1][1] = page_number
+        else:
+            runs.append([page_number, page_number])
+    return runs
+
+
+def iter_pdf_pages(pdf_path, dpi=300, page_window=2, render_chunk=1, page_numbers=None):
+    """
+    Постранично рендерит PDF в фоновом потоке и отдает страницы по мере готовности.
+    В памяти одновременно находится не более page_window + render_chunk + 1 страниц.
+    :param pdf_path: Путь к PDF-файлу или его содержимое в байтах.
+    :param dpi: Разрешение изображения.
+    :param page_window: Сколько отрендеренных страниц может ждать обработки.
+    :param render_chunk: Сколько страниц рендерится за один вызов pdftoppm (first_page/last_page).
+    :param page_numbers: Рендерить только эти страницы (по умолчанию все).
+    :return: Генератор кортежей (номер страницы, RGB-массив numpy).
+    """
+    if page_numbers is None:
+        page_numbers = range(1, count_pdf_pages(pdf_path) + 1)
+    runs = _page_runs(sorted(page_numbers), max(1, render_chunk))
+    convert = convert_from_bytes if isinstance(pdf_path, bytes) else convert_from_path
+    pages = queue.Queue(maxsize=max(1, page_window))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def render():
+        try:
+            for first_page, last_page in runs:
+                images = convert(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+                for offset, image in enumerate(images):
+                    array = np.asarray(image.convert("RGB"))
+                    image.close()
+                    if not put((first_page + offset, array)):
+                        return
+        except Exception as e:
+            put(e)
+        finally:
+            put(_END_OF_PAGES)
+
+    # Поток рендеринга наследует контекст вызывающего (request_id в логах)
+    renderer = threading.Thread(target=contextvars.copy_context().run, args=(render,), name="pdf-render", daemon=True)
+    renderer.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _END_OF_PAGES:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        renderer.join()
+
+
+def ocr_page_image(page_image, languages=DEFAULT_LANGUAGES, adaptive_scaling=ADAPTIVE_SCALING):
+    """
+    Распознает текст на изображении страницы, переданном массивом numpy.
+    Результат кэшируется по хэшу пикселей страницы.
+    :param page_image: RGB-массив страницы.
+    :param languages: Языки распознавания (ридер берется из общего пула).
+    :param adaptive_scaling: Обрезать страницу до текста и уменьшать до целевой высоты текста.
+    :return: Список строк.
+    """
+    cache = get_result_cache()
+    key = cache.make_key("easyocr.readtext", hash_array(page_image), languages=list(languages), detail=0,
+                         **scaling_cache_params(adaptive_scaling))
+
+    def recognize():
+        prepared = prepare_page(page_image)[0] if adaptive_scaling else page_image
+        with acquire_reader(languages) as reader:
+            return reader.readtext(prepared, detail=0)
+
+    return cache.get_or_compute(key, recognize)
+
+
+def iter_pdf_ocr(pdf_path, dpi=300, languages=DEFAULT_LANGUAGES, page_window=2):
+    """
+    Потоковый OCR PDF: рендер следующей страницы идет параллельно с распознаванием текущей.
+    :param pdf_path: Путь к PDF-файлу.
+    :param dpi: Разрешение изображения.
+    :param languages: Языки распознавания (ридер берется из общего пула).
+    :param page_window: Окно отрендеренных страниц, ограничивающее пиковую память.
+    :return: Генератор словарей {"page": номер, "text": [строки]} по мере готовности страниц.
+    """
+    for page_number, page_image in iter_pdf_pages(pdf_path, dpi=dpi, page_window=page_window):
+        yield {"page": page_number, "text": ocr_page_image(page_image, languages)}
+
+
+def ocr_pdf_bytes(pdf_data, dpi=300, languages=DEFAULT_LANGUAGES, page_window=2, use_text_layer=USE_TEXT_LAYER,
+                  pages_per_batch=OCR_PAGES_PER_BATCH):
+    """
+    OCR PDF, загруженного в память: текст и координаты строк по страницам, без файлов на диске.
+    Страницы с пригодным текстовым слоем не рендерятся и не распознаются.
+    :param pdf_data: Содержимое PDF в байтах.
+    :param dpi: Разрешение изображения.
+    :param languages: Языки распознавания.
+    :param page_window: Окно отрендеренных страниц, ограничивающее пиковую память.
+    :param use_text_layer: Брать текст из текстового слоя PDF, где он пригоден.
+    :param pages_per_batch: Страниц в одном батче OCR (1 — постраничный readtext); батч входит в page_window.
+    :return: Список словарей {"page", "text", "boxes", "source"}.
+    """
+    text_pages, ocr_pages, report = route_pdf_pages(pdf_data, count_pdf_pages(pdf_data), dpi, use_text_layer)
+    results = dict(text_pages)
+    if ocr_pages:
+        pages_per_batch, render_window = split_page_window(page_window, pages_per_batch)
+        rendered = iter_pdf_pages(pdf_data, dpi=dpi, page_window=render_window, page_numbers=ocr_pages)
+        for batch in iter_batched(rendered, pages_per_batch):
+            if pages_per_batch > 1:
+                # Те же параметры контраста, что у ocr_image_array: общий кэш страниц
+                page_boxes = ocr_pages_batched([page_image for _, page_image in batch], languages, detail=1,
+                                               pages_per_batch=pages_per_batch, contrast_ths=0.7,
+                                               adjust_contrast=0.5)
+            else:
+                page_boxes = [ocr_image_array(page_image, languages) for _, page_image in batch]
+            for (page_number, _), boxes in zip(batch, page_boxes):
+                results[page_number] = {"page": page_number, "text": [box["text"] for box in boxes], "boxes": boxes,
+                                        "source": "ocr"}
+    count_pages(len(ocr_pages), "ocr")
+    count_pages(len(text_pages), "text_layer")
+    return [results[page_number] for page_number in sorted(results)]
+
+
+def _save_page_result(page_result, output_dir, pdf_name):
+    result_path = os.path.join(output_dir, f"{pdf_name}_page_{page_result['page']}.json")
+    with stage_timer("write"), open(result_path, "w", encoding="utf-8") as f:
+        json.dump(page_result, f, ensure_ascii=False, indent=4)  # type: ignore
+    print(f"OCR результат сохранен: {result_path}")
+
+
+def process_pdf(pdf_path, output_dir, dpi=300, languages=DEFAULT_LANGUAGES, page_window=2,
+                save_images=False, on_page=None, use_text_layer=USE_TEXT_LAYER, pages_per_batch=OCR_PAGES_PER_BATCH):
+    """
+    Обрабатывает многостраничный PDF: страницы с пригодным текстовым слоем берутся из него,
+    остальные постранично рендерятся и распознаются без промежуточных файлов. Результат каждой
+    страницы сохраняется сразу после готовности, отчет о маршрутизации — в {имя}_report.json.
     :param pdf_path: Путь к PDF-файлу.
     :param output_dir: Путь для сохранения результатов.
     :param dpi: Разрешение изображения.
+    :param languages: Языки распознавания (ридер берется из общего пула).
+    :param page_window: Окно отрендеренных страниц, ограничивающее пиковую память.
+    :param save_images: Сохранять ли изображения страниц в JPEG.
+    :param on_page: Необязательный callback, вызываемый с результатом каждой страницы.
+    :param use_text_layer: Брать текст из текстового слоя PDF, где он пригоден.
+    :param pages_per_batch: Страниц в одном батче OCR (1 — постраничный readtext); батч входит в page_window.
+    :return: Список результатов по страницам.
     """
     os.makedirs(output_dir, exist_ok=True)
     pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
 
+    # Повторно загруженный документ целиком отдается из кэша, без рендеринга страниц
+    cache = get_result_cache()
+    document_key = cache.make_key("easyocr.pdf", hash_file(pdf_path), languages=list(languages), dpi=dpi, detail=0,
+                                  text_layer=use_text_layer, **scaling_cache_params())
+    cached_pages = None if save_images else cache.get(document_key)
+    if cached_pages is not None:
+        count_pages(len(cached_pages), "cache")
+        for page_result in cached_pages:
+            _save_page_result(page_result, output_dir, pdf_name)
+            if on_page is not None:
+                on_page(page_result)
+        return cached_pages
+
+    text_pages, ocr_pages, report = route_pdf_pages(pdf_path, count_pdf_pages(pdf_path), dpi, use_text_layer)
+    report_path = os.path.join(output_dir, f"{pdf_name}_report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)  # type: ignore
+    print(f"{pdf_name}: текстовый слой — {len(report['text_layer_pages'])} стр., OCR — {len(ocr_pages)} стр.")
+
+    results = []
+
+    def emit(page_result):
+        _save_page_result(page_result, output_dir, pdf_name)
+        count_pages(source=page_result["source"])
+        results.append(page_result)
+        if on_page is not None:
+            on_page(page_result)
+
+    # Страницы из текстового слоя выдаются вперемешку с распознанными, в порядке номеров
+    pending_text_pages = sorted(text_pages)
+    pages_per_batch, render_window = split_page_window(page_window, pages_per_batch)
+    ocr_images = iter_pdf_pages(pdf_path, dpi=dpi, page_window=render_window,
+                                page_numbers=ocr_pages) if ocr_pages else ()
+    for batch in iter_batched(ocr_images, pages_per_batch):
+        if save_images:
+            for page_number, page_image in batch:
+                image_path = os.path.join(output_dir, f"{pdf_name}_page_{page_number}.jpg")
+                Image.fromarray(page_image).save(image_path, "JPEG")
+                print(f"Страница сохранена: {image_path}")
+
+        if pages_per_batch > 1:
+            page_texts = ocr_pages_batched([page_image for _, page_image in batch], languages, detail=0,
+                                           pages_per_batch=pages_per_batch)
+        else:
+            page_texts = [ocr_page_image(page_image, languages) for _, page_image in batch]
 
-    pages = convert_from_path(pdf_path, dpi=dpi)
-    for idx, page in enumerate(pages):
-        image_path = os.path.join(output_dir, f"{pdf_name}_page_{idx + 1}.jpg")
-        page.save(image_path, "JPEG")
-        print(f"Страница сохранена: {image_path}")
+        for (page_number, _), text in zip(batch, page_texts):
+            while pending_text_pages and pending_text_pages[0] < page_number:
+                text_page = text_pages[pending_text_pages.pop(0)]
+                emit({"page": text_page["page"], "text": text_page["text"], "source": "text_layer"})
+            emit({"page": page_number, "text": text, "source": "ocr"})
 
+    for page_number in pending_text_pages:
+        emit({"page": page_number, "text": text_pages[page_number]["text"], "source": "text_layer"})
 
-        ocr_result = reader.readtext(image_path, detail=0)
-        result_path = os.path.join(output_dir, f"{pdf_name}_page_{idx + 1}.json")
+    cache.put(document_key, results)
+    return results
 
-        with open(result_path, "w", encoding="utf-8") as f:
-            json.dump({"page": idx + 1, "text": ocr_result}, f, ensure_ascii=False, indent=4)  # type: ignore
 
-        print(f"OCR результат сохранен: {result_path}")
+def read_docx_paragraphs(docx_source):
+    """
+    Возвращает непустые абзацы DOCX с их номерами.
+    :param docx_source: Путь к DOCX-файлу или файловый объект (например, BytesIO).
+    :return: Список кортежей (номер абзаца, текст).
+    """
+    document = Document(docx_source)
+    return [(idx + 1, paragraph.text) for idx, paragraph in enumerate(document.paragraphs) if paragraph.text.strip()]
 
 
 def process_docx(docx_path, output_dir):
@@ -44,30 +280,37 @@ def process_docx(docx_path, output_dir):
     os.makedirs(output_dir, exist_ok=True)
     docx_name = os.path.splitext(os.path.basename(docx_path))[0]
 
-    # Извлечение текста из DOCX
-    document = Document(docx_path)
-    for idx, paragraph in enumerate(document.paragraphs):
-        if paragraph.text.strip():  # Пропускаем пустые абзацы
-            text_path = os.path.join(output_dir, f"{docx_name}_paragraph_{idx+1}.txt")
-            with open(text_path, "w", encoding="utf-8") as f:
-                f.write(paragraph.text)
-            print(f"Абзац сохранен: {text_path}")
+    # Извлечение текста из DOCX (пустые абзацы пропускаются)
+    for paragraph_number, text in read_docx_paragraphs(docx_path):
+        text_path = os.path.join(output_dir, f"{docx_name}_paragraph_{paragraph_number}.txt")
+        with stage_timer("write"), open(text_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Абзац сохранен: {text_path}")
+    count_pages(source="docx")
 
 
-def process_multi_page_documents(input_dir, output_dir, file_type="pdf"):
+def process_multi_page_documents(input_dir, output_dir, file_type="pdf", manifest=None, dry_run=False):
     """
     Основная функция для обработки многостраничных PDF или DOCX.
     :param input_dir: Папка с документами.
     :param output_dir: Папка для сохранения результатов.
     :param file_type: Тип файла для обработки ("pdf" или "docx").
+    :param manifest: Manifest для инкрементальной обработки (только новые и измененные файлы).
+    :param dry_run: Только оценить объем ожидающей работы, ничего не обрабатывая.
     """
+    stage = f"{STAGE_NAME}:{file_type}"
+    file_paths = [os.path.join(input_dir, file_name) for file_name in os.listdir(input_dir)
+                  if file_name.endswith(f".{file_type}")]
+    if dry_run:
+        return plan_inputs(manifest, stage, STAGE_VERSION, file_paths)
+
     os.makedirs(output_dir, exist_ok=True)
 
-    for file_name in os.listdir(input_dir):
-        if file_name.endswith(f".{file_type}"):
-            file_path = os.path.join(input_dir, file_name)
+    for file_path in pending_inputs(manifest, stage, STAGE_VERSION, file_paths):
+        file_name = os.path.basename(file_path)
+        file_output_dir = os.path.join(output_dir, os.path.splitext(file_name)[0])
+        with track_input(manifest, stage, STAGE_VERSION, file_path, file_output_dir):
             print(f"Обработка: {file_path}")
-            file_output_dir = os.path.join(output_dir, os.path.splitext(file_name)[0])
 
             if file_type == "pdf":
                 process_pdf(file_path, file_output_dir)
@@ -78,13 +321,17 @@ def process_multi_page_documents(input_dir, output_dir, file_type="pdf"):
 
 
 if __name__ == "__main__":
+    configure_logging()
     input_folder = "data/multi_page_documents"
     output_folder = "output/multi_page_results"
+    parser = argparse.ArgumentParser(description="OCR многостраничных документов")
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
+    stage_manifest = manifest_from_args(args)
 
-
-    print("Обработка PDF-документов...")
-    process_multi_page_documents(input_folder, output_folder, file_type="pdf")
-
-
-    print("Обработка DOCX-документов...")
-    process_multi_page_documents(input_folder, output_folder, file_type="docx")
+    for document_type, title in (("pdf", "PDF"), ("docx", "DOCX")):
+        print(f"Обработка {title}-документов...")
+        result = process_multi_page_documents(input_folder, output_folder, file_type=document_type,
+                                              manifest=stage_manifest, dry_run=args.dry_run)
+        if args.dry_run:
+            print_plan(result)
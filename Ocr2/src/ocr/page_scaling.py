@@ -0,0 +1,101 @@
+import os
+
+import cv2
+import numpy as np
+
+from Ocr2.src.utils.metrics import timed_stage
+
+# Подготовка страниц перед OCR: обрезка до текстовых областей и уменьшение до целевой высоты текста
+ADAPTIVE_SCALING = os.environ.get("OCR_ADAPTIVE_SCALING", "0") == "1"
+# Целевая высота текста (медианная высота символа) в пикселях; 0 — только обрезка
+OCR_TARGET_TEXT_HEIGHT = int(os.environ.get("OCR_TARGET_TEXT_HEIGHT", "20"))
+# Минимальный масштаб: страница не уменьшается сильнее этого
+OCR_MIN_SCALE = float(os.environ.get("OCR_MIN_SCALE", "0.25"))
+# Поле вокруг объединения текстовых областей при обрезке, в высотах текста
+CROP_MARGIN_TEXT_HEIGHTS = 2
+# Меньше компонент — оценка высоты текста ненадежна, страница не меняется
+MIN_TEXT_COMPONENTS = 30
+
+
+def text_components(gray):
+    """
+    Связные компоненты, похожие на символы: разумная высота, пропорции и площадь.
+    :param gray: Серое изображение страницы.
+    :return: Массив рамок компонент N x 4 (x, y, w, h).
+    """
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    boxes = stats[1:, :4]
+    heights, widths, areas = boxes[:, 3], boxes[:, 2], stats[1:, cv2.CC_STAT_AREA]
+    is_glyph = (heights >= 4) & (heights <= gray.shape[0] // 10) & (widths <= heights * 3) & (areas >= 8)
+    return boxes[is_glyph]
+
+
+def estimate_text_height(components):
+    """
+    Оценка высоты текста как медианы высот компонент-символов; None, если компонент мало.
+    """
+    if len(components) < MIN_TEXT_COMPONENTS:
+        return None
+    return float(np.median(components[:, 3]))
+
+
+@timed_stage("preprocess")
+def prepare_page(image, target_text_height=OCR_TARGET_TEXT_HEIGHT, min_scale=OCR_MIN_SCALE, crop=True):
+    """
+    Готовит страницу к OCR: обрезает до объединения текстовых областей и уменьшает так, чтобы
+    высота текста стала близкой к целевой (страница никогда не увеличивается).
+    :param image: RGB- или серый массив страницы.
+    :param target_text_height: Целевая высота текста в пикселях; 0 — без масштабирования.
+    :param min_scale: Минимальный масштаб.
+    :param crop: Обрезать ли поля без текста.
+    :return: Кортеж (подготовленное изображение, преобразование {"scale", "offset_x", "offset_y"}).
+    """
+    identity = {"scale": 1.0, "offset_x": 0, "offset_y": 0}
+    if not target_text_height and not crop:
+        return image, identity
+
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    components = text_components(gray)
+    text_height = estimate_text_height(components)
+    if text_height is None:
+        return image, identity
+
+    offset_x, offset_y = 0, 0
+    if crop:
+        margin = int(text_height * CROP_MARGIN_TEXT_HEIGHTS)
+        x1 = max(int(components[:, 0].min()) - margin, 0)
+        y1 = max(int(components[:, 1].min()) - margin, 0)
+        x2 = min(int((components[:, 0] + components[:, 2]).max()) + margin, image.shape[1])
+        y2 = min(int((components[:, 1] + components[:, 3]).max()) + margin, image.shape[0])
+        image, offset_x, offset_y = image[y1:y2, x1:x2], x1, y1
+
+    scale = 1.0
+    if target_text_height:
+        scale = min(1.0, max(min_scale, target_text_height / text_height))
+    if scale < 1.0:
+        height, width = image.shape[:2]
+        image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    return np.ascontiguousarray(image), {"scale": scale, "offset_x": offset_x, "offset_y": offset_y}
+
+
+def map_boxes_back(details, transform):
+    """
+    Переводит рамки результатов OCR (формат format_ocr_details) в координаты исходной страницы.
+    """
+    scale, offset_x, offset_y = transform["scale"], transform["offset_x"], transform["offset_y"]
+    if scale == 1.0 and not offset_x and not offset_y:
+        return details
+    return [
+        {**item, "box": [[round(x / scale) + offset_x, round(y / scale) + offset_y] for x, y in item["box"]]}
+        for item in details
+    ]
+
+
+def scaling_cache_params(adaptive_scaling=ADAPTIVE_SCALING, target_text_height=OCR_TARGET_TEXT_HEIGHT):
+    """
+    Параметры ключа кэша результатов OCR, зависящие от подготовки страницы; при выключенной
+    подготовке ключи не меняются.
+    """
+    return {"text_height": target_text_height} if adaptive_scaling else {}
@@ -0,0 +1,223 @@
+import os
+import time
+import logging
+import tempfile
+import subprocess
+from html.parser import HTMLParser
+
+PDFTOTEXT_BINARY = os.environ.get("PDFTOTEXT_BINARY", "pdftotext")
+PDFIMAGES_BINARY = os.environ.get("PDFIMAGES_BINARY", "pdfimages")
+PDFTOTEXT_TIMEOUT = int(os.environ.get("PDFTOTEXT_TIMEOUT", "60"))
+# Использовать текстовый слой PDF вместо рендеринга и OCR, если он пригоден
+USE_TEXT_LAYER = os.environ.get("OCR_PDF_TEXT_LAYER", "1") == "1"
+# Порог пригодности текстового слоя: минимум символов и доля "нормальных" символов
+MIN_TEXT_CHARS = int(os.environ.get("OCR_PDF_TEXT_MIN_CHARS", "20"))
+MIN_VALID_CHAR_RATIO = float(os.environ.get("OCR_PDF_TEXT_MIN_VALID_RATIO", "0.85"))
+# Доля площади страницы под строками текста: один колонтитул или штамп на скане не делает страницу текстовой
+MIN_TEXT_COVERAGE = float(os.environ.get("OCR_PDF_TEXT_MIN_COVERAGE", "0.03"))
+# Страница с изображением на большую часть площади считается сканом и требует большего покрытия текстом
+SCAN_IMAGE_COVERAGE = 0.5
+SCAN_MIN_TEXT_COVERAGE = float(os.environ.get("OCR_PDF_SCAN_MIN_TEXT_COVERAGE", "0.15"))
+VALID_PUNCTUATION = set(".,;:!?-–—()[]{}\"'«»/\\%$€₽#№@&*+=<>_|`~^°§")
+PDF_POINTS_PER_INCH = 72.0
+
+
+class _BboxLayoutParser(HTMLParser):
+    """
+    Разбирает вывод pdftotext -bbox-layout: страницы, строки и слова с координатами (в пунктах).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.pages = []
+        self._line = None
+        self._word = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "page":
+            self.pages.append({"width": float(attrs.get("width", 0)), "height": float(attrs.get("height", 0)),
+                               "lines": []})
+        elif tag == "line":
+            self._line = {"words": [], "box": [float(attrs[key]) for key in ("xmin", "ymin", "xmax", "ymax")]}
+        elif tag == "word":
+            self._word = {"text": "", "box": [float(attrs[key]) for key in ("xmin", "ymin", "xmax", "ymax")]}
+
+    def handle_data(self, data):
+        if self._word is not None:
+            self._word["text"] += data
+
+    def handle_endtag(self, tag):
+        if tag == "word" and self._word is not None:
+            self._word["text"] = self._word["text"].strip()
+            if self._word["text"] and self._line is not None:
+                self._line["words"].append(self._word)
+            self._word = None
+        elif tag == "line" and self._line is not None:
+            if self._line["words"] and self.pages:
+                self._line["text"] = " ".join(word["text"] for word in self._line["words"])
+                self.pages[-1]["lines"].append(self._line)
+            self._line = None
+
+
+def _run_on_pdf(pdf_source, run):
+    # Утилиты poppler читают файл: байты сохраняются во временный PDF
+    if not isinstance(pdf_source, bytes):
+        return run(pdf_source)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(pdf_source)
+    try:
+        return run(tmp.name)
+    finally:
+        os.remove(tmp.name)
+
+
+def _run_pdftotext(pdf_path, first_page=None, last_page=None):
+    command = [PDFTOTEXT_BINARY, "-bbox-layout", "-enc", "UTF-8"]
+    if first_page:
+        command += ["-f", str(first_page)]
+    if last_page:
+        command += ["-l", str(last_page)]
+    completed = subprocess.run(command + [pdf_path, "-"], capture_output=True, timeout=PDFTOTEXT_TIMEOUT, check=True)
+    return completed.stdout.decode("utf-8", errors="replace")
+
+
+def extract_text_layer(pdf_source):
+    """
+    Извлекает встроенный текстовый слой PDF с координатами строк и слов (poppler pdftotext).
+    :param pdf_source: Путь к PDF-файлу или его содержимое в байтах.
+    :return: Словарь {номер страницы: {"width", "height", "lines"}}; координаты в пунктах PDF.
+    """
+    output = _run_on_pdf(pdf_source, _run_pdftotext)
+    parser = _BboxLayoutParser()
+    parser.feed(output)
+    return {page_number: page for page_number, page in enumerate(parser.pages, start=1)}
+
+
+def parse_image_list(output):
+    """
+    Разбирает вывод pdfimages -list: доля площади страницы, занятая растровыми изображениями.
+    Размер изображения в пунктах вычисляется по пикселям и его разрешению (x-ppi, y-ppi).
+    :return: Словарь {номер страницы: площадь изображений в квадратных пунктах}.
+    """
+    areas = {}
+    for line in output.splitlines()[2:]:
+        columns = line.split()
+        # page num type width height color comp bpc enc interp object ID x-ppi y-ppi size ratio
+        if len(columns) < 14 or columns[2] != "image":
+            continue
+        width, height, x_ppi, y_ppi = int(columns[3]), int(columns[4]), int(columns[12]), int(columns[13])
+        if x_ppi > 0 and y_ppi > 0:
+            area = (width / x_ppi * PDF_POINTS_PER_INCH) * (height / y_ppi * PDF_POINTS_PER_INCH)
+            areas[int(columns[0])] = areas.get(int(columns[0]), 0.0) + area
+    return areas
+
+
+def list_page_images(pdf_source):
+    """
+    Площадь растровых изображений по страницам PDF (poppler pdfimages -list).
+    :param pdf_source: Путь к PDF-файлу или его содержимое в байтах.
+    :return: Словарь {номер страницы: площадь изображений в квадратных пунктах}.
+    """
+    def run(pdf_path):
+        completed = subprocess.run([PDFIMAGES_BINARY, "-list", pdf_path], capture_output=True,
+                                   timeout=PDFTOTEXT_TIMEOUT, check=True)
+        return completed.stdout.decode("utf-8", errors="replace")
+
+    return parse_image_list(_run_on_pdf(pdf_source, run))
+
+
+def text_coverage(page):
+    """
+    Доля площади страницы, покрытая рамками строк текстового слоя.
+    """
+    page_area = page["width"] * page["height"]
+    if page_area <= 0:
+        return 0.0
+    lines_area = sum(max(0.0, x2 - x1) * max(0.0, y2 - y1)
+                     for x1, y1, x2, y2 in (line["box"] for line in page["lines"]))
+    return min(1.0, lines_area / page_area)
+
+
+def assess_text_layer(page, image_area=0.0):
+    """
+    Эвристика пригодности текстового слоя страницы: достаточно текста, он покрывает заметную
+    часть страницы (а на страницах-сканах — большую часть) и не состоит из "мусора"
+    (нераспознанные глифы, управляющие символы, символы замены).
+    :param page: Страница из extract_text_layer().
+    :param image_area: Площадь растровых изображений страницы в квадратных пунктах (list_page_images).
+    :return: Словарь {"usable", "reason", "chars", "valid_char_ratio", "text_coverage", "image_coverage"}.
+    """
+    text = "".join(line["text"] for line in page["lines"]).replace(" ", "")
+    chars = len(text)
+    page_area = page["width"] * page["height"]
+    assessment = {"usable": False, "chars": chars, "valid_char_ratio": None,
+                  "text_coverage": round(text_coverage(page), 4),
+                  "image_coverage": round(min(1.0, image_area / page_area), 4) if page_area > 0 else 0.0}
+    if chars < MIN_TEXT_CHARS:
+        return {**assessment, "reason": "no_text"}
+
+    valid = sum(1 for char in text if char.isalnum() or char in VALID_PUNCTUATION)
+    assessment["valid_char_ratio"] = round(valid / chars, 3)
+    if valid / chars < MIN_VALID_CHAR_RATIO:
+        return {**assessment, "reason": "garbled"}
+
+    # Скан с колонтитулом или штампом: текст есть, но основная часть страницы — изображение
+    scanned = assessment["image_coverage"] >= SCAN_IMAGE_COVERAGE
+    min_coverage = SCAN_MIN_TEXT_COVERAGE if scanned else MIN_TEXT_COVERAGE
+    if assessment["text_coverage"] < min_coverage:
+        return {**assessment, "reason": "partial_scan" if scanned else "sparse_text"}
+    return {**assessment, "usable": True, "reason": "text_layer"}
+
+
+def text_layer_page_result(page_number, page, dpi=300):
+    """
+    Результат страницы из текстового слоя в формате OCR: строки текста и рамки в пикселях при dpi.
+    """
+    scale = dpi / PDF_POINTS_PER_INCH
+    boxes = []
+    for line in page["lines"]:
+        x1, y1, x2, y2 = (round(value * scale) for value in line["box"])
+        boxes.append({"text": line["text"], "confidence": 1.0, "box": [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]})
+    return {"page": page_number, "text": [box["text"] for box in boxes], "boxes": boxes, "source": "text_layer"}
+
+
+def route_pdf_pages(pdf_source, total_pages, dpi=300, use_text_layer=USE_TEXT_LAYER):
+    """
+    Распределяет страницы PDF: страницы с пригодным текстовым слоем берутся из него,
+    остальные (сканы, страницы-изображения) направляются на рендеринг и OCR.
+    :param pdf_source: Путь к PDF-файлу или его содержимое в байтах.
+    :param total_pages: Количество страниц документа.
+    :param dpi: Разрешение, в котором выражаются рамки строк.
+    :param use_text_layer: False — все страницы на OCR.
+    :return: Кортеж (результаты страниц из текстового слоя {номер: результат}, номера страниц для OCR, отчет).
+    """
+    start = time.perf_counter()
+    text_pages, assessments = {}, {}
+    if use_text_layer:
+        try:
+            layer = extract_text_layer(pdf_source)
+        except (OSError, subprocess.SubprocessError) as e:
+            logging.warning(f"Текстовый слой PDF недоступен, все страницы пойдут на OCR: {e}")
+            layer = {}
+        image_areas = {}
+        if layer:
+            try:
+                image_areas = list_page_images(pdf_source)
+            except (OSError, subprocess.SubprocessError, ValueError) as e:
+                logging.warning(f"Не удалось получить список изображений PDF, учитывается только текст: {e}")
+        for page_number, page in layer.items():
+            assessments[page_number] = assess_text_layer(page, image_areas.get(page_number, 0.0))
+            if assessments[page_number]["usable"]:
+                text_pages[page_number] = text_layer_page_result(page_number, page, dpi)
+
+    ocr_pages = [page_number for page_number in range(1, total_pages + 1) if page_number not in text_pages]
+    report = {
+        "pages_total": total_pages,
+        "text_layer_pages": sorted(text_pages),
+        "ocr_pages": ocr_pages,
+        "reasons": {page_number: assessments.get(page_number, {"reason": "not_checked"})["reason"]
+                    for page_number in ocr_pages},
+        "routing_seconds": round(time.perf_counter() - start, 3),
+    }
+    return text_pages, ocr_pages, report
@@ -0,0 +1,179 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from Ocr2.src.utils.metrics import timed_stage
+
+
+DEFAULT_LANGUAGES = ('en', 'ru')
+DEFAULT_POOL_SIZE = int(os.environ.get("OCR_READER_POOL_SIZE", 2))
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ReaderPool:
+    """
+    Ограниченный пул экземпляров easyocr.Reader с одинаковыми настройками.
+    Ридеры создаются лениво, при первом запросе, и переиспользуются между вызовами.
+    """
+
+    def __init__(self, languages=DEFAULT_LANGUAGES, max_size=DEFAULT_POOL_SIZE, **reader_kwargs):
+        """
+        :param languages: Языки распознавания.
+        :param max_size: Максимальное количество одновременно загруженных ридеров.
+        :param reader_kwargs: Дополнительные параметры easyocr.Reader (gpu, model_storage_directory, ...).
+        """
+        self.languages = list(languages)
+        self.max_size = max(1, int(max_size))
+        self.reader_kwargs = reader_kwargs
+
+        self._idle = []
+        self._created = 0
+        self._condition = threading.Condition()
+
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._load_time = 0.0
+        self._in_use = 0
+
+    def _create_reader(self):
+        import easyocr
+
+        start = time.perf_counter()
+        reader = easyocr.Reader(self.languages, **self.reader_kwargs)
+        elapsed = time.perf_counter() - start
+        # readtext и readtext_batched вызывают self.detect и self.recognize: обертки на экземпляре
+        # разделяют время OCR на детекцию и распознавание без изменения результата
+        reader.detect = timed_stage("detect")(reader.detect)
+        reader.recognize = timed_stage("recognize")(reader.recognize)
+        logging.info(f"Загружен easyocr.Reader {self.languages} за {elapsed:.2f} с")
+        return reader, elapsed
+
+    def acquire(self, timeout=None):
+        """
+        Выдает свободный ридер из пула, при необходимости создает новый или ждет освобождения.
+        :param timeout: Максимальное время ожидания в секундах (None — без ограничения).
+        :return: Экземпляр easyocr.Reader.
+        """
+        with self._condition:
+            if self._idle:
+                self._hits += 1
+                self._in_use += 1
+                return self._idle.pop()
+
+            if self._created >= self.max_size:
+                self._waits += 1
+                start = time.perf_counter()
+                # Ожидание свободного ридера или места в пуле: если загрузка другого ридера
+                # завершилась ошибкой, ожидающий сам пробует создать ридер
+                ready = self._condition.wait_for(lambda: self._idle or self._created < self.max_size,
+                                                 timeout=timeout)
+                self._wait_time += time.perf_counter() - start
+                if not ready:
+                    raise TimeoutError(f"Нет свободного easyocr.Reader за {timeout} с")
+                if self._idle:
+                    self._in_use += 1
+                    return self._idle.pop()
+
+            # Резервируем место в пуле, сама загрузка идет вне блокировки
+            self._created += 1
+            self._misses += 1
+
+        try:
+            reader, elapsed = self._create_reader()
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._load_time += elapsed
+            self._in_use += 1
+        return reader
+
+    def release(self, reader):
+        """
+        Возвращает ридер в пул.
+        :param reader: Ридер, полученный через acquire().
+        """
+        with self._condition:
+            self._in_use -= 1
+            self._idle.append(reader)
+            self._condition.notify()
+
+    @contextmanager
+    def reader(self, timeout=None):
+        reader = self.acquire(timeout=timeout)
+        try:
+            yield reader
+        finally:
+            self.release(reader)
+
+    def warmup(self):
+        """
+        Загружает один ридер заранее, чтобы первый запрос не ждал загрузки весов.
+        """
+        with self.reader():
+            pass
+
+    def stats(self):
+        with self._condition:
+            return {
+                "languages": self.languages,
+                "max_size": self.max_size,
+                "created": self._created,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "hits": self._hits,
+                "misses": self._misses,
+                "waits": self._waits,
+                "wait_time_s": round(self._wait_time, 4),
+                "load_time_s": round(self._load_time, 4),
+            }
+
+
+def _pool_key(languages, reader_kwargs):
+    return tuple(languages), tuple(sorted(reader_kwargs.items()))
+
+
+def get_reader_pool(languages=DEFAULT_LANGUAGES, max_size=None, **reader_kwargs):
+    """
+    Возвращает общий для процесса пул ридеров для заданного набора языков и настроек.
+    :param languages: Языки распознавания.
+    :param max_size: Размер пула; учитывается только при первом создании пула.
+    :param reader_kwargs: Дополнительные параметры easyocr.Reader.
+    :return: ReaderPool.
+    """
+    key = _pool_key(languages, reader_kwargs)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ReaderPool(languages, max_size or DEFAULT_POOL_SIZE, **reader_kwargs)
+            _pools[key] = pool
+        return pool
+
+
+@contextmanager
+def acquire_reader(languages=DEFAULT_LANGUAGES, timeout=None, **reader_kwargs):
+    """
+    Контекстный менеджер: выдает ридер из общего пула и возвращает его по завершении.
+    :param languages: Языки распознавания.
+    :param timeout: Максимальное время ожидания свободного ридера.
+    """
+    with get_reader_pool(languages, **reader_kwargs).reader(timeout=timeout) as reader:
+        yield reader
+
+
+def reader_pool_stats():
+    """
+    Возвращает статистику всех созданных пулов (попадания, ожидания, время загрузки).
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
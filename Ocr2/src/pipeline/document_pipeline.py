@@ -0,0 +1,218 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from Ocr2.src.ocr.reader_pool import DEFAULT_LANGUAGES
+from Ocr2.src.utils.logging_config import submit_with_context
+from Ocr2.src.utils.metrics import count_pages
+
+PIPELINE_STAGES = ("classify", "ocr", "spellcheck", "ner", "tables", "headings")
+DEFAULT_STAGES = ("classify", "ocr", "ner", "tables", "headings")
+PIPELINE_WORKERS = int(os.environ.get("OCR_PIPELINE_WORKERS", "4"))
+# Страниц в обработке одновременно: следующая страница рендерится только после сбора результата старой
+PIPELINE_PAGE_WINDOW = int(os.environ.get("OCR_PIPELINE_PAGE_WINDOW", str(PIPELINE_WORKERS)))
+
+
+class StageTimer:
+    """
+    Потокобезопасный учет времени стадий: суммарные секунды и количество вызовов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = {}
+        self.calls = {}
+
+    def run(self, stage, task, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return task(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed
+                self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def iterate(self, stage, iterable):
+        """
+        Итерирует iterable, учитывая время получения каждого элемента (например, рендеринга страницы).
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed
+                    self.calls[stage] = self.calls.get(stage, 0) + 1
+            yield item
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: {"seconds": round(seconds, 4), "calls": self.calls[stage]}
+                    for stage, seconds in self.seconds.items()}
+
+
+def normalize_stages(stages):
+    """
+    Проверяет список стадий; spellcheck и ner требуют ocr, поэтому ocr добавляется автоматически.
+    """
+    stages = tuple(DEFAULT_STAGES if stages is None else stages)
+    unknown = [stage for stage in stages if stage not in PIPELINE_STAGES]
+    if unknown:
+        raise ValueError(f"Неизвестные стадии: {unknown}, ожидаются из {PIPELINE_STAGES}")
+    if ("spellcheck" in stages or "ner" in stages) and "ocr" not in stages:
+        stages += ("ocr",)
+    return stages
+
+
+def load_document(data, file_name=""):
+    """
+    Определяет тип документа по содержимому и готовит его к обработке в памяти.
+    :param data: Байты документа.
+    :param file_name: Имя файла (для DOCX).
+    :return: Кортеж (тип "pdf"/"docx"/"image", генератор страниц RGB или список абзацев).
+    """
+    if data[:4] == b"%PDF":
+        from Ocr2.src.ocr.multi_page_processing import iter_pdf_pages
+        return "pdf", (page for _, page in iter_pdf_pages(data))
+    if data[:2] == b"PK" and file_name.lower().endswith(".docx"):
+        from io import BytesIO
+        from Ocr2.src.ocr.multi_page_processing import read_docx_paragraphs
+        return "docx", [text for _, text in read_docx_paragraphs(BytesIO(data))]
+
+    from Ocr2.src.ocr.easyocr_inference import decode_image_bytes
+    return "image", iter([decode_image_bytes(data)])
+
+
+def _ocr_page(page_image, languages):
+    from Ocr2.src.ocr.easyocr_inference import ocr_image_array
+    return ocr_image_array(page_image, languages=languages)
+
+
+def _analyze_page_structure(page_image, stages, timer):
+    from Ocr2.src.document_structure.page_context import PageContext
+
+    # Таблицы и заголовки используют один PageContext (одно декодирование и серое изображение)
+    page = PageContext(image=cv2.cvtColor(page_image, cv2.COLOR_RGB2BGR))
+    result = {}
+    if "tables" in stages:
+        from Ocr2.src.document_structure.extract_tables import recognize_tables
+        result["tables"] = timer.run("tables", recognize_tables, page)
+    if "headings" in stages:
+        from Ocr2.src.document_structure.heading_paragraph_analysis import (analyze_headings_and_paragraphs,
+                                                                           extract_text_blocks)
+
+        def headings_task():
+            text_blocks = extract_text_blocks(page)
+            return analyze_headings_and_paragraphs(text_blocks) if text_blocks else ([], [])
+
+        result["headings"], result["paragraphs"] = timer.run("headings", headings_task)
+    return result
+
+
+def _collect_page(page_number, futures):
+    page_result = {"page": page_number}
+    if "category" in futures:
+        page_result["category"] = futures["category"].result()
+    if "ocr" in futures:
+        boxes = futures["ocr"].result()
+        page_result["text"] = [item["text"] for item in boxes]
+        page_result["boxes"] = boxes
+    if "structure" in futures:
+        page_result.update(futures["structure"].result())
+    return page_result
+
+
+def process_document(data, file_name="", stages=None, classifier=None, languages=DEFAULT_LANGUAGES,
+                     spellcheck_lang="en-US", nlp=None, executor=None,
+                     page_window=PIPELINE_PAGE_WINDOW):
+    """
+    Обрабатывает один документ за один проход в памяти: классификация, OCR, проверка орфографии,
+    NER, таблицы и заголовки. Классификация, OCR и анализ структуры страниц выполняются параллельно,
+    текстовые стадии — после OCR, без промежуточных файлов.
+    :param data: Байты документа (изображение, PDF или DOCX).
+    :param file_name: Имя файла.
+    :param stages: Выбранные стадии из PIPELINE_STAGES; по умолчанию DEFAULT_STAGES.
+    :param classifier: Объект с методом submit(array) -> Future (например, MicroBatcher); нужен для "classify".
+    :param languages: Языки OCR.
+    :param spellcheck_lang: Язык проверки орфографии.
+    :param nlp: Модель spaCy; по умолчанию общая модель процесса.
+    :param executor: Пул потоков; по умолчанию создается на время вызова.
+    :param page_window: Страниц в обработке одновременно; ограничивает память на многостраничных PDF.
+    :return: Результат по страницам и документу с временем каждой стадии.
+    """
+    stages = normalize_stages(stages)
+    if "classify" in stages and classifier is None:
+        raise ValueError("Для стадии classify нужен classifier")
+
+    start = time.perf_counter()
+    timer = StageTimer()
+    own_executor = executor is None
+    executor = executor or ThreadPoolExecutor(max_workers=PIPELINE_WORKERS)
+    try:
+        document_type, pages = timer.run("load", load_document, data, file_name)
+        result = {"file": file_name, "type": document_type, "stages": list(stages), "pages": []}
+
+        if document_type == "docx":
+            texts = pages
+            result["pages"] = [{"page": 1, "text": texts}]
+        else:
+            texts, in_flight = [], deque()
+            # Рендеринг страниц выполняется при итерации генератора и учитывается в стадии load
+            for page_number, page_image in enumerate(timer.iterate("load", pages), start=1):
+                futures = {}
+                if "classify" in stages:
+                    futures["category"] = timer.run("classify_submit", classifier.submit, page_image)
+                if "ocr" in stages:
+                    futures["ocr"] = submit_with_context(executor, timer.run, "ocr", _ocr_page, page_image, languages)
+                if "tables" in stages or "headings" in stages:
+                    futures["structure"] = submit_with_context(executor, _analyze_page_structure, page_image,
+                                                              stages, timer)
+                in_flight.append((page_number, futures))
+                del page_image
+                # Изображения собранных страниц освобождаются, в памяти не больше page_window страниц
+                while len(in_flight) >= max(1, page_window):
+                    result["pages"].append(_collect_page(*in_flight.popleft()))
+            while in_flight:
+                result["pages"].append(_collect_page(*in_flight.popleft()))
+            for page_result in result["pages"]:
+                texts.extend(page_result.get("text", []))
+
+            if "classify" in stages and result["pages"]:
+                result["category"] = result["pages"][0]["category"]
+
+        text = " ".join(texts) if "ocr" in stages or document_type == "docx" else ""
+        if "spellcheck" in stages:
+            from Ocr2.src.extraction.spelling_punctuation_check import check_text
+            text, matches = timer.run("spellcheck", check_text, text, spellcheck_lang, executor)
+            result["corrected_text"] = text
+            result["spelling_matches"] = matches
+        if "ner" in stages:
+            from Ocr2.src.extraction.extract_key_data import extract_entities, load_ner_model
+            result["entities"] = timer.run("ner", extract_entities, text, nlp or load_ner_model())
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True)
+
+    count_pages(len(result["pages"]), "docx" if result["type"] == "docx" else "ocr")
+    result["timings"] = timer.snapshot()
+    result["total_seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def process_document_file(file_path, **kwargs):
+    """
+    Обрабатывает документ с диска (см. process_document).
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    return process_document(data, os.path.basename(file_path), **kwargs)
@@ -1,70 +1,264 @@
 import cv2
+import time
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
 from sklearn.model_selection import train_test_split
 import os
 
-def preprocess_image_cpu(img_path, source_dir, output_base_dir):
+from Ocr2.src.utils.metrics import timed_stage
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Профили предобработки: "quality" повторяет прежний конвейер (NLM, фиксированный порог),
+# "fast" и "adaptive" заменяют NLM дешевыми фильтрами и работают на уменьшенной копии.
+PREPROCESS_PROFILES = {
+    "quality": {"denoise": "nlm", "threshold": "fixed", "working_max_side": None},
+    "fast": {"denoise": "median", "threshold": "otsu", "working_max_side": 1600},
+    "adaptive": {"denoise": "bilateral", "threshold": "adaptive", "working_max_side": 1600},
+}
+DEFAULT_PROFILE = os.environ.get("OCR_PREPROCESS_PROFILE", "quality")
+
+
+def _denoise(img, method):
+    if method == "nlm":
+        return cv2.fastNlMeansDenoising(img, h=30)
+    if method == "median":
+        return cv2.medianBlur(img, 3)
+    if method == "bilateral":
+        return cv2.bilateralFilter(img, 5, 50, 50)
+    return img
+
+
+def _threshold(img, method):
+    if method == "otsu":
+        _, binary = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    elif method == "adaptive":
+        binary = cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+    else:
+        _, binary = cv2.threshold(img, 128, 255, cv2.THRESH_BINARY)
+    return binary
+
+
+@timed_stage("preprocess")
+def enhance_image(img, profile=DEFAULT_PROFILE):
     """
-    Предобработка изображения на CPU и сохранение результата.
+    Предобработка серого изображения по профилю: шумоподавление, бинаризация и морфологический
+    градиент. Для профилей с working_max_side обработка идет на уменьшенной копии, результат
+    возвращается в исходном размере.
+    :param img: Серое изображение (uint8).
+    :param profile: Имя профиля из PREPROCESS_PROFILES.
+    :return: Кортеж (обработанное изображение, время шагов в секундах).
     """
-    img_path = Path(img_path)
-    img = cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE)
+    if profile not in PREPROCESS_PROFILES:
+        raise ValueError(f"Неизвестный профиль предобработки: {profile}, ожидается один из {list(PREPROCESS_PROFILES)}")
+    settings = PREPROCESS_PROFILES[profile]
+    timings = {}
 
-    if img is None:
-        print(f"Ошибка загрузки: {img_path}")
-        return
+    start = time.perf_counter()
+    height, width = img.shape[:2]
+    working = img
+    max_side = settings["working_max_side"]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        working = cv2.resize(img, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    timings["downscale"] = time.perf_counter() - start
 
-    try:
+    start = time.perf_counter()
+    denoised = _denoise(working, settings["denoise"])
+    timings["denoise"] = time.perf_counter() - start
+
+    # Бинаризация
+    start = time.perf_counter()
+    binary = _threshold(denoised, settings["threshold"])
+    timings["threshold"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    sharpened = cv2.morphologyEx(binary, cv2.MORPH_GRADIENT, kernel)
+    timings["morphology"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if sharpened.shape[:2] != (height, width):
+        sharpened = cv2.resize(sharpened, (width, height), interpolation=cv2.INTER_NEAREST)
+    timings["upscale"] = time.perf_counter() - start
 
-        denoised = cv2.fastNlMeansDenoising(img, h=30)
+    return sharpened, timings
 
-        # Бинаризация
-        _, binary = cv2.threshold(denoised, 128, 255, cv2.THRESH_BINARY)
 
+def output_path_for(img_path, source_dir, output_base_dir):
+    """
+    Путь результата: структура папок источника повторяется в output_base_dir.
+    """
+    return Path(output_base_dir) / Path(img_path).relative_to(source_dir)
+
+
+def _enhance_and_save(img_path, source_dir, output_base_dir, profile):
+    start = time.perf_counter()
+    img = cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE)
+    read_time = time.perf_counter() - start
+    if img is None:
+        raise ValueError(f"Ошибка загрузки: {img_path}")
+
+    sharpened, timings = enhance_image(img, profile)
+    timings["read"] = read_time
+
+    output_file_path = output_path_for(img_path, source_dir, output_base_dir)
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
 
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-        sharpened = cv2.morphologyEx(binary, cv2.MORPH_GRADIENT, kernel)
+    start = time.perf_counter()
+    cv2.imwrite(str(output_file_path), sharpened)
+    timings["write"] = time.perf_counter() - start
+    return output_file_path, timings
 
-        relative_path = img_path.relative_to(source_dir)
-        output_file_path = Path(output_base_dir) / relative_path
-        output_file_path.parent.mkdir(parents=True, exist_ok=True)
 
-        cv2.imwrite(str(output_file_path), sharpened)
+def preprocess_image_cpu(img_path, source_dir, output_base_dir, profile=DEFAULT_PROFILE):
+    """
+    Предобработка изображения на CPU и сохранение результата.
+    :param profile: Профиль предобработки (см. PREPROCESS_PROFILES).
+    :return: Время шагов в секундах или None при ошибке.
+    """
+    try:
+        output_file_path, timings = _enhance_and_save(img_path, source_dir, output_base_dir, profile)
         print(f"Обработано и сохранено: {output_file_path}")
+        return timings
     except Exception as e:
         print(f"Ошибка при обработке {img_path}: {e}")
+        return None
 
-def preprocess_and_save_images_parallel(image_list, source_dir, output_base_dir, num_workers=None):
+
+def preprocess_batch(img_paths, source_dir, output_base_dir, profile=DEFAULT_PROFILE):
     """
-    Параллельная обработка изображений на CPU с контролем количества процессов.
+    Задача процесса-рабочего: предобработка пачки изображений.
+    :return: Список кортежей (путь, время шагов или None, текст ошибки или None).
     """
-    if num_workers is None:
-        num_workers = os.cpu_count() - 1
+    results = []
+    for img_path in img_paths:
+        try:
+            _, timings = _enhance_and_save(img_path, source_dir, output_base_dir, profile)
+            results.append((img_path, timings, None))
+        except Exception as e:
+            results.append((img_path, None, str(e)))
+    return results
 
-    print(f"Запуск параллельной обработки с {num_workers} процессами...")
-    with ProcessPoolExecutor(max_workers=num_workers) as executor:
-        futures = [executor.submit(preprocess_image_cpu, img_path, source_dir, output_base_dir)
-                   for img_path in image_list]
 
-        for future in as_completed(futures):
-            future.result()
+def iter_image_paths(input_dir, extensions=IMAGE_EXTENSIONS):
+    """
+    Лениво обходит папку и отдает пути изображений без построения полного списка.
+    """
+    for root, _, file_names in os.walk(input_dir):
+        for file_name in file_names:
+            if os.path.splitext(file_name)[1].lower() in extensions:
+                yield os.path.join(root, file_name)
 
-if __name__ == "__main__":
-    input_dir = Path(r"C:\Users\quvon\Desktop\OCR\Ocr2\data\train").resolve()
-    output_dir = Path(r"C:\Users\quvon\Desktop\OCR\Ocr2\data\processed_train").resolve()
 
+def split_train_test(input_dir, test_size=0.2, random_state=42):
+    """
+    Разбиение train/test, совпадающее с прежними запусками (train_test_split с random_state=42
+    по списку rglob), чтобы уже обработанные изображения не переходили из train в test.
+    В памяти держится только список путей, сами изображения читаются потоково.
+    :return: Пара списков путей (train, test).
+    """
     images = [str(img_path) for img_path in Path(input_dir).rglob("*")
-              if img_path.suffix.lower() in ('.jpg', '.jpeg', '.png')]
-    print(f"Найдено {len(images)} изображений")
-
+              if img_path.suffix.lower() in IMAGE_EXTENSIONS]
     if not images:
         raise ValueError(f"Нет изображений в папке {input_dir}")
+    return train_test_split(images, test_size=test_size, random_state=random_state)
 
 
-    train_images, test_images = train_test_split(images, test_size=0.2, random_state=42)
-    print(f"Train: {len(train_images)}, Test: {len(test_images)}")
+def default_preprocess_workers():
+    """
+    Количество процессов по умолчанию: на одно меньше числа ядер, но не меньше одного.
+    """
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def _iter_batches(image_paths, source_dir, output_base_dir, chunksize, skip_existing, summary):
+    batch = []
+    for img_path in image_paths:
+        if skip_existing and output_path_for(img_path, source_dir, output_base_dir).exists():
+            summary["skipped"] += 1
+            continue
+        batch.append(str(img_path))
+        if len(batch) >= chunksize:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 
-    preprocess_and_save_images_parallel(train_images, input_dir, output_dir / 'train')
-    preprocess_and_save_images_parallel(test_images, input_dir, output_dir / 'test')
+def preprocess_and_save_images_parallel(image_paths, source_dir, output_base_dir, num_workers=None,
+                                        profile=DEFAULT_PROFILE, chunksize=64, max_pending_batches=None,
+                                        skip_existing=True, progress_every=1000):
+    """
+    Потоковая параллельная обработка изображений на CPU. Пути читаются лениво и отправляются
+    пачками в ограниченном окне, поэтому память не растет с размером набора.
+    :param image_paths: Итерируемый набор путей (например, iter_image_paths()).
+    :param num_workers: Количество процессов; ограничивается диапазоном [1, os.cpu_count()].
+    :param profile: Профиль предобработки (см. PREPROCESS_PROFILES).
+    :param chunksize: Количество изображений в одной задаче.
+    :param max_pending_batches: Максимум пачек в работе; по умолчанию 4 на процесс.
+    :param skip_existing: Пропускать изображения, для которых результат уже существует.
+    :param progress_every: Печатать прогресс каждые N обработанных изображений.
+    :return: Сводка: processed, skipped, failed, failures, step_seconds, seconds, images_per_sec.
+    """
+    cpu_count = os.cpu_count() or 1
+    num_workers = min(max(1, num_workers or default_preprocess_workers()), cpu_count)
+    max_pending_batches = max_pending_batches or num_workers * 4
+
+    summary = {"processed": 0, "skipped": 0, "failed": 0, "failures": [], "step_seconds": {}}
+    start = time.perf_counter()
+    next_report = progress_every
+
+    def collect(future):
+        nonlocal next_report
+        for img_path, timings, error in future.result():
+            if error is not None:
+                summary["failed"] += 1
+                summary["failures"].append({"path": img_path, "error": error})
+                continue
+            summary["processed"] += 1
+            for step, seconds in timings.items():
+                summary["step_seconds"][step] = summary["step_seconds"].get(step, 0.0) + seconds
+
+        done = summary["processed"] + summary["failed"]
+        if progress_every and done >= next_report:
+            elapsed = time.perf_counter() - start
+            print(f"Обработано {done} изображений ({done / elapsed:.1f} изобр./с), "
+                  f"пропущено {summary['skipped']}, ошибок {summary['failed']}")
+            next_report = done + progress_every
+
+    print(f"Запуск параллельной обработки с {num_workers} процессами (профиль {profile})...")
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        pending = set()
+        batches = _iter_batches(image_paths, source_dir, output_base_dir, chunksize, skip_existing, summary)
+        for batch in batches:
+            if len(pending) >= max_pending_batches:
+                done_futures, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done_futures:
+                    collect(future)
+            pending.add(executor.submit(preprocess_batch, batch, str(source_dir), str(output_base_dir), profile))
+
+        for future in as_completed(pending):
+            collect(future)
+
+    elapsed = time.perf_counter() - start
+    summary["seconds"] = round(elapsed, 3)
+    summary["images_per_sec"] = round(summary["processed"] / elapsed, 2) if elapsed else None
+    summary["step_seconds"] = {step: round(seconds, 3) for step, seconds in summary["step_seconds"].items()}
+    print(f"Готово: обработано {summary['processed']}, пропущено {summary['skipped']}, "
+          f"ошибок {summary['failed']}, {summary['images_per_sec']} изобр./с")
+    return summary
+
+if __name__ == "__main__":
+    input_dir = Path(r"C:\Users\quvon\Desktop\OCR\Ocr2\data\train").resolve()
+    output_dir = Path(r"C:\Users\quvon\Desktop\OCR\Ocr2\data\processed_train").resolve()
+
+    if not os.path.isdir(input_dir):
+        raise ValueError(f"Нет папки с изображениями {input_dir}")
+
+    train_images, test_images = split_train_test(input_dir)
+    print(f"Train: {len(train_images)}, Test: {len(test_images)}")
+
+    for split, split_paths in (("train", train_images), ("test", test_images)):
+        split_summary = preprocess_and_save_images_parallel(split_paths, input_dir, output_dir / split)
+        print(f"{split}: {split_summary['processed']} обработано, {split_summary['failed']} ошибок")
@@ -1,7 +1,14 @@
 import os
+import argparse
 from docx import Document
 from PIL import Image, ImageDraw, ImageFont
 
+from Ocr2.src.utils.manifest import (add_manifest_arguments, manifest_from_args, pending_inputs, plan_inputs,
+                                     print_plan, track_input)
+
+STAGE_NAME = "docx_text"
+STAGE_VERSION = "1"
+
 def extract_text_from_docx_file(docx_path):
     """
     Извлекает текст из одного DOCX-файла.
@@ -45,27 +52,36 @@ def convert_text_to_image(text, output_image_path, image_size=(1000, 800)):
     print(f"Изображение с текстом сохранено: {output_image_path}")
 
 
-def process_docx(input_dir, text_output_dir, image_output_dir=None):
+def process_docx(input_dir, text_output_dir, image_output_dir=None, manifest=None, dry_run=False):
     """
     Основная функция: обрабатывает DOCX-файлы, извлекает текст и сохраняет как TXT или изображения.
     :param input_dir: Путь к папке с DOCX-файлами.
     :param text_output_dir: Путь для сохранения текстовых файлов.
     :param image_output_dir: Путь для сохранения изображений (опционально).
+    :param manifest: Manifest для инкрементальной обработки (только новые и измененные файлы).
+    :param dry_run: Только оценить объем ожидающей работы, ничего не обрабатывая.
     """
+    docx_paths = [os.path.join(input_dir, file_name) for file_name in os.listdir(input_dir)
+                  if file_name.endswith(".docx")]
+    # Набор выходов входит в версию стадии: включение изображений требует повторной обработки
+    stage_version = f"{STAGE_VERSION}+img" if image_output_dir else STAGE_VERSION
+    if dry_run:
+        return plan_inputs(manifest, STAGE_NAME, stage_version, docx_paths)
+
     os.makedirs(text_output_dir, exist_ok=True)
     if image_output_dir:
         os.makedirs(image_output_dir, exist_ok=True)
 
-    for file_name in os.listdir(input_dir):
-        if file_name.endswith(".docx"):
-            docx_path = os.path.join(input_dir, file_name)
+    for docx_path in pending_inputs(manifest, STAGE_NAME, stage_version, docx_paths):
+        file_name = os.path.basename(docx_path)
+        text_output_path = os.path.join(text_output_dir, file_name.replace(".docx", ".txt"))
+        with track_input(manifest, STAGE_NAME, stage_version, docx_path, text_output_path):
             print(f"Обработка: {docx_path}")
 
             # Извлечение текста с использованием вспомогательной функции
             text_content = extract_text_from_docx_file(docx_path)
 
             # Сохранение текста в файл
-            text_output_path = os.path.join(text_output_dir, file_name.replace(".docx", ".txt"))
             save_text_to_file(text_content, text_output_path)
 
             # Дополнительно: сохранение текста как изображения
@@ -79,4 +95,12 @@ if __name__ == "__main__":
     text_output_folder = "data/processed_docx/txt"  # Папка для текстовых файлов
     image_output_folder = "data/processed_docx/img" # Папка для изображений (опционально)
 
-    process_docx(input_folder, text_output_folder, image_output_folder)
+    parser = argparse.ArgumentParser(description="Извлечение текста из DOCX")
+    add_manifest_arguments(parser)
+    parser.add_argument("--no-images", action="store_true", help="Не сохранять текст как изображения")
+    args = parser.parse_args()
+
+    result = process_docx(input_folder, text_output_folder, None if args.no_images else image_output_folder,
+                          manifest=manifest_from_args(args), dry_run=args.dry_run)
+    if args.dry_run:
+        print_plan(result)
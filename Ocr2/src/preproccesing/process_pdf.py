@@ -1,31 +1,90 @@
 import os
-from pdf2image import convert_from_path
+import argparse
+import json
+from pdf2image import convert_from_path, pdfinfo_from_path
 
-def process_pdf(input_dir, output_dir, dpi=300):
+from Ocr2.src.ocr.pdf_text_layer import USE_TEXT_LAYER, route_pdf_pages
+
+from Ocr2.src.utils.logging_config import configure_logging
+from Ocr2.src.utils.manifest import (add_manifest_arguments, manifest_from_args, pending_inputs, plan_inputs,
+                                     print_plan, track_input)
+
+STAGE_NAME = "pdf_render"
+STAGE_VERSION = "2"
+
+def process_pdf(input_dir, output_dir, dpi=300, manifest=None, dry_run=False, use_text_layer=USE_TEXT_LAYER,
+                ocr_output_dir=None):
     """
-    Конвертирует PDF-документы в изображения (одна страница - одно изображение).
+    Конвертирует PDF-документы в изображения (одна страница - одно изображение). Если задан
+    ocr_output_dir, страницы с пригодным текстовым слоем не рендерятся: их текст сразу
+    сохраняется туда в формате результатов OCR ({"file", "text": [...]}), и следующие стадии
+    (NER, орфография) читают его вместе с распознанными страницами.
     :param input_dir: Папка с PDF-файлами.
     :param output_dir: Папка для сохранения изображений.
     :param dpi: Качество выходного изображения (по умолчанию 300 dpi).
+    :param manifest: Manifest для инкрементальной обработки (только новые и измененные файлы).
+    :param dry_run: Только оценить объем ожидающей работы, ничего не обрабатывая.
+    :param use_text_layer: Брать текст из текстового слоя PDF, где он пригоден.
+    :param ocr_output_dir: Папка результатов OCR; без нее рендерятся все страницы.
+    :return: Отчеты маршрутизации страниц по документам.
     """
+    pdf_paths = [os.path.join(input_dir, file_name) for file_name in os.listdir(input_dir)
+                 if file_name.endswith(".pdf")]
+    # Текстовому слою некуда попасть без папки результатов OCR: тогда все страницы рендерятся
+    use_text_layer = use_text_layer and ocr_output_dir is not None
+    # Разрешение определяет результат, поэтому входит в версию стадии
+    stage_version = f"{STAGE_VERSION}@{dpi}dpi" + ("+text" if use_text_layer else "")
+    if dry_run:
+        return plan_inputs(manifest, STAGE_NAME, stage_version, pdf_paths)
+
     os.makedirs(output_dir, exist_ok=True)
+    if use_text_layer:
+        os.makedirs(ocr_output_dir, exist_ok=True)
 
-    for file_name in os.listdir(input_dir):
-        if file_name.endswith(".pdf"):
-            pdf_path = os.path.join(input_dir, file_name)
+    reports = {}
+    for pdf_path in pending_inputs(manifest, STAGE_NAME, stage_version, pdf_paths):
+        file_name = os.path.basename(pdf_path)
+        pdf_base_name = os.path.splitext(file_name)[0]
+        report_path = os.path.join(output_dir, f"{pdf_base_name}_report.json")
+        with track_input(manifest, STAGE_NAME, stage_version, pdf_path, report_path):
             print(f"Обрабатываю PDF: {pdf_path}")
 
-            # Конвертация страниц PDF в изображения
-            pages = convert_from_path(pdf_path, dpi=dpi)
-            pdf_base_name = os.path.splitext(file_name)[0]
+            total_pages = pdfinfo_from_path(pdf_path)["Pages"]
+            text_pages, ocr_pages, report = route_pdf_pages(pdf_path, total_pages, dpi, use_text_layer)
 
-            for idx, page in enumerate(pages):
-                image_path = os.path.join(output_dir, f"{pdf_base_name}_page_{idx+1}.jpg")
+            # Имя совпадает с тем, которое дал бы OCR отрендеренной страницы {имя}_page_N.jpg
+            for page_number, page_result in text_pages.items():
+                result_path = os.path.join(ocr_output_dir, f"{pdf_base_name}_page_{page_number}.json")
+                with open(result_path, "w", encoding="utf-8") as f:
+                    json.dump({"file": f"{pdf_base_name}_page_{page_number}.jpg", "text": page_result["text"],
+                               "source": "text_layer"}, f, ensure_ascii=False, indent=4)  # type: ignore
+                print(f"Сохранен текстовый слой: {result_path}")
+
+            # Конвертация в изображения только страниц без пригодного текстового слоя
+            for page_number in ocr_pages:
+                page = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)[0]
+                image_path = os.path.join(output_dir, f"{pdf_base_name}_page_{page_number}.jpg")
                 page.save(image_path, "JPEG")
+                page.close()
                 print(f"Сохранено изображение: {image_path}")
 
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=4)  # type: ignore
+            print(f"{file_name}: текстовый слой — {len(text_pages)} стр., рендеринг — {len(ocr_pages)} стр.")
+            reports[pdf_path] = report
+    return reports
+
 if __name__ == "__main__":
+    configure_logging()
     input_pdf_dir = "data/pdf_files"          # Папка с PDF-файлами
     output_image_dir = "data/processed_pdf"   # Папка для сохранения изображений
+    ocr_results_dir = "output/ocr_results"    # Папка результатов OCR (для страниц из текстового слоя)
+
+    parser = argparse.ArgumentParser(description="Конвертация PDF в изображения")
+    add_manifest_arguments(parser)
+    args = parser.parse_args()
 
-    process_pdf(input_pdf_dir, output_image_dir)
+    result = process_pdf(input_pdf_dir, output_image_dir, manifest=manifest_from_args(args), dry_run=args.dry_run,
+                         ocr_output_dir=ocr_results_dir)
+    if args.dry_run:
+        print_plan(result)
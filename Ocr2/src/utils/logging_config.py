@@ -0,0 +1,68 @@
+import os
+import json
+import logging
+import contextvars
+
+# Формат логов: "json" — одна JSON-запись на строку, "text" — человекочитаемый
+LOG_FORMAT = os.environ.get("OCR_LOG_FORMAT", "json")
+LOG_LEVEL = os.environ.get("OCR_LOG_LEVEL", "INFO")
+# Необязательный файл логов; дописывается, а не перезаписывается при каждом запуске
+LOG_FILE = os.environ.get("OCR_LOG_FILE")
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Идентификатор текущего запроса API; попадает во все записи лога, сделанные при его обработке
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматирует запись лога в JSON: время, уровень, логгер, сообщение, request_id и поля из extra.
+    """
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = request_id_var.get()
+        if request_id:
+            payload["request_id"] = request_id
+        payload.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def submit_with_context(executor, task, *args, **kwargs):
+    """
+    Ставит задачу в пул потоков с копией текущего контекста: request_id и другие contextvars
+    сохраняются в рабочем потоке.
+    :return: Future с результатом.
+    """
+    return executor.submit(contextvars.copy_context().run, task, *args, **kwargs)
+
+
+def configure_logging(level=LOG_LEVEL, log_format=LOG_FORMAT, log_file=LOG_FILE):
+    """
+    Настраивает корневой логгер: вывод в stderr и, если задан, в файл (режим дозаписи).
+    Повторный вызов не добавляет обработчики.
+    :param level: Уровень логирования.
+    :param log_format: "json" или "text".
+    :param log_file: Путь к файлу логов или None.
+    """
+    root = logging.getLogger()
+    if getattr(root, "_ocr_configured", False):
+        return
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, mode="a", encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+    root.setLevel(level)
+    root._ocr_configured = True
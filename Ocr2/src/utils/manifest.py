@@ -0,0 +1,187 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+from Ocr2.src.utils.result_cache import hash_file
+
+
+DEFAULT_MANIFEST_PATH = os.environ.get("OCR_MANIFEST_PATH", os.path.join("output", "manifest.sqlite3"))
+
+
+class Manifest:
+    """
+    Манифест пакетной обработки в SQLite: для каждого входа и стадии хранит размер, mtime,
+    хэш, версию стадии, статус и путь результата. Позволяет обрабатывать только новые
+    или измененные файлы и продолжать после сбоя.
+    """
+
+    def __init__(self, db_path=DEFAULT_MANIFEST_PATH):
+        """
+        :param db_path: Путь к файлу базы SQLite.
+        """
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    stage TEXT NOT NULL,
+                    input_path TEXT NOT NULL,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    content_hash TEXT,
+                    stage_version TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    output_path TEXT,
+                    error TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (stage, input_path)
+                )
+            """)
+
+    def _get(self, stage, input_path):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT * FROM entries WHERE stage = ? AND input_path = ?", (stage, input_path)).fetchone()
+
+    def _upsert(self, stage, input_path, stage_version, status, **fields):
+        fields.update(stage=stage, input_path=input_path, stage_version=stage_version, status=status,
+                      updated_at=time.time())
+        names = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in fields)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT INTO entries ({names}) VALUES ({placeholders}) "
+                f"ON CONFLICT (stage, input_path) DO UPDATE SET {updates}",
+                tuple(fields.values()),
+            )
+
+    def needs_processing(self, stage, input_path, stage_version):
+        """
+        Нужно ли (пере)обработать вход: нет успешной записи, сменилась версия стадии,
+        пропал результат или изменилось содержимое. Хэш считается только при изменении size/mtime.
+        """
+        input_path = os.path.abspath(input_path)
+        row = self._get(stage, input_path)
+        if row is None or row["status"] != "done" or row["stage_version"] != stage_version:
+            return True
+        if row["output_path"] and not os.path.exists(row["output_path"]):
+            return True
+
+        stat = os.stat(input_path)
+        if (stat.st_size, stat.st_mtime_ns) == (row["size"], row["mtime_ns"]):
+            return False
+        if hash_file(input_path) == row["content_hash"]:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "UPDATE entries SET size = ?, mtime_ns = ? WHERE stage = ? AND input_path = ?",
+                    (stat.st_size, stat.st_mtime_ns, stage, input_path))
+            return False
+        return True
+
+    def mark_started(self, stage, input_path, stage_version):
+        self._upsert(stage, os.path.abspath(input_path), stage_version, "running")
+
+    def mark_done(self, stage, input_path, stage_version, output_path=None):
+        input_path = os.path.abspath(input_path)
+        stat = os.stat(input_path)
+        self._upsert(stage, input_path, stage_version, "done", size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                     content_hash=hash_file(input_path), error=None,
+                     output_path=os.path.abspath(output_path) if output_path else None)
+
+    def mark_failed(self, stage, input_path, stage_version, error):
+        self._upsert(stage, os.path.abspath(input_path), stage_version, "failed", error=str(error))
+
+    def plan(self, stage, input_paths, stage_version):
+        """
+        Пробный прогон: сколько входов стадии ожидает обработки, без выполнения работы.
+        """
+        return plan_inputs(self, stage, stage_version, input_paths)
+
+    def summary(self, stage):
+        """
+        Количество записей стадии по статусам.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) AS count FROM entries WHERE stage = ? GROUP BY status", (stage,)).fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+
+def pending_inputs(manifest, stage, stage_version, input_paths):
+    """
+    Отбирает входы, требующие обработки; без манифеста возвращает все.
+    """
+    if manifest is None:
+        return list(input_paths)
+    return [path for path in input_paths if manifest.needs_processing(stage, path, stage_version)]
+
+
+def plan_inputs(manifest, stage, stage_version, input_paths):
+    """
+    Пробный прогон стадии; без манифеста все входы считаются ожидающими, файл манифеста не создается.
+    """
+    input_paths = list(input_paths)
+    pending = pending_inputs(manifest, stage, stage_version, input_paths)
+    return {
+        "stage": stage,
+        "stage_version": stage_version,
+        "total": len(input_paths),
+        "pending": len(pending),
+        "up_to_date": len(input_paths) - len(pending),
+        "pending_bytes": sum(os.path.getsize(path) for path in pending),
+        "pending_files": pending,
+    }
+
+
+def print_plan(plan):
+    """
+    Печатает итог пробного прогона стадии.
+    """
+    print(f"Стадия {plan['stage']}: ожидают обработки {plan['pending']} из {plan['total']} "
+          f"({plan['pending_bytes']} байт), актуальны {plan['up_to_date']}")
+
+
+def add_manifest_arguments(parser):
+    """
+    Добавляет в argparse общие для стадий флаги манифеста и пробного прогона.
+    """
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH, help="Путь к манифесту SQLite")
+    parser.add_argument("--no-manifest", action="store_true", help="Обрабатывать все входы без манифеста")
+    parser.add_argument("--dry-run", action="store_true", help="Только оценить объем ожидающей работы")
+
+
+def manifest_from_args(args):
+    """
+    Манифест по флагам add_manifest_arguments. Пробный прогон не создает отсутствующий файл манифеста.
+    """
+    if args.no_manifest or (args.dry_run and not os.path.exists(args.manifest)):
+        return None
+    return Manifest(args.manifest)
+
+
+@contextmanager
+def track_input(manifest, stage, stage_version, input_path, output_path=None):
+    """
+    Отмечает в манифесте начало и результат обработки одного входа.
+    Вход, на котором процесс упал, остается в статусе running и будет обработан повторно.
+    """
+    if manifest is None:
+        yield
+        return
+
+    manifest.mark_started(stage, input_path, stage_version)
+    try:
+        yield
+    except Exception as e:
+        manifest.mark_failed(stage, input_path, stage_version, e)
+        logging.error(f"Стадия {stage}: ошибка обработки {input_path}: {e}")
+        raise
+    manifest.mark_done(stage, input_path, stage_version, output_path)
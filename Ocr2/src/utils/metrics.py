@@ -0,0 +1,285 @@
+import time
+import bisect
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Стадии OCR многостраничных документов длятся дольше HTTP-запросов
+STAGE_LATENCY_BUCKETS = DEFAULT_LATENCY_BUCKETS + (30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """
+    Потокобезопасная гистограмма с фиксированными границами корзин (как в Prometheus).
+    """
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        """
+        :param buckets: Возрастающие верхние границы корзин; корзина +Inf добавляется автоматически.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def quantile(self, q):
+        """
+        Оценивает квантиль линейной интерполяцией внутри корзины.
+        :param q: Квантиль от 0 до 1.
+        :return: Оценка значения или None, если наблюдений нет.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if not total:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        """
+        Возвращает накопленные корзины, количество, сумму и оценки p50/p95/p99.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            value_sum = self._sum
+
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], counts):
+            cumulative += count
+            buckets.append({"le": bound, "count": cumulative})
+
+        return {
+            "count": total,
+            "sum": round(value_sum, 6),
+            "buckets": buckets,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Counter:
+    """
+    Потокобезопасный монотонный счетчик.
+    """
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+
+class Gauge(Counter):
+    """
+    Значение, которое может как расти, так и уменьшаться (например, запросы в обработке).
+    """
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricFamily:
+    """
+    Метрика с именем, описанием и набором меток; значения для конкретных меток создаются при первом обращении.
+    """
+
+    def __init__(self, name, documentation, metric_type, labelnames, factory):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        """
+        Возвращает метрику для набора меток (Counter, Gauge или Histogram).
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            labels = dict(zip(self.labelnames, key))
+            if self.metric_type != "histogram":
+                lines.append(f"{self.name}{_format_labels(labels)} {_format_value(child.value)}")
+                continue
+            snapshot = child.snapshot()
+            for bucket in snapshot["buckets"]:
+                bound = "+Inf" if bucket["le"] == "+Inf" else _format_value(float(bucket["le"]))
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {bucket['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {snapshot['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса с выводом в текстовом формате Prometheus. Значения, которые уже
+    считаются в других местах (кэш, пулы ридеров), снимаются коллекторами в момент выгрузки.
+    """
+
+    def __init__(self):
+        self._families = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _family(self, name, documentation, metric_type, labelnames, factory):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, documentation, metric_type, labelnames, factory)
+            return family
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._family(name, documentation, "counter", labelnames, Counter)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._family(name, documentation, "gauge", labelnames, Gauge)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._family(name, documentation, "histogram", labelnames, lambda: Histogram(buckets))
+
+    def add_collector(self, collector):
+        """
+        :param collector: Функция без аргументов, возвращающая список
+            (имя, тип, описание, [(метки, значение), ...]).
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Все метрики в текстовом формате Prometheus (text/plain; version=0.0.4).
+        """
+        with self._lock:
+            families = list(self._families.values())
+        lines = []
+        for family in families:
+            lines.extend(family.render())
+        for collector in self._collectors:
+            try:
+                collected = collector()
+            except Exception as e:
+                logging.error(f"Ошибка коллектора метрик: {e}")
+                continue
+            for name, metric_type, documentation, samples in collected:
+                lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"])
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}"
+                             for labels, value in samples if value is not None)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram("ocr_stage_seconds", "Время стадий обработки, с", ("stage",),
+                                   buckets=STAGE_LATENCY_BUCKETS)
+PAGES_PROCESSED = REGISTRY.counter("ocr_pages_processed_total", "Обработанные страницы", ("source",))
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Учитывает время блока как стадию обработки (гистограмма ocr_stage_seconds).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def timed_stage(stage):
+    """
+    Декоратор: время каждого вызова функции учитывается как стадия stage.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_iter(iterable, stage):
+    """
+    Итерирует iterable, учитывая время получения каждого элемента как стадию stage
+    (время обработки элемента потребителем не учитывается).
+    """
+    stage_seconds = STAGE_SECONDS.labels(stage=stage)
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        stage_seconds.observe(time.perf_counter() - start)
+        yield item
+
+
+def count_pages(count=1, source="ocr"):
+    """
+    Увеличивает счетчик обработанных страниц.
+    :param source: Источник текста страницы: "ocr", "text_layer", "docx".
+    """
+    PAGES_PROCESSED.labels(source=source).inc(count)
@@ -0,0 +1,225 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+
+CACHE_DIR = os.environ.get("OCR_CACHE_DIR", os.path.join("output", "ocr_cache"))
+CACHE_MAX_DISK_MB = float(os.environ.get("OCR_CACHE_MAX_MB", 512))
+CACHE_MEMORY_ITEMS = int(os.environ.get("OCR_CACHE_MEMORY_ITEMS", 256))
+CACHE_ENABLED = os.environ.get("OCR_CACHE_ENABLED", "1") not in ("0", "false", "no")
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(file_path):
+    """
+    Хэш содержимого файла (BLAKE2b), читается блоками.
+    :param file_path: Путь к файлу.
+    :return: Строка-хэш.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_text(text):
+    """
+    Хэш строки (UTF-8).
+    :param text: Текст.
+    :return: Строка-хэш.
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def hash_array(array):
+    """
+    Хэш пикселей изображения вместе с формой и типом массива.
+    :param array: Массив numpy.
+    :return: Строка-хэш.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{array.shape}:{array.dtype}".encode("utf-8"))
+    digest.update(memoryview(array if array.flags["C_CONTIGUOUS"] else array.copy()).cast("B"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Кэш результатов OCR с адресацией по содержимому: горячий уровень в памяти (LRU)
+    и ограниченное по размеру хранилище на диске с вытеснением давно не использованных записей.
+    Значения должны сериализоваться в JSON.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_disk_bytes=int(CACHE_MAX_DISK_MB * 1024 * 1024),
+                 memory_items=CACHE_MEMORY_ITEMS, enabled=CACHE_ENABLED):
+        """
+        :param cache_dir: Папка дискового хранилища.
+        :param max_disk_bytes: Максимальный суммарный размер записей на диске.
+        :param memory_items: Количество записей в памяти.
+        :param enabled: Если False, кэш ничего не хранит и всегда возвращает промах.
+        """
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_items = memory_items
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._disk_index = OrderedDict()
+        self._disk_bytes = 0
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith(".json"):
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+                entries.append((stat.st_mtime, file_name[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def make_key(engine, content_hash, **params):
+        """
+        Формирует ключ из хэша содержимого, движка и параметров распознавания.
+        :param engine: Имя движка/стадии (например, "easyocr" или "tesseract.table").
+        :param content_hash: Хэш байтов файла или пикселей страницы.
+        :param params: Параметры, влияющие на результат (языки, contrast_ths, --psm, ...).
+        """
+        payload = json.dumps({"engine": engine, "content": content_hash, "params": params},
+                             sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        :return: Сохраненное значение или None при промахе.
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return self._memory[key]
+            on_disk = key in self._disk_index
+
+        if on_disk:
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                with self._lock:
+                    if key in self._disk_index:
+                        self._disk_index.move_to_end(key)
+                    self._remember(key, value)
+                    self._disk_hits += 1
+                return value
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+
+        data = json.dumps(value, ensure_ascii=False)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.error(f"Не удалось записать запись кэша {key}: {e}")
+            return
+        size = os.path.getsize(path)
+
+        with self._lock:
+            self._remember(key, value)
+            self._disk_bytes += size - self._disk_index.pop(key, 0)
+            self._disk_index[key] = size
+            self._evict()
+
+    def _evict(self):
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk_index) > 1:
+            key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            self._evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get_or_compute(self, key, compute):
+        """
+        Возвращает значение из кэша или вычисляет и сохраняет его.
+        :param key: Ключ из make_key().
+        :param compute: Функция без аргументов, вычисляющая значение.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            hits = self._memory_hits + self._disk_hits
+            lookups = hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else None,
+                "evictions": self._evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    Возвращает общий для процесса кэш результатов (создается при первом обращении).
+    """
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResultCache()
+    return _default_cache
@@ -0,0 +1,122 @@
+import os
+import types
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip("flask")
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from Ocr2.src.api.lazy_loading import LazyRegistry
+from Ocr2.src.pipeline import document_pipeline
+
+
+class FakeClassifier:
+    """
+    Замена MicroBatcher: сразу возвращает готовую категорию.
+    """
+
+    def submit(self, image):
+        future = Future()
+        future.set_result("invoice")
+        return future
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    # Приложение при импорте создает uploads/, output/ и базу задач в текущей папке
+    previous_dir = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("api"))
+    try:
+        from Ocr2.src.api import app as api_module
+    finally:
+        os.chdir(previous_dir)
+    return api_module
+
+
+@pytest.fixture
+def client(api, monkeypatch):
+    loaded = []
+    registry = LazyRegistry()
+    registry.module("document_pipeline", "Ocr2.src.pipeline.document_pipeline")
+
+    def stub(name, value):
+        def load():
+            loaded.append(name)
+            return value
+        registry.register(name, load)
+
+    stub("classify_batcher", FakeClassifier())
+    stub("easyocr_reader", object())
+    stub("ner_model", object())
+    stub("language_tool", object())
+    monkeypatch.setattr(api, "resources", registry)
+    monkeypatch.setattr(document_pipeline, "_ocr_page", lambda image, languages: [
+        {"text": "Invoice", "confidence": 0.99, "box": [[0, 0], [10, 0], [10, 5], [0, 5]]}])
+    return types.SimpleNamespace(http=api.app.test_client(), loaded=loaded, registry=registry)
+
+
+@pytest.fixture
+def page_png():
+    ok, encoded = cv2.imencode(".png", np.full((64, 64, 3), 255, dtype=np.uint8))
+    assert ok
+    return encoded.tobytes()
+
+
+def test_process_runs_only_selected_stages(client, page_png):
+    response = client.http.post("/process?filename=page.png", data=page_png,
+                                query_string={"stages": "classify,ocr"})
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["stages"] == ["classify", "ocr"]
+    assert result["category"] == "invoice"
+    assert result["pages"][0]["text"] == ["Invoice"]
+    assert "entities" not in result and "tables" not in result["pages"][0]
+    # Модели загружаются только для выбранных стадий
+    assert sorted(client.loaded) == ["classify_batcher", "easyocr_reader"]
+
+
+def test_process_reports_stage_timings(client, page_png):
+    response = client.http.post("/process", data=page_png, query_string={"stages": "ocr"})
+
+    result = response.get_json()
+    assert {"load", "ocr"} <= set(result["timings"])
+    assert result["timings"]["ocr"]["calls"] == 1
+    assert result["total_seconds"] >= 0
+
+
+def test_process_rejects_unknown_stage(client, page_png):
+    response = client.http.post("/process", data=page_png, query_string={"stages": "ocr,translate"})
+
+    assert response.status_code == 400
+    assert "translate" in response.get_json()["error"]
+    assert client.loaded == []
+
+
+def test_process_returns_json_when_resource_fails(client, page_png):
+    def failing_load():
+        raise RuntimeError("model download failed")
+    client.registry.register("easyocr_reader", failing_load)
+
+    response = client.http.post("/process", data=page_png, query_string={"stages": "ocr"})
+
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "model download failed"}
+
+
+def test_process_rejects_empty_upload(client):
+    response = client.http.post("/process", data=b"")
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Empty upload"
+
+
+def test_metrics_count_requests(client, page_png):
+    client.http.post("/process", data=page_png, query_string={"stages": "ocr"})
+    response = client.http.get("/metrics", headers={"X-Request-ID": "api-test"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "api-test"
+    assert 'ocr_http_requests_total{endpoint="/process"' in response.text
@@ -43,6 +43,27 @@ def test_ocr(sample_image_path):
     print(f"✅ OCR успешен: {response.json()}")
     return response.json()["output_path"]  # Возвращаем путь к OCR результатам
 
+def test_ocr_upload(sample_image_path):
+
+    url = f"{BASE_URL}/ocr"
+    with open(sample_image_path, "rb") as f:
+        response = requests.post(url, files={"file": ("sample_image.jpg", f, "image/jpeg")})
+    assert response.status_code == 200, f"Ошибка OCR загрузки: {response.json()}"
+    assert response.json()["pages"][0]["page"] == 1, "В ответе нет результата страницы"
+    print(f"✅ OCR загрузки успешен: {response.json()}")
+
+def test_process(sample_image_path):
+
+    url = f"{BASE_URL}/process"
+    with open(sample_image_path, "rb") as f:
+        response = requests.post(url, files={"file": ("sample_image.jpg", f, "image/jpeg")},
+                                 data={"stages": "classify,ocr,ner"})
+    assert response.status_code == 200, f"Ошибка обработки документа: {response.json()}"
+    result = response.json()
+    assert "category" in result and "entities" in result, "В ответе нет результатов стадий"
+    assert "ocr" in result["timings"], "В ответе нет времени стадий"
+    print(f"✅ Обработка документа успешна: {result['timings']}")
+
 def test_spellcheck(results_dir):
 
     url = f"{BASE_URL}/spellcheck"
@@ -61,6 +82,16 @@ def test_extract(results_dir):
     assert response.status_code == 200, f"Ошибка извлечения данных: {response.json()}"
     print(f"✅ Извлечение данных успешно: {response.json()}")
 
+def test_metrics():
+
+    url = f"{BASE_URL}/metrics"
+    response = requests.get(url, headers={"X-Request-ID": "integration-test"})
+    assert response.status_code == 200, f"Ошибка получения метрик: {response.text}"
+    assert response.headers.get("X-Request-ID") == "integration-test", "Нет идентификатора запроса в ответе"
+    assert "ocr_http_requests_total" in response.text, "Нет счетчика запросов"
+    assert 'ocr_stage_seconds_count{stage="recognize"}' in response.text, "Нет времени стадии распознавания"
+    print("✅ Метрики получены")
+
 def cleanup_test_environment():
 
     if os.path.exists("test_data"):
@@ -79,11 +110,20 @@ if __name__ == "__main__":
         ocr_results_dir = test_ocr(sample_image)
 
 
+        test_ocr_upload(sample_image)
+
+
+        test_process(sample_image)
+
+
         test_spellcheck(ocr_results_dir)
 
 
         test_extract(ocr_results_dir)
 
+
+        test_metrics()
+
         print("🎉 Все интеграционные тесты выполнены успешно!")
     except Exception as e:
         print(f"❌ Тесты завершились с ошибкой: {str(e)}")
@@ -0,0 +1,107 @@
+import os
+import argparse
+
+import pytest
+
+from Ocr2.src.utils.manifest import (Manifest, add_manifest_arguments, manifest_from_args, pending_inputs, plan_inputs,
+                                     track_input)
+
+STAGE = "ocr"
+VERSION = "1"
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return Manifest(str(tmp_path / "manifest.sqlite3"))
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "page.jpg"
+    path.write_bytes(b"page one")
+    return str(path)
+
+
+def test_new_input_needs_processing_until_done(manifest, document):
+    assert manifest.needs_processing(STAGE, document, VERSION)
+
+    manifest.mark_started(STAGE, document, VERSION)
+    assert manifest.needs_processing(STAGE, document, VERSION)
+
+    manifest.mark_done(STAGE, document, VERSION)
+    assert not manifest.needs_processing(STAGE, document, VERSION)
+    assert manifest.needs_processing("tables", document, VERSION)
+
+
+def test_stage_version_change_requires_reprocessing(manifest, document):
+    manifest.mark_done(STAGE, document, VERSION)
+
+    assert manifest.needs_processing(STAGE, document, "2")
+
+
+def test_content_change_requires_reprocessing(manifest, document):
+    manifest.mark_done(STAGE, document, VERSION)
+    with open(document, "wb") as f:
+        f.write(b"page two, longer")
+
+    assert manifest.needs_processing(STAGE, document, VERSION)
+
+
+def test_touched_file_with_same_content_is_up_to_date(manifest, document):
+    manifest.mark_done(STAGE, document, VERSION)
+    stat = os.stat(document)
+    os.utime(document, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+    assert not manifest.needs_processing(STAGE, document, VERSION)
+    # Новый mtime запомнен: повторная проверка не считает хэш
+    row = manifest._get(STAGE, os.path.abspath(document))
+    assert row["mtime_ns"] == os.stat(document).st_mtime_ns
+
+
+def test_missing_output_requires_reprocessing(manifest, document, tmp_path):
+    output = tmp_path / "page.json"
+    output.write_text("{}", encoding="utf-8")
+    manifest.mark_done(STAGE, document, VERSION, str(output))
+    assert not manifest.needs_processing(STAGE, document, VERSION)
+
+    output.unlink()
+    assert manifest.needs_processing(STAGE, document, VERSION)
+
+
+def test_track_input_records_failure_and_success(manifest, document):
+    with pytest.raises(RuntimeError):
+        with track_input(manifest, STAGE, VERSION, document):
+            raise RuntimeError("OCR failed")
+    assert manifest.summary(STAGE) == {"failed": 1}
+    assert manifest._get(STAGE, os.path.abspath(document))["error"] == "OCR failed"
+
+    with track_input(manifest, STAGE, VERSION, document):
+        pass
+    assert manifest.summary(STAGE) == {"done": 1}
+
+
+def test_plan_and_pending_inputs(manifest, document, tmp_path):
+    other = tmp_path / "other.jpg"
+    other.write_bytes(b"other page")
+    manifest.mark_done(STAGE, document, VERSION)
+
+    plan = manifest.plan(STAGE, [document, str(other)], VERSION)
+    assert (plan["total"], plan["pending"], plan["up_to_date"]) == (2, 1, 1)
+    assert plan["pending_files"] == [str(other)]
+    assert plan["pending_bytes"] == len(b"other page")
+
+    assert pending_inputs(manifest, STAGE, VERSION, [document, str(other)]) == [str(other)]
+    assert pending_inputs(None, STAGE, VERSION, [document, str(other)]) == [document, str(other)]
+
+
+def test_dry_run_without_manifest_plans_everything(document, tmp_path):
+    plan = plan_inputs(None, STAGE, VERSION, [document])
+    assert (plan["total"], plan["pending"], plan["pending_files"]) == (1, 1, [document])
+
+    parser = argparse.ArgumentParser()
+    add_manifest_arguments(parser)
+    manifest_path = str(tmp_path / "missing.sqlite3")
+    assert manifest_from_args(parser.parse_args(["--dry-run", "--manifest", manifest_path])) is None
+    assert manifest_from_args(parser.parse_args(["--no-manifest"])) is None
+    assert not os.path.exists(manifest_path)
+    assert isinstance(manifest_from_args(parser.parse_args(["--manifest", manifest_path])), Manifest)
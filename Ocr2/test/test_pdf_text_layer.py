@@ -0,0 +1,123 @@
+from Ocr2.src.ocr.pdf_text_layer import _BboxLayoutParser, assess_text_layer, parse_image_list, route_pdf_pages
+
+A4_WIDTH, A4_HEIGHT = 595.0, 842.0
+
+BBOX_LAYOUT = """<!DOCTYPE html><html><head><title></title></head><body>
+<doc>
+  <page width="595.000000" height="842.000000">
+    <flow><block xMin="72" yMin="72" xMax="300" yMax="90">
+      <line xMin="72.000000" yMin="72.000000" xMax="300.000000" yMax="90.000000">
+        <word xMin="72.000000" yMin="72.000000" xMax="140.000000" yMax="90.000000">Invoice</word>
+        <word xMin="145.000000" yMin="72.000000" xMax="300.000000" yMax="90.000000">&amp; receipt</word>
+      </line>
+      <line xMin="72.000000" yMin="100.000000" xMax="300.000000" yMax="118.000000">
+        <word xMin="72.000000" yMin="100.000000" xMax="300.000000" yMax="118.000000">  </word>
+      </line>
+    </block></flow>
+  </page>
+  <page width="595.000000" height="842.000000">
+  </page>
+</doc>
+</body></html>"""
+
+
+def make_page(lines, width=A4_WIDTH, height=A4_HEIGHT):
+    """
+    Страница в формате extract_text_layer(): lines — список (текст, (x1, y1, x2, y2)).
+    """
+    return {"width": width, "height": height,
+            "lines": [{"text": text, "box": list(box), "words": []} for text, box in lines]}
+
+
+def body_page(line_count=40, text="The quarterly report shows total amount due"):
+    return make_page([(text, (72, 72 + 18 * index, 523, 86 + 18 * index)) for index in range(line_count)])
+
+
+def test_bbox_layout_parser_reads_pages_lines_and_words():
+    parser = _BboxLayoutParser()
+    parser.feed(BBOX_LAYOUT)
+
+    assert len(parser.pages) == 2
+    first, second = parser.pages
+    assert (first["width"], first["height"]) == (595.0, 842.0)
+    # Строка из одних пробелов отбрасывается
+    assert len(first["lines"]) == 1
+    line = first["lines"][0]
+    assert line["text"] == "Invoice & receipt"
+    assert line["box"] == [72.0, 72.0, 300.0, 90.0]
+    assert [word["text"] for word in line["words"]] == ["Invoice", "& receipt"]
+    assert second["lines"] == []
+
+
+def test_assess_text_layer_accepts_text_page():
+    assessment = assess_text_layer(body_page())
+    assert assessment["usable"]
+    assert assessment["reason"] == "text_layer"
+
+
+def test_assess_text_layer_rejects_empty_and_garbled_pages():
+    assert assess_text_layer(make_page([]))["reason"] == "no_text"
+    garbled = body_page(text="������ ������ ab")
+    assessment = assess_text_layer(garbled)
+    assert not assessment["usable"]
+    assert assessment["reason"] == "garbled"
+
+
+def test_assess_text_layer_rejects_header_only_page():
+    # Один напечатанный колонтитул не делает страницу текстовой
+    header = make_page([("ACME Corporation - Confidential - Page 1 of 10", (72, 30, 380, 42))])
+    assessment = assess_text_layer(header)
+    assert not assessment["usable"]
+    assert assessment["reason"] == "sparse_text"
+
+
+def test_assess_text_layer_rejects_scan_with_stamp():
+    stamp = [("RECEIVED 12 MARCH 2023 ACCOUNTS DEPARTMENT", (300, 40, 560, 60))] * 3
+    scan_area = A4_WIDTH * A4_HEIGHT
+    assessment = assess_text_layer(make_page(stamp), image_area=scan_area)
+    assert not assessment["usable"]
+    assert assessment["reason"] == "partial_scan"
+    assert assessment["image_coverage"] == 1.0
+
+
+def test_assess_text_layer_accepts_searchable_scan():
+    # Скан с полным невидимым слоем OCR: текст покрывает страницу
+    assessment = assess_text_layer(body_page(), image_area=A4_WIDTH * A4_HEIGHT)
+    assert assessment["usable"]
+
+
+def test_parse_image_list_converts_pixels_to_points():
+    output = (
+        "page   num  type   width height color comp bpc  enc interp  object ID x-ppi y-ppi size ratio\n"
+        "--------------------------------------------------------------------------------------------\n"
+        "   1     0 image    2480  3508  rgb     3   8  jpeg   no        12  0   300   300  1.2M 4.8%\n"
+        "   1     1 smask    2480  3508  gray    1   8  image  no        13  0   300   300  100K 1.2%\n"
+        "   3     2 image     150   150  rgb     3   8  jpeg   no        20  0   150   150  10K  1.0%\n"
+    )
+    areas = parse_image_list(output)
+    assert set(areas) == {1, 3}
+    assert abs(areas[1] - (2480 / 300 * 72) * (3508 / 300 * 72)) < 1e-6
+    assert abs(areas[3] - 72 * 72) < 1e-6
+
+
+def test_route_pdf_pages_without_text_layer_sends_all_pages_to_ocr():
+    text_pages, ocr_pages, report = route_pdf_pages(b"%PDF-1.4", 3, use_text_layer=False)
+    assert text_pages == {}
+    assert ocr_pages == [1, 2, 3]
+    assert report["reasons"] == {1: "not_checked", 2: "not_checked", 3: "not_checked"}
+
+
+def test_route_pdf_pages_routes_scans_and_missing_pages_to_ocr(monkeypatch):
+    import Ocr2.src.ocr.pdf_text_layer as pdf_text_layer
+
+    layer = {1: body_page(), 2: make_page([("Scanned page header with a typed title", (72, 30, 380, 42))])}
+    monkeypatch.setattr(pdf_text_layer, "extract_text_layer", lambda source: layer)
+    monkeypatch.setattr(pdf_text_layer, "list_page_images", lambda source: {2: A4_WIDTH * A4_HEIGHT})
+
+    text_pages, ocr_pages, report = route_pdf_pages("document.pdf", 3, dpi=144)
+    assert list(text_pages) == [1]
+    assert ocr_pages == [2, 3]
+    assert report["reasons"] == {2: "partial_scan", 3: "not_checked"}
+    # Рамки строк пересчитаны из пунктов в пиксели при dpi
+    assert text_pages[1]["boxes"][0]["box"][0] == [144, 144]
+    assert text_pages[1]["source"] == "text_layer"
@@ -0,0 +1,83 @@
+import sys
+import time
+import types
+import threading
+
+import pytest
+
+from Ocr2.src.ocr.reader_pool import ReaderPool
+
+
+class FakeReader:
+    """
+    Замена easyocr.Reader: загрузка занимает load_seconds, первые fail_first загрузок падают.
+    """
+    load_seconds = 0.0
+    fail_first = 0
+    created = 0
+
+    def __init__(self, languages, **kwargs):
+        type(self).created += 1
+        time.sleep(self.load_seconds)
+        if type(self).created <= self.fail_first:
+            raise RuntimeError("model download failed")
+        self.languages = languages
+
+    def detect(self, *args, **kwargs):
+        return []
+
+    def recognize(self, *args, **kwargs):
+        return []
+
+
+@pytest.fixture
+def fake_easyocr(monkeypatch):
+    reader_class = type("Reader", (FakeReader,), {"created": 0})
+    monkeypatch.setitem(sys.modules, "easyocr", types.SimpleNamespace(Reader=reader_class))
+    return reader_class
+
+
+def test_reader_is_reused(fake_easyocr):
+    pool = ReaderPool(("en",), max_size=2)
+    with pool.reader() as first:
+        pass
+    with pool.reader() as second:
+        pass
+
+    assert first is second
+    stats = pool.stats()
+    assert (stats["created"], stats["hits"], stats["misses"], stats["in_use"]) == (1, 1, 1, 0)
+
+
+def test_full_pool_times_out(fake_easyocr):
+    pool = ReaderPool(("en",), max_size=1)
+    reader = pool.acquire()
+
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+    pool.release(reader)
+    assert pool.acquire(timeout=0.05) is reader
+
+
+def test_waiter_creates_reader_after_failed_load(fake_easyocr):
+    fake_easyocr.load_seconds = 0.2
+    fake_easyocr.fail_first = 1
+    pool = ReaderPool(("en",), max_size=1)
+    errors = []
+
+    def failing_load():
+        try:
+            pool.acquire()
+        except RuntimeError as e:
+            errors.append(e)
+
+    loader = threading.Thread(target=failing_load)
+    loader.start()
+    time.sleep(0.05)
+    # Место в пуле занято загрузкой, которая упадет: ожидающий должен создать ридер сам
+    reader = pool.acquire(timeout=2)
+    loader.join()
+
+    assert len(errors) == 1
+    assert isinstance(reader, fake_easyocr)
+    assert pool.stats()["created"] == 1
@@ -0,0 +1,92 @@
+import os
+
+from Ocr2.src.utils.result_cache import ResultCache, hash_file, hash_text
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResultCache(cache_dir=str(tmp_path / "cache"), **kwargs)
+
+
+def test_make_key_depends_on_engine_content_and_params():
+    key = ResultCache.make_key("easyocr", "abc", languages=["en"], contrast_ths=0.1)
+
+    assert key == ResultCache.make_key("easyocr", "abc", contrast_ths=0.1, languages=["en"])
+    assert key != ResultCache.make_key("tesseract.hocr", "abc", languages=["en"], contrast_ths=0.1)
+    assert key != ResultCache.make_key("easyocr", "abd", languages=["en"], contrast_ths=0.1)
+    assert key != ResultCache.make_key("easyocr", "abc", languages=["en", "ru"], contrast_ths=0.1)
+
+
+def test_hash_file_matches_content_not_name(tmp_path):
+    first, second = tmp_path / "a.txt", tmp_path / "b.txt"
+    first.write_text("invoice total", encoding="utf-8")
+    second.write_text("invoice total", encoding="utf-8")
+
+    assert hash_file(str(first)) == hash_file(str(second))
+    second.write_text("invoice totals", encoding="utf-8")
+    assert hash_file(str(first)) != hash_file(str(second))
+    assert hash_text("invoice") != hash_text("Invoice")
+
+
+def test_get_reads_memory_then_disk(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.make_key("easyocr", "page")
+    assert cache.get(key) is None
+
+    cache.put(key, {"text": ["Total"]})
+    assert cache.get(key) == {"text": ["Total"]}
+
+    # Новый экземпляр видит только диск
+    reopened = make_cache(tmp_path)
+    assert reopened.get(key) == {"text": ["Total"]}
+    assert reopened.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_memory_level_is_bounded_lru(tmp_path):
+    cache = make_cache(tmp_path, memory_items=2)
+    for name in ("a", "b", "c"):
+        cache.put(name, name)
+
+    assert cache.stats()["memory_entries"] == 2
+    # Вытесненная из памяти запись читается с диска
+    assert cache.get("a") == "a"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_eviction_removes_least_recently_used(tmp_path):
+    value = "x" * 100
+    cache = make_cache(tmp_path, max_disk_bytes=350, memory_items=0)
+    for name in ("a", "b", "c"):
+        cache.put(name, value)
+    # Чтение "a" делает ее недавно использованной: вытесняется "b"
+    assert cache.get("a") == value
+    cache.put("d", value)
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["disk_bytes"] <= 350
+    assert not os.path.exists(os.path.join(cache.cache_dir, "b.json"))
+    assert cache.get("a") == value
+    assert cache.get("b") is None
+
+
+def test_get_or_compute_computes_once(tmp_path):
+    cache = make_cache(tmp_path)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [1, 2, 3]
+
+    assert cache.get_or_compute("key", compute) == [1, 2, 3]
+    assert cache.get_or_compute("key", compute) == [1, 2, 3]
+    assert len(calls) == 1
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = make_cache(tmp_path, enabled=False)
+    cache.put("key", "value")
+
+    assert cache.get("key") is None
+    assert not os.path.exists(cache.cache_dir)